@@ -1,22 +1,104 @@
-from dataclasses import dataclass
-from datetime import datetime
+import time
+
+# Taken before the remaining imports so --startup-profile can report their cost
+PROCESS_START = time.perf_counter()
+
+import argparse
+import asyncio
+from array import array
+import bisect
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, asdict, field
+from datetime import datetime, timezone
 from zoneinfo import ZoneInfo
+import os
+import re
 import sys
+import math
+import tempfile
+import random
+import json
 import logging
-import requests
-from influxdb import InfluxDBClient
+import threading
 from PyQt5.QtGui import QCursor
-from PyQt5.QtCore import Qt, QTimer
-from PyQt5.QtWidgets import QApplication, QMainWindow, QWidget, QGridLayout, QFrame, QVBoxLayout, QHBoxLayout, QLabel, QGraphicsColorizeEffect
-from PyQt5.QtGui import QColor, QPalette, QFont, QPixmap
+from PyQt5.QtCore import Qt, QEvent, QTimer, QObject, QRunnable, QThreadPool, QBuffer, QIODevice, QPoint, QPointF, QRect, QSize, pyqtSignal, pyqtSlot
+from PyQt5.QtWidgets import QApplication, QMainWindow, QWidget, QGridLayout, QFrame, QVBoxLayout, QHBoxLayout, QLabel
+from PyQt5.QtGui import QColor, QPalette, QFont, QFontMetrics, QPixmap, QPainter, QStaticText
+from PyQt5.QtNetwork import QUdpSocket, QHostAddress
 
 CONFIG = {
     'INFLUXDB_HOST': 'automation.local',
     'INFLUXDB_PORT': 8086,
     'INFLUXDB_DATABASE': 'garden',
-    'DATA_REFRESH_INTERVAL_MS': 300000,
-    'THEME_CHECK_INTERVAL_MS': 60000,
+    # Consecutive InfluxDB failures that open the circuit breaker, and how long it stays open
+    'INFLUXDB_FAILURE_THRESHOLD': 3,
+    'INFLUXDB_RESET_TIMEOUT_S': 60,
+    # In-memory history per sensor field: time span kept, and spacing of the warm-up
+    # points and of live samples (the latest reading per bucket is kept)
+    'HISTORY_RETENTION_S': 7 * 24 * 3600,
+    'HISTORY_BUCKET_S': 300,
+    # Room tile statistics: sliding window for min/max and humidity off-band time,
+    # and the bucket size of the aggregate query that seeds them at startup
+    'STATS_WINDOW_S': 24 * 3600,
+    'STATS_BUCKET_S': 300,
+    # Per-source polling in seconds: base interval and the range it may adapt within
+    'POLL_SOURCES': {
+        'telemetry': {'interval': 300, 'min': 60, 'max': 900},
+        'flowers': {'interval': 1800, 'min': 300, 'max': 3600},
+        # Below FORECAST_TTL_S: the first poll after expiry revalidates in the background, the next shows it
+        'weather': {'interval': 900, 'min': 300, 'max': 1800},
+        'illumination': {'interval': 60, 'min': 30, 'max': 300},
+    },
+    # Upper bound for the retry delay after repeated failures
+    'POLL_BACKOFF_MAX_S': 1800,
+    'FETCH_WORKERS': 2,
+    # Threads available to the asyncio engine for the blocking client calls
+    'FETCH_CONCURRENCY': 4,
     'ILLUMINATION_THRESHOLD': 20,
+    # Lux above the threshold needed to leave the dark theme again
+    'ILLUMINATION_HYSTERESIS': 5,
+    # Minimum time a theme is kept before switching again
+    'THEME_MIN_DWELL_S': 300,
+    # Shared HTTP session used for both InfluxDB and Open-Meteo; connect retries apply
+    # to Open-Meteo only, InfluxDB failures go straight to its circuit breaker
+    'HTTP_POOL_SIZE': 4,
+    'HTTP_RETRIES': 1,
+    'HTTP_CONNECT_TIMEOUT_S': 3.05,
+    'HTTP_READ_TIMEOUT_S': 10,
+    # UDP port for pushed line-protocol points (e.g. an InfluxDB subscription); None disables push mode
+    'PUSH_LISTEN_HOST': '0.0.0.0',
+    'PUSH_LISTEN_PORT': None,
+    # Local Prometheus-text endpoint (http://host:port/metrics); None disables it
+    'METRICS_LISTEN_HOST': '127.0.0.1',
+    'METRICS_LISTEN_PORT': None,
+    # How often a metrics summary is written to the log; None disables it
+    'METRICS_LOG_INTERVAL_S': 900,
+    # Aggregator mode (--serve): publish every cycle's data at http://host:port/snapshot;
+    # None disables it. Dashboards with AGGREGATOR_URL (--subscribe) follow that
+    # endpoint instead of querying InfluxDB and Open-Meteo themselves.
+    'AGGREGATOR_LISTEN_HOST': '0.0.0.0',
+    'AGGREGATOR_LISTEN_PORT': None,
+    'AGGREGATOR_URL': None,
+    # Longest a subscriber's request is held open waiting for a change, and how
+    # many versions of deltas are kept for subscribers catching up
+    'AGGREGATOR_LONG_POLL_S': 30,
+    'AGGREGATOR_DELTAS': 64,
+    # Dashboard tiles: widget type, sensor alias, measurement (defaults per type,
+    # see TILE_TYPES), grid cell and, for plants, the icon name. A JSON file with
+    # the same entries at TILES_PATH (or --tiles) replaces this list.
+    'TILES': [
+        {'key': 'workRoom', 'type': 'DashboardWidget', 'title': 'КАБИНЕТ', 'alias': 'workRoomTempSensor', 'row': 0, 'column': 0},
+        {'key': 'bedRoom', 'type': 'DashboardWidget', 'title': 'СПАЛЬНЯ', 'alias': 'bedRoomTempSensor', 'row': 0, 'column': 1},
+        {'key': 'livRoom', 'type': 'DashboardWidget', 'title': 'ЗАЛ', 'alias': 'livRoomTempSensor', 'row': 0, 'column': 2},
+        {'key': 'SashaRoom', 'type': 'DashboardWidget', 'title': 'ПЕЩЕРА', 'alias': 'SashaRoomTempSensor', 'row': 0, 'column': 3},
+        {'key': 'outdoor', 'type': 'DashboardWidget', 'title': 'БАЛКОН', 'alias': 'outdoorTemperatureSensor', 'row': 1, 'column': 0},
+        {'key': 'flowerOleandrSensor', 'type': 'DashboardLevelWidget', 'title': 'ОЛЕАНДР', 'alias': 'flowerOleandrSensor', 'icon': 'oleandr', 'row': 1, 'column': 1},
+        {'key': 'flowerOlivaSensor', 'type': 'DashboardLevelWidget', 'title': 'ОЛИВА', 'alias': 'flowerOlivaSensor', 'icon': 'olive', 'row': 1, 'column': 2},
+        {'key': 'weather', 'type': 'DashboardWeatherWidget', 'row': 1, 'column': 3},
+    ],
+    'TILES_PATH': None,
     'OPEN_METEO_URL': 'https://api.open-meteo.com/v1/forecast',
     'OPEN_METEO_PARAMS': {
         'latitude': 47.3967,
@@ -25,10 +107,276 @@ CONFIG = {
         'timezone': 'Europe/Zurich',
         'forecast_days': 5,
     },
+    # The forecast changes roughly hourly; serve it from cache in between
+    'FORECAST_TTL_S': 3600,
+    'FORECAST_CACHE_PATH': os.path.expanduser('~/.cache/automation-dashboard/forecast.json'),
+    # Last rendered values, shown (marked stale) right after startup
+    'SNAPSHOT_PATH': os.path.expanduser('~/.cache/automation-dashboard/snapshot.json'),
+    # Images are loaded from the compiled Qt resource module when it has been built
+    'IMAGES_DIR': 'images',
+    # Logical icon edge length in px; None keeps each PNG's native size
+    'ICON_SIZE': None,
+    # Headless --render mode: window size in px (None uses the layout's natural
+    # size), and how long to wait for more tile repaints before emitting a frame
+    'RENDER_SIZE': None,
+    'RENDER_DEBOUNCE_MS': 250,
+}
+
+# Per tile type: the measurement read by default, the fields shown (queried in
+# this order) and the polling source that refreshes it
+TILE_TYPES = {
+    'DashboardWidget': {'measurement': 'Telemetry', 'fields': ('Humidity', 'Temperature'), 'source': 'telemetry'},
+    'DashboardLevelWidget': {'measurement': 'Flowers', 'fields': ('Moisture',), 'source': 'flowers'},
+    'DashboardWeatherWidget': {'measurement': None, 'fields': (), 'source': 'weather'},
 }
 
 ZURICH_TZ = ZoneInfo("Europe/Zurich")
 
+try:
+    # Generated by: pyrcc5 images.qrc -o images_rc.py
+    import images_rc  # noqa: F401
+    CONFIG['IMAGES_DIR'] = ':/images'
+except ImportError:
+    pass
+
+
+class StartupProfiler:
+    """Collect the duration of each startup phase for --startup-profile."""
+
+    def __init__(self, start, clock=time.perf_counter):
+        self.clock = clock
+        self.start = start
+        self.last = start
+        self.phases = []
+        self.enabled = False
+        self.reported = False
+
+    def mark(self, phase):
+        now = self.clock()
+        self.phases.append((phase, now - self.last))
+        self.last = now
+
+    def report(self):
+        """Print the breakdown once, if profiling was requested."""
+        if not self.enabled or self.reported:
+            return
+        self.reported = True
+        lines = ["Startup profile:"]
+        for phase, duration in self.phases:
+            lines.append(f"  {phase:<24} {duration * 1000:8.1f} ms")
+        lines.append(f"  {'total':<24} {(self.last - self.start) * 1000:8.1f} ms")
+        print("\n".join(lines), file=sys.stderr, flush=True)
+
+
+PROFILER = StartupProfiler(PROCESS_START)
+
+# Upper bounds in seconds; wide enough for a Pi on Wi-Fi and a slow API
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class Histogram:
+    """Fixed-bucket histogram in the Prometheus style, plus the maximum seen."""
+
+    __slots__ = ('bounds', 'counts', 'sum', 'count', 'max')
+
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = bounds
+        # One count per bound plus the +Inf bucket; not cumulative
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+        self.max = max(self.max, value)
+
+    def cumulative(self):
+        """Yield (upper bound, observations <= bound) pairs, ending with +Inf."""
+        total = 0
+        for bound, count in zip(self.bounds + (math.inf,), self.counts):
+            total += count
+            yield bound, total
+
+
+def formatLabels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (
+        '%s="%s"' % (name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in pairs
+    )
+    return '{' + ','.join(escaped) + '}'
+
+
+class Metrics:
+    """Thread-safe registry of counters, gauges and latency histograms.
+
+    Samples are keyed by metric name and label set, and rendered in the
+    Prometheus text exposition format.
+    """
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+
+    @staticmethod
+    def key(name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    def increment(self, name, amount=1, **labels):
+        key = self.key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def setGauge(self, name, value, **labels):
+        with self.lock:
+            self.gauges[self.key(name, labels)] = value
+
+    def observe(self, name, value, **labels):
+        key = self.key(name, labels)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Observe the duration of the with-block, whether or not it raises."""
+        start = self.clock()
+        try:
+            yield
+        finally:
+            self.observe(name, self.clock() - start, **labels)
+
+    def render(self):
+        lines = []
+        with self.lock:
+            for kind, samples in (('counter', self.counters), ('gauge', self.gauges), ('histogram', self.histograms)):
+                previous = None
+                for (name, labels), value in sorted(samples.items(), key=lambda item: item[0]):
+                    if name != previous:
+                        lines.append(f'# TYPE {name} {kind}')
+                        previous = name
+                    if kind != 'histogram':
+                        lines.append(f'{name}{formatLabels(labels)} {value}')
+                        continue
+                    for bound, count in value.cumulative():
+                        le = '+Inf' if bound == math.inf else repr(float(bound))
+                        lines.append(f'{name}_bucket{formatLabels(labels, [("le", le)])} {count}')
+                    lines.append(f'{name}_sum{formatLabels(labels)} {value.sum}')
+                    lines.append(f'{name}_count{formatLabels(labels)} {value.count}')
+        return '\n'.join(lines) + '\n'
+
+    def summary(self):
+        """One-line overview for the log: latencies as count/mean/max, then counters."""
+        parts = []
+        with self.lock:
+            for (name, labels), histogram in sorted(self.histograms.items(), key=lambda item: item[0]):
+                if histogram.count:
+                    parts.append('%s%s n=%d mean=%.0fms max=%.0fms' % (
+                        name, formatLabels(labels), histogram.count,
+                        histogram.sum / histogram.count * 1000, histogram.max * 1000))
+            for (name, labels), value in sorted(self.counters.items()):
+                parts.append(f'{name}{formatLabels(labels)}={value}')
+        return ', '.join(parts)
+
+
+METRICS = Metrics()
+
+
+class BackgroundHttpServer:
+    """A small HTTP server answering GET requests from background threads.
+
+    Subclasses implement respond(path, params), returning (status, content
+    type, body bytes) or None for a 404.
+    """
+
+    name = 'HTTP'
+    path = '/'
+
+    def __init__(self, host, port):
+        self.host = host
+        self.requestedPort = port
+        self.server = None
+        self.thread = None
+
+    def start(self):
+        # Only needed when the endpoint is enabled, so keep it off the startup path
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        from urllib.parse import parse_qs
+
+        owner = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path, _, query = self.path.partition('?')
+                response = owner.respond(path, parse_qs(query))
+                if response is None:
+                    self.send_error(404)
+                    return
+                status, contentType, body = response
+                self.send_response(status)
+                self.send_header('Content-Type', contentType)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logging.debug(owner.name + " request: " + format, *args)
+
+        self.server = ThreadingHTTPServer((self.host, self.requestedPort), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        logging.info("Serving %s on http://%s:%d%s", self.name, self.host, self.port(), self.path)
+        return self.port()
+
+    def respond(self, path, params):
+        return None
+
+    def port(self):
+        return self.server.server_address[1]
+
+    def close(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+
+class MetricsServer(BackgroundHttpServer):
+    """Serve a Metrics registry at /metrics from a background thread."""
+
+    name = 'metrics'
+    path = '/metrics'
+
+    def __init__(self, metrics, host, port):
+        super().__init__(host, port)
+        self.metrics = metrics
+
+    def respond(self, path, params):
+        if path != '/metrics':
+            return None
+        return 200, 'text/plain; version=0.0.4; charset=utf-8', self.metrics.render().encode('utf-8')
+
+
+def InfluxDBClient(*args, **kwargs):
+    """Create an influxdb.InfluxDBClient, importing the library on first use.
+
+    influxdb and requests take a noticeable share of startup on a Pi, and
+    nothing needs them before the first refresh.
+    """
+    from influxdb import InfluxDBClient as Client
+    return Client(*args, **kwargs)
+
 
 def format_timestamp(timestamp_iso):
     """Parse an ISO 8601 timestamp and return a formatted Zurich-time string."""
@@ -43,17 +391,349 @@ def format_timestamp(timestamp_iso):
         return "Invalid timestamp"
 
 
+class TimestampFormatter:
+    """Format epoch seconds as local "HH:MM:SS dd/mm/YYYY" strings.
+
+    The output is identical to format_timestamp for the same instant, but no
+    datetime is built per value: the UTC offset is looked up once per DST
+    period and cached as a (start, end, offset) span, date strings are cached
+    per local day, and recently formatted values are memoized. Strings (e.g.
+    RFC3339 times from an older snapshot) are handed to format_timestamp.
+    """
+
+    # Largest step used while probing for an offset change; shorter than any
+    # DST period, so a probe can't jump over a whole period and back
+    PROBE_STEP_S = 28 * 86400
+    # A cached period extends at most this far either side of the first lookup
+    MAX_PERIOD_S = 400 * 86400
+    # Epochs handled arithmetically (1970 up to 3000); others go through datetime
+    MIN_EPOCH = 0
+    MAX_EPOCH = 32503680000
+
+    def __init__(self, tz, memoSize=4096):
+        self.tz = tz
+        self.memoSize = memoSize
+        self.memo = {}
+        self.dates = {}
+        self.starts = []
+        self.periods = []
+
+    def format(self, timestamp):
+        if timestamp is None or isinstance(timestamp, str):
+            return format_timestamp(timestamp)
+        formatted = self.memo.get(timestamp)
+        if formatted is None:
+            try:
+                seconds = math.floor(timestamp)
+            except (ValueError, OverflowError, TypeError):
+                logging.error("Invalid timestamp format: %s", timestamp)
+                return "Invalid timestamp"
+            if self.MIN_EPOCH <= seconds < self.MAX_EPOCH:
+                start, end, offset = self.period(seconds)
+                formatted = self.formatLocal(seconds + offset)
+            else:
+                try:
+                    formatted = datetime.fromtimestamp(seconds, tz=self.tz).strftime("%H:%M:%S %d/%m/%Y")
+                except (ValueError, OverflowError, OSError):
+                    logging.error("Invalid timestamp format: %s", timestamp)
+                    return "Invalid timestamp"
+            if len(self.memo) >= self.memoSize:
+                del self.memo[next(iter(self.memo))]
+            self.memo[timestamp] = formatted
+        return formatted
+
+    def formatSeries(self, timestamps):
+        """Format many epochs; consecutive values in one DST period share its lookup."""
+        formatted = []
+        start = end = offset = None
+        for timestamp in timestamps:
+            if isinstance(timestamp, (int, float)) and self.MIN_EPOCH <= timestamp < self.MAX_EPOCH:
+                seconds = math.floor(timestamp)
+                if start is None or not start <= seconds < end:
+                    start, end, offset = self.period(seconds)
+                formatted.append(self.formatLocal(seconds + offset))
+            else:
+                formatted.append(self.format(timestamp))
+        return formatted
+
+    def formatLocal(self, local):
+        days, secondOfDay = divmod(local, 86400)
+        date = self.dates.get(days)
+        if date is None:
+            date = datetime.fromtimestamp(days * 86400, tz=timezone.utc).strftime("%d/%m/%Y")
+            self.dates[days] = date
+        hour, rest = divmod(secondOfDay, 3600)
+        minute, second = divmod(rest, 60)
+        return "%02d:%02d:%02d %s" % (hour, minute, second, date)
+
+    def offsetAt(self, seconds):
+        return int(datetime.fromtimestamp(seconds, tz=self.tz).utcoffset().total_seconds())
+
+    def period(self, seconds):
+        """Return the cached (start, end, offset) span containing seconds, finding it if needed."""
+        index = bisect.bisect_right(self.starts, seconds) - 1
+        if index >= 0 and seconds < self.periods[index][1]:
+            return self.periods[index]
+        offset = self.offsetAt(seconds)
+        start = self.edge(seconds, offset, -1)
+        end = self.edge(seconds, offset, 1)
+        # Keep the cached spans disjoint
+        if index >= 0:
+            start = max(start, self.periods[index][1])
+        if index + 1 < len(self.periods):
+            end = min(end, self.starts[index + 1])
+        period = (start, end, offset)
+        self.starts.insert(index + 1, start)
+        self.periods.insert(index + 1, period)
+        return period
+
+    def edge(self, seconds, offset, direction):
+        """Search from seconds in direction (-1 or 1) for where offset stops applying.
+
+        Returns the first second of the span going backwards, and the first
+        second past it going forwards.
+        """
+        inside = seconds
+        step = 3600
+        while True:
+            probe = inside + direction * min(step, self.PROBE_STEP_S)
+            capped = abs(probe - seconds) >= self.MAX_PERIOD_S
+            if capped:
+                probe = seconds + direction * self.MAX_PERIOD_S
+            if self.offsetAt(probe) != offset:
+                outside = probe
+                break
+            inside = probe
+            if capped:
+                return inside if direction < 0 else inside + 1
+            step *= 2
+        while abs(outside - inside) > 1:
+            middle = (inside + outside) // 2
+            if self.offsetAt(middle) == offset:
+                inside = middle
+            else:
+                outside = middle
+        return inside if direction < 0 else outside
+
+
+TIMESTAMPS = TimestampFormatter(ZURICH_TZ)
+
+
+def timestampToEpoch(timestamp):
+    """Return seconds since the epoch for an RFC3339 string or a numeric epoch."""
+    if isinstance(timestamp, (int, float)):
+        return float(timestamp)
+    if timestamp.endswith("Z"):
+        timestamp = timestamp[:-1] + "+00:00"
+    return datetime.fromisoformat(timestamp).timestamp()
+
+
+def quoteLiteral(value):
+    """Quote a string for InfluxQL, escaping backslashes and single quotes."""
+    return "'" + value.replace('\\', '\\\\').replace("'", "\\'") + "'"
+
+
+def aliasFilter(aliases):
+    """Build an InfluxQL WHERE clause matching any of the given alias tags."""
+    return ' OR '.join('alias = ' + quoteLiteral(alias) for alias in aliases)
+
+
+def buildLatestQuery(groups):
+    """Build one multi-statement query returning the two newest rows per alias.
+
+    The newest row is shown; the gap to the one before is the sensor's
+    cadence, used to schedule the next poll. groups holds (measurement,
+    fields, aliases) tuples, one statement each. GROUP BY alias makes LIMIT 2
+    apply per series, so the number of
+    statements stays constant no matter how many sensors are configured.
+    """
+    statements = []
+    for measurement, fields, aliases in groups:
+        if aliases:
+            statements.append(
+                'SELECT time, ' + ', '.join(fields) + ' FROM ' + measurement + ' WHERE ' + aliasFilter(aliases)
+                + ' GROUP BY alias ORDER BY time DESC LIMIT 2'
+            )
+    return '; '.join(statements)
+
+
+@dataclass
+class TileSpec:
+    key: str
+    type: str
+    row: int
+    column: int
+    title: str = ""
+    alias: str = None
+    measurement: str = None
+    icon: str = None
+
+
+def parseTiles(entries):
+    """Validate tile entries (dicts) and fill in each sensor tile's default measurement.
+
+    Raises ValueError for unknown types, missing aliases or icons, and duplicate
+    keys, aliases or grid cells.
+    """
+    tiles = []
+    keys, aliases, cells = set(), set(), set()
+    for entry in entries:
+        try:
+            tile = TileSpec(**entry)
+        except TypeError as e:
+            raise ValueError(f"Invalid tile {entry!r}: {e}") from None
+        kind = TILE_TYPES.get(tile.type)
+        if kind is None:
+            raise ValueError(f"Tile {tile.key!r} has unknown type {tile.type!r}")
+        if kind['fields']:
+            if not tile.alias:
+                raise ValueError(f"Tile {tile.key!r} needs an alias")
+            if tile.alias in aliases:
+                raise ValueError(f"Alias {tile.alias!r} is used by more than one tile")
+            aliases.add(tile.alias)
+            tile.measurement = tile.measurement or kind['measurement']
+        if tile.type == 'DashboardLevelWidget' and not tile.icon:
+            raise ValueError(f"Tile {tile.key!r} needs an icon")
+        if tile.key in keys:
+            raise ValueError(f"Tile key {tile.key!r} is used more than once")
+        if (tile.row, tile.column) in cells:
+            raise ValueError(f"Tile {tile.key!r} overlaps another tile at row {tile.row}, column {tile.column}")
+        keys.add(tile.key)
+        cells.add((tile.row, tile.column))
+        tiles.append(tile)
+    return tiles
+
+
+def loadTiles(path):
+    """Read tiles from a JSON file holding a list of entries or {"tiles": [...]}."""
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    return parseTiles(data['tiles'] if isinstance(data, dict) else data)
+
+
+class TileRegistry:
+    """The configured tiles, indexed for building queries and routing results."""
+
+    def __init__(self, tiles):
+        self.tiles = list(tiles)
+        self.sensors = {(tile.measurement, tile.alias): tile for tile in self.tiles if tile.alias}
+
+    def ofSource(self, source):
+        return [tile for tile in self.tiles if TILE_TYPES[tile.type]['source'] == source]
+
+    def sensor(self, measurement, alias):
+        return self.sensors.get((measurement, alias))
+
+    def queryGroups(self, sources=None):
+        """(measurement, fields, aliases) for every sensor tile refreshed by the given sources.
+
+        Tiles of the same type reading the same measurement share one group, so
+        adding tiles never adds statements.
+        """
+        groups = {}
+        for tile in self.sensors.values():
+            kind = TILE_TYPES[tile.type]
+            if sources is None or kind['source'] in sources:
+                groups.setdefault((tile.measurement, kind['fields']), []).append(tile.alias)
+        return [(measurement, fields, aliases) for (measurement, fields), aliases in groups.items()]
+
+
+def finiteOrNone(value):
+    """A field value as a tile shows it: None for nulls (NaN once decoded) and infinities.
+
+    NaN never equals itself, so a NaN reading would count as changed on every
+    refresh and repaint its tile.
+    """
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+def tileValue(tileType, frame, index=0):
+    """Turn one row of a decoded sensor series into the value a tile of the given type shows."""
+    if tileType == 'DashboardWidget':
+        return Measure(temperature=finiteOrNone(frame['Temperature'][index]),
+                       humidity=finiteOrNone(frame['Humidity'][index]), timestamp=frame.times[index])
+    if tileType == 'DashboardLevelWidget':
+        return Moisture(value=finiteOrNone(frame['Moisture'][index]), timestamp=frame.times[index])
+    raise ValueError(f"{tileType} does not show sensor rows")
+
+
+class SeriesFrame:
+    """One series of an InfluxDB response decoded into typed columns.
+
+    Epoch times are an array('q') and each numeric field an array('d') with
+    NaN for nulls, 8 bytes per value instead of a Python object per point.
+    Fields holding strings stay lists. Columns are looked up by name, so the
+    SELECT order doesn't matter.
+    """
+
+    __slots__ = ('name', 'tags', 'times', 'columns')
+
+    def __init__(self, name, tags, times, columns):
+        self.name = name
+        self.tags = tags
+        self.times = times
+        self.columns = columns
+
+    def __len__(self):
+        return len(self.times)
+
+    def __getitem__(self, column):
+        return self.columns[column]
+
+
+def decodeTimes(column):
+    """Epoch times as array('q'); RFC3339 strings (queries without epoch=) are converted."""
+    try:
+        return array('q', column)
+    except TypeError:
+        return array('q', (int(timestampToEpoch(timestamp)) for timestamp in column))
+
+
+def decodeColumn(column):
+    if None in column:
+        column = [math.nan if value is None else value for value in column]
+    try:
+        return array('d', column)
+    except TypeError:
+        return list(column)
+
+
+def decodeSeries(series):
+    """Decode one raw series dict column by column, without building per-point objects."""
+    columns = series.get('columns', [])
+    values = series.get('values') or []
+    data = dict(zip(columns, zip(*values))) if values else {name: () for name in columns}
+    times = decodeTimes(data.pop('time', ()))
+    return SeriesFrame(series.get('name'), series.get('tags') or {}, times,
+                       {name: decodeColumn(column) for name, column in data.items()})
+
+
+def decodeResults(results):
+    """Decode a ResultSet, or the list a multi-statement query returns, into SeriesFrames.
+
+    Grouped queries yield one frame per tag combination (e.g. per alias).
+    """
+    # The client only returns a list for multi-statement queries
+    if not isinstance(results, list):
+        results = [results]
+    return [decodeSeries(series) for result in results for series in result.raw.get('series', [])]
+
+
 @dataclass
 class Measure:
-    temperature: float = 0
-    humidity: float = 0
-    timestamp: str = ""
+    # None when the sensor reported no value
+    temperature: float | None = 0
+    humidity: float | None = 0
+    # Epoch seconds as queried from InfluxDB; RFC3339 strings in older snapshots
+    timestamp: int | str = ""
 
 
 @dataclass
 class Moisture:
-    value: float = 0
-    timestamp: str = ""
+    value: float | None = 0
+    timestamp: int | str = ""
 
 
 @dataclass
@@ -64,6 +744,1419 @@ class DayForecast:
     weathercode: int = 0
 
 
+class RingBuffer:
+    """Fixed-capacity time series stored in two array('d') buffers.
+
+    Holds epoch seconds and values as plain doubles, 16 bytes per sample, and
+    overwrites the oldest sample once full. Samples must arrive in time order.
+    With a bucket size, a sample in the same bucket as the last one replaces
+    it, so capacity * bucket seconds are kept however often samples arrive.
+    """
+
+    __slots__ = ('capacity', 'bucket', 'times', 'values', 'start', 'size')
+
+    def __init__(self, capacity, bucket=0):
+        self.capacity = capacity
+        self.bucket = bucket
+        self.times = array('d', bytes(8 * capacity))
+        self.values = array('d', bytes(8 * capacity))
+        self.start = 0
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def lastTime(self):
+        if not self.size:
+            return None
+        return self.times[(self.start + self.size - 1) % self.capacity]
+
+    def append(self, timestamp, value):
+        """Add a sample; returns False if it is not newer than the last one."""
+        if self.size:
+            lastTime = self.lastTime()
+            if timestamp <= lastTime:
+                return False
+            if self.bucket and timestamp // self.bucket == lastTime // self.bucket:
+                index = (self.start + self.size - 1) % self.capacity
+                self.times[index] = timestamp
+                self.values[index] = value
+                return True
+        index = (self.start + self.size) % self.capacity
+        self.times[index] = timestamp
+        self.values[index] = value
+        if self.size < self.capacity:
+            self.size += 1
+        else:
+            self.start = (self.start + 1) % self.capacity
+        return True
+
+    def series(self):
+        """Return (times, values) as new arrays in chronological order."""
+        end = self.start + self.size
+        if end <= self.capacity:
+            return self.times[self.start:end], self.values[self.start:end]
+        wrap = end - self.capacity
+        return (self.times[self.start:] + self.times[:wrap],
+                self.values[self.start:] + self.values[:wrap])
+
+    def nbytes(self):
+        return (len(self.times) + len(self.values)) * self.times.itemsize
+
+
+class HistoryStore:
+    """One RingBuffer per (alias, field), e.g. ('workRoomTempSensor', 'Temperature')."""
+
+    FIELDS = {
+        Measure: (('Temperature', 'temperature'), ('Humidity', 'humidity')),
+        Moisture: (('Moisture', 'value'),),
+    }
+
+    def __init__(self, capacity, bucket=0):
+        self.capacity = capacity
+        self.bucket = bucket
+        self.buffers = {}
+
+    def buffer(self, alias, fieldName):
+        key = (alias, fieldName)
+        buffer = self.buffers.get(key)
+        if buffer is None:
+            buffer = RingBuffer(self.capacity, self.bucket)
+            self.buffers[key] = buffer
+        return buffer
+
+    def append(self, alias, fieldName, timestamp, value):
+        if value is None:
+            return False
+        return self.buffer(alias, fieldName).append(timestamp, value)
+
+    def record(self, latest):
+        """Append the Measure/Moisture values of one refresh, keyed by alias."""
+        for alias, reading in latest.items():
+            try:
+                timestamp = timestampToEpoch(reading.timestamp)
+            except (ValueError, TypeError, AttributeError):
+                continue
+            for fieldName, attribute in self.FIELDS.get(type(reading), ()):
+                self.append(alias, fieldName, timestamp, getattr(reading, attribute))
+
+    def load(self, alias, fieldName, times, values):
+        """Fill a buffer from warm-up data, keeping samples already recorded after it."""
+        existing = self.buffers.get((alias, fieldName))
+        buffer = RingBuffer(self.capacity, self.bucket)
+        firstKept = None
+        if existing is not None and len(existing):
+            keptTimes, keptValues = existing.series()
+            firstKept = keptTimes[0]
+        for timestamp, value in zip(times, values):
+            if value is not None and not math.isnan(value) and (firstKept is None or timestamp < firstKept):
+                buffer.append(timestamp, value)
+        if firstKept is not None:
+            for timestamp, value in zip(keptTimes, keptValues):
+                buffer.append(timestamp, value)
+        self.buffers[(alias, fieldName)] = buffer
+
+    def series(self, alias, fieldName):
+        buffer = self.buffers.get((alias, fieldName))
+        if buffer is None:
+            return array('d'), array('d')
+        return buffer.series()
+
+    def nbytes(self):
+        return sum(buffer.nbytes() for buffer in self.buffers.values())
+
+
+class RollingExtremes:
+    """Minimum and maximum over a sliding time window, O(1) amortized per sample.
+
+    Two monotonic deques of (time, value): lows keeps values increasing from
+    the front and highs decreasing, so once samples older than the window are
+    dropped the front of each is the answer.
+    """
+
+    __slots__ = ('window', 'lows', 'highs')
+
+    def __init__(self, window):
+        self.window = window
+        self.lows = deque()
+        self.highs = deque()
+
+    def add(self, timestamp, low, high=None):
+        """Add a sample; a (low, high) pair stands for a pre-aggregated bucket."""
+        if high is None:
+            high = low
+        lows, highs = self.lows, self.highs
+        while lows and lows[-1][1] >= low:
+            lows.pop()
+        lows.append((timestamp, low))
+        while highs and highs[-1][1] <= high:
+            highs.pop()
+        highs.append((timestamp, high))
+        self.evict(timestamp)
+
+    def prepend(self, timestamp, low, high=None):
+        """Add a sample older than every sample added so far."""
+        if high is None:
+            high = low
+        # An older sample only matters if nothing later is as low (or as high)
+        if not self.lows or low < self.lows[0][1]:
+            self.lows.appendleft((timestamp, low))
+        if not self.highs or high > self.highs[0][1]:
+            self.highs.appendleft((timestamp, high))
+
+    def evict(self, now):
+        cutoff = now - self.window
+        while self.lows and self.lows[0][0] <= cutoff:
+            self.lows.popleft()
+        while self.highs and self.highs[0][0] <= cutoff:
+            self.highs.popleft()
+
+    def minimum(self):
+        return self.lows[0][1] if self.lows else None
+
+    def maximum(self):
+        return self.highs[0][1] if self.highs else None
+
+
+class RollingBandTime:
+    """Share of a sliding time window a value spent outside [low, high].
+
+    A sample's state holds until the next sample, so time is counted per
+    interval between samples. Intervals sit in a deque with running totals;
+    the oldest are dropped, or trimmed, as the window moves on.
+    """
+
+    __slots__ = ('window', 'low', 'high', 'intervals', 'total', 'outside', 'firstTime', 'lastTime', 'lastOutside')
+
+    def __init__(self, window, low, high):
+        self.window = window
+        self.low = low
+        self.high = high
+        self.intervals = deque()
+        self.total = 0
+        self.outside = 0
+        self.firstTime = None
+        self.lastTime = None
+        self.lastOutside = False
+
+    def isOutside(self, value):
+        return value < self.low or value > self.high
+
+    def add(self, timestamp, value):
+        if self.lastTime is None:
+            self.firstTime = timestamp
+        elif timestamp > self.lastTime:
+            self.intervals.append((self.lastTime, timestamp, self.lastOutside))
+            self.count(timestamp - self.lastTime, self.lastOutside)
+        else:
+            return
+        self.lastTime = timestamp
+        self.lastOutside = self.isOutside(value)
+        self.evict(timestamp)
+
+    def prepend(self, timestamp, value):
+        """Add a sample older than every sample added so far."""
+        if self.firstTime is None:
+            self.add(timestamp, value)
+        elif timestamp < self.firstTime:
+            outside = self.isOutside(value)
+            self.intervals.appendleft((timestamp, self.firstTime, outside))
+            self.count(self.firstTime - timestamp, outside)
+            self.firstTime = timestamp
+
+    def count(self, duration, outside):
+        self.total += duration
+        if outside:
+            self.outside += duration
+
+    def evict(self, now):
+        cutoff = now - self.window
+        intervals = self.intervals
+        # Negative durations take expired time back out of the totals
+        while intervals and intervals[0][1] <= cutoff:
+            start, end, outside = intervals.popleft()
+            self.count(start - end, outside)
+        if intervals and intervals[0][0] < cutoff:
+            start, end, outside = intervals[0]
+            intervals[0] = (cutoff, end, outside)
+            self.count(start - cutoff, outside)
+
+    def share(self):
+        """Fraction of the covered time spent outside the band, or None without data."""
+        return self.outside / self.total if self.total else None
+
+
+class RoomStats:
+    """Rolling temperature min/max and humidity off-band share for one room."""
+
+    __slots__ = ('temperature', 'humidity', 'firstTime', 'lastTime')
+
+    def __init__(self, window, band):
+        self.temperature = RollingExtremes(window)
+        self.humidity = RollingBandTime(window, *band)
+        self.firstTime = None
+        self.lastTime = None
+
+    def add(self, timestamp, temperature, humidity):
+        """Add a live reading; returns False if it is not newer than the last one."""
+        if self.lastTime is not None and timestamp <= self.lastTime:
+            return False
+        if self.firstTime is None:
+            self.firstTime = timestamp
+        self.lastTime = timestamp
+        if temperature is not None:
+            self.temperature.add(timestamp, temperature)
+        if humidity is not None:
+            self.humidity.add(timestamp, humidity)
+        return True
+
+    def seed(self, times, lows, highs, humidity):
+        """Fill in aggregated buckets (in time order) from before the first live reading."""
+        for index in range(len(times) - 1, -1, -1):
+            timestamp = times[index]
+            if self.firstTime is not None and timestamp >= self.firstTime:
+                continue
+            if not (math.isnan(lows[index]) or math.isnan(highs[index])):
+                self.temperature.prepend(timestamp, lows[index], highs[index])
+            if not math.isnan(humidity[index]):
+                self.humidity.prepend(timestamp, humidity[index])
+            self.firstTime = timestamp
+            if self.lastTime is None:
+                self.lastTime = timestamp
+        if self.lastTime is not None:
+            self.temperature.evict(self.lastTime)
+            self.humidity.evict(self.lastTime)
+
+    def summary(self):
+        return self.temperature.minimum(), self.temperature.maximum(), self.humidity.share()
+
+
+class RoomStatsStore:
+    """RoomStats per alias, fed by every refresh and pushed point."""
+
+    SEED_COLUMNS = ('minTemperature', 'maxTemperature', 'Humidity')
+
+    def __init__(self, window, band):
+        self.window = window
+        self.band = band
+        self.rooms = {}
+
+    def room(self, alias):
+        stats = self.rooms.get(alias)
+        if stats is None:
+            stats = RoomStats(self.window, self.band)
+            self.rooms[alias] = stats
+        return stats
+
+    def record(self, alias, reading):
+        """Add a Measure; returns True if the room's stats moved on."""
+        if not isinstance(reading, Measure):
+            return False
+        try:
+            timestamp = timestampToEpoch(reading.timestamp)
+        except (ValueError, TypeError, AttributeError):
+            return False
+        return self.room(alias).add(timestamp, reading.temperature, reading.humidity)
+
+    def seed(self, frames):
+        """Seed from the SeriesFrames of buildStatsQuery, one per alias."""
+        for frame in frames:
+            alias = frame.tags.get('alias')
+            if alias is None or not all(column in frame.columns for column in self.SEED_COLUMNS):
+                continue
+            self.room(alias).seed(frame.times, *(frame[column] for column in self.SEED_COLUMNS))
+
+    def summary(self, alias):
+        """Return (min temperature, max temperature, off-band share); None where unknown."""
+        stats = self.rooms.get(alias)
+        if stats is None:
+            return None, None, None
+        return stats.summary()
+
+
+def buildBucketStatement(source, selections, aliases, window, bucket):
+    """One statement reducing the last window seconds of source to bucket-sized aggregates.
+
+    fill(none) leaves empty buckets out, so the server sends only buckets with data.
+    """
+    return ('SELECT ' + ', '.join(selections) + ' FROM ' + source + ' WHERE (' + aliasFilter(aliases) + ')'
+            + f' AND time > now() - {int(window)}s GROUP BY time({int(bucket)}s), alias fill(none)')
+
+
+def buildStatsQuery(groups, window, bucket):
+    """Build the query seeding RoomStats: temperature min/max and mean humidity per bucket."""
+    selections = ['min(Temperature) AS minTemperature', 'max(Temperature) AS maxTemperature',
+                  'mean(Humidity) AS Humidity']
+    return '; '.join(buildBucketStatement(measurement, selections, aliases, window, bucket)
+                     for measurement, fields, aliases in groups if aliases)
+
+
+DURATION_UNITS = {'ns': 1e-9, 'u': 1e-6, 'µ': 1e-6, 'ms': 1e-3, 's': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+DURATION_PART = re.compile(r'(\d+)(ns|u|µ|ms|s|m|h|d|w)')
+
+
+def parseDuration(text):
+    """Seconds in an InfluxDB duration such as '30m' or '168h0m0s' ('0s' means infinite)."""
+    parts = DURATION_PART.findall(text)
+    if not parts or ''.join(number + unit for number, unit in parts) != text:
+        raise ValueError(f"Invalid duration: {text!r}")
+    return sum(int(number) * DURATION_UNITS[unit] for number, unit in parts)
+
+
+def formatDuration(seconds):
+    """Short label for a whole number of seconds: 86400 is '24h', a week '7d'."""
+    seconds = int(seconds)
+    for unit in ('d', 'h', 'm'):
+        size = DURATION_UNITS[unit]
+        if seconds >= 2 * size and seconds % size == 0:
+            return f"{seconds // size}{unit}"
+    return f"{seconds}s"
+
+
+CQ_QUERY = re.compile(
+    r'SELECT\s+(?P<select>.+?)\s+INTO\s+(?P<into>\S+)\s+FROM\s+(?P<source>\S+)'
+    r'.*?GROUP\s+BY\s+time\(\s*(?P<interval>\w+)\s*\)(?P<tags>[^;]*)', re.IGNORECASE | re.DOTALL)
+CQ_AGGREGATE = re.compile(r'(\w+)\(\s*"?(\*|\w+)"?\s*\)(?:\s+AS\s+"?(\w+)"?)?', re.IGNORECASE)
+
+
+def splitIdentifier(name):
+    return [part.strip('"') for part in re.findall(r'"[^"]*"|[^.]+', name)]
+
+
+@dataclass
+class Rollup:
+    """A continuous query writing bucketed aggregates of one measurement into another."""
+    source: str
+    measurement: str
+    retentionPolicy: str | None
+    interval: int
+    # (aggregate, field) -> column written by the query; aggregates in wildcards cover all fields
+    columns: dict = field(default_factory=dict)
+    wildcards: set = field(default_factory=set)
+
+    def column(self, aggregate, fieldName):
+        column = self.columns.get((aggregate, fieldName))
+        if column is None and aggregate in self.wildcards:
+            column = f'{aggregate}_{fieldName}'
+        return column
+
+
+def parseContinuousQuery(query):
+    """Return the Rollup a CREATE CONTINUOUS QUERY statement maintains, or None if unusable.
+
+    Only queries keeping the alias tag (GROUP BY time(..), * or .., alias) can
+    serve per-sensor reads, and only `f(field) AS name` or `f(*)` columns are
+    recognised.
+    """
+    match = CQ_QUERY.search(query)
+    if match is None or not re.search(r'\*|\balias\b', match['tags']):
+        return None
+    into = splitIdentifier(match['into'])
+    rollup = Rollup(
+        source=splitIdentifier(match['source'])[-1],
+        measurement=into[-1],
+        retentionPolicy=into[-2] if len(into) > 1 else None,
+        interval=int(parseDuration(match['interval'])),
+    )
+    for aggregate, fieldName, alias in CQ_AGGREGATE.findall(match['select']):
+        aggregate = aggregate.lower()
+        if fieldName == '*':
+            rollup.wildcards.add(aggregate)
+        elif alias:
+            rollup.columns[(aggregate, fieldName)] = alias
+    return rollup if rollup.columns or rollup.wildcards else None
+
+
+@dataclass
+class QueryPlan:
+    source: str
+    bucket: int
+    aggregate: str
+    statement: str
+    rollup: Rollup | None = None
+
+
+class QueryPlanner:
+    """Choose how to read a time range so the server sends about one point per pixel.
+
+    The bucket is the smallest of NICE_BUCKETS_S that keeps the point count
+    within the pixel width, e.g. 30 minutes (336 points) for 7 days on a 400px
+    tile. Continuous-query rollups found in the database are read instead of
+    the raw measurement when their interval divides the bucket, they store the
+    requested aggregate for every field and their retention policy covers the
+    range; the coarsest such rollup wins.
+    """
+
+    NICE_BUCKETS_S = (1, 5, 10, 30, 60, 300, 600, 900, 1800, 3600, 7200, 10800, 21600, 43200, 86400, 604800)
+    AGGREGATES = ('mean', 'min', 'max', 'last')
+
+    def __init__(self, database):
+        self.database = database
+        self.rollups = []
+        # Retention policy name -> duration in seconds, 0 meaning infinite
+        self.retention = {}
+        self.discovered = False
+
+    def discover(self, client):
+        """Read retention policies and continuous queries; raises if either query fails."""
+        retention = {}
+        for frame in decodeResults(client.query(f'SHOW RETENTION POLICIES ON "{self.database}"')):
+            for name, duration in zip(frame.columns.get('name', ()), frame.columns.get('duration', ())):
+                retention[name] = parseDuration(duration)
+        rollups = []
+        for frame in decodeResults(client.query('SHOW CONTINUOUS QUERIES')):
+            if frame.name != self.database:
+                continue
+            for query in frame.columns.get('query', ()):
+                rollup = parseContinuousQuery(query)
+                if rollup is not None:
+                    rollups.append(rollup)
+        self.retention = retention
+        self.rollups = rollups
+        self.discovered = True
+        logging.info("Query planner: %d retention policies, %d usable rollups", len(retention), len(rollups))
+
+    def bucketFor(self, window, pixels):
+        target = math.ceil(window / max(1, pixels))
+        for bucket in self.NICE_BUCKETS_S:
+            if bucket >= target:
+                return bucket
+        return math.ceil(target / 604800) * 604800
+
+    def covers(self, rollup, window):
+        duration = self.retention.get(rollup.retentionPolicy)
+        return rollup.retentionPolicy is None or duration is None or duration == 0 or duration >= window
+
+    def rollupFor(self, measurement, fields, aggregate, bucket, window):
+        usable = [
+            rollup for rollup in self.rollups
+            if rollup.source == measurement and rollup.interval <= bucket and bucket % rollup.interval == 0
+            and all(rollup.column(aggregate, name) for name in fields) and self.covers(rollup, window)
+        ]
+        return max(usable, key=lambda rollup: rollup.interval, default=None)
+
+    def plan(self, measurement, fields, aliases, window, pixels, aggregate='mean'):
+        """Plan one statement reading fields of the given aliases over the last window seconds."""
+        if aggregate not in self.AGGREGATES:
+            raise ValueError(f"Unsupported aggregate: {aggregate}")
+        bucket = self.bucketFor(window, pixels)
+        rollup = self.rollupFor(measurement, fields, aggregate, bucket, window)
+        if rollup is None:
+            source = measurement
+            selections = [f'{aggregate}({name}) AS {name}' for name in fields]
+        else:
+            source = f'"{rollup.measurement}"'
+            if rollup.retentionPolicy:
+                source = f'"{rollup.retentionPolicy}".' + source
+            # Re-aggregating the rollup's column keeps the raw field name for the caller
+            selections = [f'{aggregate}("{rollup.column(aggregate, name)}") AS {name}' for name in fields]
+        statement = buildBucketStatement(source, selections, aliases, window, bucket)
+        return QueryPlan(source, bucket, aggregate, statement, rollup)
+
+    def query(self, groups, window, pixels, aggregate='mean'):
+        """Plan every query group and join the statements into one query."""
+        plans = [self.plan(measurement, fields, aliases, window, pixels, aggregate)
+                 for measurement, fields, aliases in groups if aliases]
+        for plan in plans:
+            logging.debug("Planned %s over %s at %ds buckets", plan.aggregate, plan.source, plan.bucket)
+        return '; '.join(plan.statement for plan in plans)
+
+
+@dataclass
+class Point:
+    measurement: str = ""
+    tags: dict = field(default_factory=dict)
+    fields: dict = field(default_factory=dict)
+    timestamp: int = None
+
+
+LINE_PROTOCOL_ESCAPE = re.compile(r'\\(.)')
+
+
+def splitLineProtocol(text, separator):
+    """Split on separator, ignoring escaped characters and quoted strings.
+
+    Escape sequences are kept so that later splits of the parts still see them.
+    """
+    parts = []
+    current = []
+    quoted = False
+    escaped = False
+    for ch in text:
+        if escaped:
+            current.append('\\' + ch)
+            escaped = False
+        elif ch == '\\':
+            escaped = True
+        elif ch == '"':
+            quoted = not quoted
+            current.append(ch)
+        elif ch == separator and not quoted:
+            parts.append(''.join(current))
+            current = []
+        else:
+            current.append(ch)
+    parts.append(''.join(current))
+    return parts
+
+
+def unescapeLineProtocol(text):
+    return LINE_PROTOCOL_ESCAPE.sub(r'\1', text)
+
+
+def parseFieldValue(value):
+    if value.startswith('"') and value.endswith('"') and len(value) >= 2:
+        return unescapeLineProtocol(value[1:-1])
+    if value[-1:] in ('i', 'u'):
+        return int(value[:-1])
+    if value in ('t', 'T', 'true', 'True', 'TRUE'):
+        return True
+    if value in ('f', 'F', 'false', 'False', 'FALSE'):
+        return False
+    return float(value)
+
+
+def parseLineProtocol(line):
+    """Parse one InfluxDB line-protocol line into a Point.
+
+    Raises ValueError for malformed lines.
+    """
+    sections = [part for part in splitLineProtocol(line.strip(), ' ') if part]
+    if len(sections) not in (2, 3):
+        raise ValueError("Malformed line: " + line)
+
+    seriesKey = splitLineProtocol(sections[0], ',')
+    point = Point(measurement=unescapeLineProtocol(seriesKey[0]))
+    for tag in seriesKey[1:]:
+        key, _, value = tag.partition('=')
+        point.tags[unescapeLineProtocol(key)] = unescapeLineProtocol(value)
+
+    for item in splitLineProtocol(sections[1], ','):
+        key, separator, value = item.partition('=')
+        if not separator or not value:
+            raise ValueError("Malformed field: " + item)
+        point.fields[unescapeLineProtocol(key)] = parseFieldValue(value)
+
+    if len(sections) == 3:
+        point.timestamp = int(sections[2])
+    return point
+
+
+class ConnectionManager:
+    """Keep-alive HTTP session shared by the InfluxDB client and the weather fetcher.
+
+    Reusing pooled connections avoids a TCP connect and TLS handshake on every
+    request, which is a noticeable share of a refresh on a Pi-class CPU.
+    """
+
+    def __init__(self, poolSize=None, retries=None, connectTimeout=None, readTimeout=None):
+        self.poolSize = poolSize or CONFIG['HTTP_POOL_SIZE']
+        self.timeout = (
+            connectTimeout or CONFIG['HTTP_CONNECT_TIMEOUT_S'],
+            readTimeout or CONFIG['HTTP_READ_TIMEOUT_S'],
+        )
+        self.retries = CONFIG['HTTP_RETRIES'] if retries is None else retries
+        self.lock = threading.Lock()
+        self.adapter = None
+        self.influxAdapter = None
+        self._session = None
+
+    @property
+    def session(self):
+        """The shared requests.Session, created (and requests imported) on first use."""
+        with self.lock:
+            if self._session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                session = requests.Session()
+                session.headers['Accept-Encoding'] = 'gzip'
+                self.adapter = HTTPAdapter(
+                    pool_connections=self.poolSize,
+                    pool_maxsize=self.poolSize,
+                    max_retries=self.retries,
+                )
+                self.mountAdapter(session)
+                self._session = session
+            return self._session
+
+    def mountAdapter(self, session):
+        session.mount('http://', self.adapter)
+        session.mount('https://', self.adapter)
+
+    def get(self, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        return self.session.get(url, **kwargs)
+
+    def influxClient(self, host, port):
+        """Build an InfluxDBClient on the shared session that makes one attempt per query.
+
+        The client's retries count includes the first attempt (0 would retry
+        forever), and the InfluxDB server gets an adapter without connection
+        retries, so every failure reaches the caller.
+        """
+        from requests.adapters import HTTPAdapter
+
+        session = self.session
+        client = InfluxDBClient(
+            host=host,
+            port=port,
+            timeout=self.timeout,
+            retries=1,
+            session=session,
+        )
+        # InfluxDBClient mounts its own adapter for its scheme; restore ours
+        self.mountAdapter(session)
+        if self.influxAdapter is None:
+            self.influxAdapter = HTTPAdapter(
+                pool_connections=self.poolSize,
+                pool_maxsize=self.poolSize,
+                max_retries=0,
+            )
+        session.mount(f'http://{host}:{port}/', self.influxAdapter)
+        return client
+
+    def stats(self):
+        """Return counts of new and reused connections across all pools."""
+        created = served = 0
+        session = self._session
+        # One adapter may be mounted for several schemes
+        adapters = {id(adapter): adapter for adapter in session.adapters.values()} if session else {}
+        for adapter in adapters.values():
+            poolManager = getattr(adapter, 'poolmanager', None)
+            if poolManager is None:
+                continue
+            for key in list(poolManager.pools.keys()):
+                pool = poolManager.pools.get(key)
+                if pool is None:
+                    continue
+                created += pool.num_connections
+                served += pool.num_requests
+        return {
+            'requests': served,
+            'new': created,
+            'reused': max(served - created, 0),
+        }
+
+    def close(self):
+        if self._session is not None:
+            self._session.close()
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of querying while the InfluxDB circuit breaker is open."""
+
+
+class ResilientInfluxClient:
+    """InfluxDB client wrapper with lazy reconnect and a circuit breaker.
+
+    The underlying client is built on first use and rebuilt after a failure.
+    After ``failureThreshold`` consecutive failures the circuit opens and every
+    query fails immediately with CircuitOpenError, so an outage does not cost
+    a timeout per query. Once ``resetTimeout`` has passed, a single probe query
+    is let through (half-open): success closes the circuit, failure opens it
+    again. Query errors reported by a healthy server do not count as failures.
+    The factory should build a client that makes one attempt per query, with
+    no retries in the client or its HTTP adapter (see
+    ConnectionManager.influxClient), so each failed attempt is counted here.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, factory, failureThreshold=3, resetTimeout=60, clock=time.monotonic):
+        self.factory = factory
+        self.failureThreshold = failureThreshold
+        self.resetTimeout = resetTimeout
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.client = None
+        self.state = self.CLOSED
+        self.failures = 0
+        self.openedAt = None
+        self.probing = False
+        self.publishState()
+
+    def isOpen(self):
+        """True while queries would be rejected without a probe being due."""
+        with self.lock:
+            return self.state == self.OPEN and self.clock() - self.openedAt < self.resetTimeout
+
+    def allowRequest(self):
+        with self.lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                if self.clock() - self.openedAt < self.resetTimeout:
+                    return False
+                self.setState(self.HALF_OPEN)
+            # Half-open: exactly one probe at a time
+            if self.probing:
+                return False
+            self.probing = True
+            return True
+
+    def query(self, *args, **kwargs):
+        from influxdb.exceptions import InfluxDBClientError
+
+        if not self.allowRequest():
+            raise CircuitOpenError("InfluxDB circuit breaker is open")
+        try:
+            result = self.connect().query(*args, **kwargs)
+        except InfluxDBClientError:
+            # The server answered, it just rejected the query
+            self.recordSuccess()
+            raise
+        except Exception:
+            self.recordFailure()
+            raise
+        self.recordSuccess()
+        return result
+
+    def connect(self):
+        with self.lock:
+            if self.client is None:
+                self.client = self.factory()
+            return self.client
+
+    def recordSuccess(self):
+        with self.lock:
+            self.failures = 0
+            self.probing = False
+            if self.state != self.CLOSED:
+                self.setState(self.CLOSED)
+
+    def recordFailure(self):
+        with self.lock:
+            self.failures += 1
+            self.probing = False
+            # Reconnect from scratch on the next attempt
+            self.client = None
+            if self.state == self.HALF_OPEN or self.failures >= self.failureThreshold:
+                self.openedAt = self.clock()
+                if self.state != self.OPEN:
+                    self.setState(self.OPEN)
+
+    def setState(self, state):
+        logging.warning("InfluxDB circuit breaker %s -> %s", self.state, state)
+        self.state = state
+        if state == self.OPEN:
+            METRICS.increment('dashboard_influxdb_breaker_trips_total')
+        self.publishState()
+
+    def publishState(self):
+        for state in (self.CLOSED, self.OPEN, self.HALF_OPEN):
+            METRICS.setGauge('dashboard_influxdb_breaker_state', int(state == self.state), state=state)
+
+    def stats(self):
+        with self.lock:
+            return {'state': self.state, 'failures': self.failures}
+
+
+def parseForecast(data):
+    """Turn an Open-Meteo daily forecast response into a list of DayForecast."""
+    daily = data['daily']
+    forecasts = []
+    for i in range(len(daily['time'])):
+        forecasts.append(DayForecast(
+            date=daily['time'][i],
+            temp_max=daily['temperature_2m_max'][i],
+            temp_min=daily['temperature_2m_min'][i],
+            weathercode=daily['weathercode'][i],
+        ))
+    return forecasts
+
+
+def writeFileAtomic(path, text):
+    """Write text to path via a temporary file so readers never see a partial file."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    # A unique name per write, so concurrent writers don't share a temporary file
+    f = tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=directory or '.',
+                                    prefix=os.path.basename(path) + '.', suffix='.tmp', delete=False)
+    try:
+        with f:
+            f.write(text)
+        os.replace(f.name, path)
+    except OSError:
+        os.unlink(f.name)
+        raise
+
+
+class ForecastCache:
+    """Open-Meteo forecast cache with a TTL, a disk copy and conditional revalidation.
+
+    Fresh entries are served from memory. Once the TTL has expired the stale
+    forecast is still returned immediately while a background thread
+    revalidates it, sending If-None-Match / If-Modified-Since when the API
+    provided an ETag or Last-Modified header. Only a cold cache blocks on the
+    network.
+    """
+
+    def __init__(self, connections, path=None, ttl=None, clock=time.time):
+        self.connections = connections
+        self.path = path
+        self.ttl = ttl
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.forecasts = None
+        self.fetchedAt = 0
+        self.etag = None
+        self.lastModified = None
+        self.refreshThread = None
+        self.load()
+
+    def get(self):
+        with self.lock:
+            forecasts = self.forecasts
+            fresh = self.clock() - self.fetchedAt < self.ttl
+
+        if forecasts is None:
+            return self.refresh()
+        if not fresh:
+            self.refreshInBackground()
+        return forecasts
+
+    def refreshInBackground(self):
+        with self.lock:
+            if self.refreshThread is not None and self.refreshThread.is_alive():
+                return
+            self.refreshThread = threading.Thread(target=self.refreshQuietly, daemon=True)
+            self.refreshThread.start()
+
+    def refreshQuietly(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            logging.error("Failed to revalidate weather: %s", e)
+
+    def refresh(self, conditional=True):
+        headers = {}
+        if conditional and self.etag:
+            headers['If-None-Match'] = self.etag
+        if conditional and self.lastModified:
+            headers['If-Modified-Since'] = self.lastModified
+
+        with METRICS.timer('dashboard_open_meteo_request_seconds'):
+            response = self.connections.get(
+                CONFIG['OPEN_METEO_URL'],
+                params=CONFIG['OPEN_METEO_PARAMS'],
+                headers=headers,
+            )
+        METRICS.increment('dashboard_open_meteo_responses_total', status=response.status_code)
+        if response.status_code == 304 and conditional:
+            with self.lock:
+                forecasts = self.forecasts
+                if forecasts is None:
+                    # A validator from the disk copy without its body: nothing to serve
+                    self.etag = self.lastModified = None
+                else:
+                    self.fetchedAt = self.clock()
+            if forecasts is None:
+                logging.warning("Forecast not modified but none cached, fetching it again")
+                return self.refresh(conditional=False)
+            logging.debug("Forecast not modified")
+        else:
+            response.raise_for_status()
+            forecasts = parseForecast(response.json())
+            with self.lock:
+                self.forecasts = forecasts
+                self.fetchedAt = self.clock()
+                self.etag = response.headers.get('ETag')
+                self.lastModified = response.headers.get('Last-Modified')
+        self.save()
+        return forecasts
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+            self.forecasts = [DayForecast(**fc) for fc in data['forecasts']]
+            self.fetchedAt = data['fetchedAt']
+            self.etag = data.get('etag')
+            self.lastModified = data.get('lastModified')
+        except Exception as e:
+            logging.error("Failed to load forecast cache %s: %s", self.path, e)
+
+    def save(self):
+        if not self.path:
+            return
+        with self.lock:
+            data = {
+                'fetchedAt': self.fetchedAt,
+                'etag': self.etag,
+                'lastModified': self.lastModified,
+                'forecasts': [asdict(fc) for fc in self.forecasts],
+            }
+        try:
+            writeFileAtomic(self.path, json.dumps(data))
+        except OSError as e:
+            logging.error("Failed to save forecast cache %s: %s", self.path, e)
+
+
+VALUE_TYPES = {'Measure': Measure, 'Moisture': Moisture}
+
+
+def encodeValue(value):
+    """JSON-ready form of a Measure, Moisture or DayForecast list."""
+    if isinstance(value, list):
+        return {'type': 'DayForecast', 'value': [asdict(fc) for fc in value]}
+    return {'type': type(value).__name__, 'value': asdict(value)}
+
+
+def decodeValue(entry):
+    if entry['type'] == 'DayForecast':
+        return [DayForecast(**fc) for fc in entry['value']]
+    return VALUE_TYPES[entry['type']](**entry['value'])
+
+
+class SnapshotStore:
+    """Persist the last rendered value of every widget in a small JSON file.
+
+    The file is replaced atomically, so a power cut during a write leaves the
+    previous snapshot intact.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def save(self, rendered):
+        if not self.path:
+            return
+        data = {key: encodeValue(value) for key, value in rendered.items()}
+        try:
+            writeFileAtomic(self.path, json.dumps(data))
+        except OSError as e:
+            logging.error("Failed to save snapshot %s: %s", self.path, e)
+
+    def load(self):
+        """Return {widget key: Measure | Moisture | [DayForecast]}; empty if unavailable."""
+        if not self.path or not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+            return {key: decodeValue(entry) for key, entry in data.items()}
+        except Exception as e:
+            logging.error("Failed to load snapshot %s: %s", self.path, e)
+            return {}
+
+
+def dataEntries(data):
+    """Flatten collected data into {entry key: JSON-ready value} for SnapshotHub."""
+    entries = {}
+    for alias, value in (data.get('latest') or {}).items():
+        if value is not None:
+            entries['latest/' + alias] = encodeValue(value)
+    if data.get('forecasts'):
+        entries['forecasts'] = encodeValue(data['forecasts'])
+    if data.get('illumination') is not None:
+        entries['illumination'] = data['illumination']
+    return entries
+
+
+def entriesData(entries):
+    """The inverse of dataEntries: the data dict applyData takes."""
+    data = {'latest': {}}
+    for key, entry in entries.items():
+        if key.startswith('latest/'):
+            data['latest'][key[len('latest/'):]] = decodeValue(entry)
+        elif key == 'forecasts':
+            data['forecasts'] = decodeValue(entry)
+        elif key == 'illumination':
+            data['illumination'] = entry
+    return data
+
+
+class SnapshotHub:
+    """Versioned copy of the aggregated data that subscribers catch up with.
+
+    Each publish that changes an entry bumps the version and keeps the changed
+    entries as a delta. A subscriber sends the hub id and version it has and
+    gets the entries changed since, or everything if it is new, too far behind
+    or was following a hub that has since restarted. Published from the GUI
+    thread, read from the HTTP server's threads.
+    """
+
+    def __init__(self, keep):
+        self.id = f'{os.getpid()}-{time.time_ns()}'
+        self.condition = threading.Condition()
+        self.version = 0
+        self.entries = {}
+        self.deltas = deque(maxlen=keep)
+
+    def publish(self, data):
+        """Merge collected data in; returns the version after it."""
+        with self.condition:
+            changes = {key: entry for key, entry in dataEntries(data).items() if self.entries.get(key) != entry}
+            if changes:
+                self.version += 1
+                self.entries.update(changes)
+                self.deltas.append((self.version, changes))
+                self.condition.notify_all()
+            return self.version
+
+    def since(self, version, hubId=None, timeout=0):
+        """Return the update from version to the current one as a JSON-ready dict.
+
+        A subscriber that is up to date is held for up to timeout seconds until
+        something changes, so it learns of the change straight away.
+        """
+        if hubId != self.id:
+            version = 0
+        with self.condition:
+            self.condition.wait_for(lambda: self.version != version, timeout)
+            if version == self.version:
+                changes, full = {}, False
+            elif 0 < version < self.version and self.deltas and self.deltas[0][0] <= version + 1:
+                changes, full = {}, False
+                for deltaVersion, delta in self.deltas:
+                    if deltaVersion > version:
+                        changes.update(delta)
+            else:
+                changes, full = dict(self.entries), True
+            return {'id': self.id, 'version': self.version, 'full': full, 'changes': changes}
+
+
+class SnapshotServer(BackgroundHttpServer):
+    """Serve a SnapshotHub at /snapshot?id=..&since=<version>&timeout=<seconds> as JSON."""
+
+    name = 'snapshots'
+    path = '/snapshot'
+
+    def __init__(self, hub, host, port, maxWait):
+        super().__init__(host, port)
+        self.hub = hub
+        self.maxWait = maxWait
+
+    def respond(self, path, params):
+        if path != '/snapshot':
+            return None
+        try:
+            version = int(params.get('since', ['0'])[0])
+            wait = min(max(float(params.get('timeout', ['0'])[0]), 0), self.maxWait)
+        except ValueError:
+            return 400, 'text/plain; charset=utf-8', b'since and timeout must be numbers\n'
+        update = self.hub.since(version, params.get('id', [None])[0], wait)
+        kind = 'full' if update['full'] else 'delta' if update['changes'] else 'empty'
+        METRICS.increment('dashboard_aggregator_responses_total', kind=kind)
+        return 200, 'application/json', json.dumps(update).encode('utf-8')
+
+
+class SnapshotSubscriber(QObject):
+    """Follow an aggregator's /snapshot endpoint from a background thread.
+
+    Every update is turned into the data dict applyData takes and emitted as
+    `received` on the GUI thread. Failed requests back off up to
+    POLL_BACKOFF_MAX_S, like failed polls.
+    """
+
+    received = pyqtSignal(object)
+
+    def __init__(self, url, get, wait, parent=None):
+        super().__init__(parent)
+        self.url = url
+        self.get = get
+        self.wait = wait
+        self.hubId = None
+        self.version = 0
+        self.stopping = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        logging.info("Following aggregator at %s", self.url)
+
+    def run(self):
+        failures = 0
+        while not self.stopping.is_set():
+            try:
+                update = self.fetch()
+            except Exception as e:
+                failures += 1
+                delay = min(2 ** failures, CONFIG['POLL_BACKOFF_MAX_S'])
+                logging.warning("Aggregator request failed (%s), retrying in %ds", e, delay)
+                METRICS.increment('dashboard_errors_total', source='aggregator')
+                self.stopping.wait(delay)
+                continue
+            failures = 0
+            if update['changes'] and not self.stopping.is_set():
+                self.received.emit(entriesData(update['changes']))
+
+    def fetch(self):
+        """Make one long-poll request and advance to the version it returns."""
+        params = {'since': self.version, 'timeout': self.wait}
+        if self.hubId is not None:
+            params['id'] = self.hubId
+        response = self.get(self.url, params=params,
+                            timeout=(CONFIG['HTTP_CONNECT_TIMEOUT_S'], self.wait + CONFIG['HTTP_READ_TIMEOUT_S']))
+        response.raise_for_status()
+        update = response.json()
+        self.hubId = update['id']
+        self.version = update['version']
+        return update
+
+    def close(self):
+        # The thread exits once its current request returns
+        self.stopping.set()
+
+
+async def gatherSources(sources, executor=None):
+    """Run blocking source callables concurrently and collect their results.
+
+    ``sources`` maps a name to a zero-argument callable. The InfluxDB and HTTP
+    clients are blocking, so each call is dispatched to ``executor`` and the
+    event loop awaits them together: a cycle costs as much as its slowest
+    source, not the sum. A failing source yields None instead of aborting the
+    others.
+    """
+    loop = asyncio.get_running_loop()
+    names = list(sources)
+    results = await asyncio.gather(
+        *(loop.run_in_executor(executor, sources[name]) for name in names),
+        return_exceptions=True,
+    )
+    collected = {}
+    for name, result in zip(names, results):
+        if isinstance(result, Exception):
+            logging.error("Failed to read %s: %s", name, result)
+            result = None
+        collected[name] = result
+    return collected
+
+
+def collectSources(sources, executor=None):
+    """Synchronous entry point for gatherSources, e.g. from a worker thread."""
+    return asyncio.run(gatherSources(sources, executor))
+
+
+class AssetRegistry:
+    """Process-wide pixmap cache so every image is decoded only once.
+
+    Pixmaps are keyed by file and target size, and shared by every widget that
+    shows them. Scaled variants are rendered at the screen's device pixel
+    ratio so they stay sharp without rescaling at paint time.
+    """
+
+    LEVEL_ICON_COUNT = 5
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.pixmaps = {}
+        self.levelIconSets = {}
+
+    def path(self, name, dark=False):
+        return os.path.join(self.directory, name + ('_dark' if dark else '') + '.png')
+
+    def devicePixelRatio(self):
+        app = QApplication.instance()
+        screen = app.primaryScreen() if app else None
+        return screen.devicePixelRatio() if screen else 1.0
+
+    def pixmap(self, path, size=None):
+        """Return the shared pixmap for an image file, optionally scaled to size x size."""
+        dpr = self.devicePixelRatio() if size else 1.0
+        key = (path, size, dpr)
+        pixmap = self.pixmaps.get(key)
+        if pixmap is None:
+            if size:
+                pixmap = self.pixmap(path).scaled(
+                    round(size * dpr), round(size * dpr),
+                    Qt.AspectRatioMode.KeepAspectRatio,
+                    Qt.TransformationMode.SmoothTransformation,
+                )
+                pixmap.setDevicePixelRatio(dpr)
+            else:
+                pixmap = QPixmap(path)
+            self.pixmaps[key] = pixmap
+        return pixmap
+
+    def themed(self, name, dark=False, size=None):
+        return self.pixmap(self.path(name, dark), size)
+
+    def levelIcons(self, dark=False, size=None):
+        """Return the shared list of moisture level icons for a theme."""
+        key = (dark, size)
+        icons = self.levelIconSets.get(key)
+        if icons is None:
+            icons = [self.themed(f'level{i}', dark, size) for i in range(1, self.LEVEL_ICON_COUNT + 1)]
+            self.levelIconSets[key] = icons
+        return icons
+
+
+ASSETS = AssetRegistry(CONFIG['IMAGES_DIR'])
+
+
+@dataclass
+class SourceSchedule:
+    interval: float
+    minInterval: float
+    maxInterval: float
+    current: float = 0
+    nextDue: float = 0
+    failures: int = 0
+
+
+class PollScheduler:
+    """Decide when each data source is due for its next poll.
+
+    A source starts at its base interval. When a poll returns each sensor's
+    newest timestamp and cadence (the gap between its two newest readings),
+    the next poll is planned for when the earliest sensor should have written
+    its next reading, within the source's range. A sensor that is already
+    overdue is checked again one cadence later. Without cadences the source
+    keeps its base interval. Failures back off exponentially with jitter,
+    starting from the source's minimum interval.
+    """
+
+    # Allowance for a reading to reach the database after its timestamp
+    SETTLE_S = 5
+
+    def __init__(self, schedules, backoffMax, clock=time.monotonic, jitter=random.random, wallClock=time.time):
+        self.schedules = schedules
+        self.backoffMax = backoffMax
+        self.clock = clock
+        self.jitter = jitter
+        # Sensor timestamps are epochs, so expected readings are planned on the wall clock
+        self.wallClock = wallClock
+        now = self.clock()
+        for schedule in self.schedules.values():
+            schedule.current = schedule.interval
+            schedule.nextDue = now
+
+    @classmethod
+    def fromConfig(cls, sources, backoffMax, **kwargs):
+        return cls({
+            name: SourceSchedule(spec['interval'], spec['min'], spec['max'])
+            for name, spec in sources.items()
+        }, backoffMax, **kwargs)
+
+    def due(self):
+        now = self.clock()
+        return [name for name, schedule in self.schedules.items() if schedule.nextDue <= now]
+
+    def begin(self, names):
+        """Mark sources as in flight so they are not picked again before their result."""
+        for name in names:
+            self.schedules[name].nextDue = math.inf
+
+    def nextDelay(self):
+        """Seconds until the next source is due."""
+        nextDue = min(schedule.nextDue for schedule in self.schedules.values())
+        if nextDue == math.inf:
+            return None
+        return max(0.0, nextDue - self.clock())
+
+    def clamp(self, schedule, interval):
+        return min(max(interval, schedule.minInterval), schedule.maxInterval)
+
+    def recordSuccess(self, name, timestamps=None, cadences=None):
+        """Record a successful poll.
+
+        timestamps maps sensor key to its newest epoch, cadences to the seconds
+        between its two newest readings.
+        """
+        schedule = self.schedules[name]
+        schedule.failures = 0
+        now = self.wallClock()
+        waits = []
+        for key, cadence in (cadences or {}).items():
+            timestamp = (timestamps or {}).get(key)
+            if timestamp is None or cadence <= 0:
+                continue
+            expected = timestamp + cadence + self.SETTLE_S
+            waits.append(expected - now if expected > now else cadence)
+        schedule.current = self.clamp(schedule, min(waits)) if waits else schedule.interval
+        schedule.nextDue = self.clock() + schedule.current
+
+    def recordFailure(self, name):
+        schedule = self.schedules[name]
+        schedule.failures += 1
+        # Retry soon after a first failure (e.g. booting before the network is up)
+        delay = min(schedule.minInterval * 2 ** (schedule.failures - 1), self.backoffMax)
+        # Equal jitter keeps several kiosks from retrying in lockstep
+        delay = delay / 2 + self.jitter() * delay / 2
+        schedule.nextDue = self.clock() + delay
+        logging.debug("Polling %s failed %d time(s), retrying in %.0fs", name, schedule.failures, delay)
+
+
+class TaskSignals(QObject):
+    finished = pyqtSignal(object)
+
+
+class Task(QRunnable):
+    """Run a callable on a thread pool and deliver its result through a signal.
+
+    The signal is emitted from the worker thread, so slots on GUI objects are
+    invoked through a queued connection on the GUI thread.
+    """
+
+    def __init__(self, fn, *args):
+        super(Task, self).__init__()
+        self.fn = fn
+        self.args = args
+        self.signals = TaskSignals()
+
+    def run(self):
+        try:
+            result = self.fn(*self.args)
+        except Exception as e:
+            logging.error("Background task failed: %s", e)
+            result = None
+        self.signals.finished.emit(result)
+
+
+class LineProtocolListener(QObject):
+    """Receive line-protocol points over UDP and emit them as Point objects.
+
+    The socket is serviced by the Qt event loop, so no extra thread is needed.
+    An InfluxDB 1.x subscription with a udp:// destination can feed it directly.
+    """
+
+    pointReceived = pyqtSignal(object)
+
+    def __init__(self, host, port, parent=None):
+        super(LineProtocolListener, self).__init__(parent)
+        self.host = host
+        self.requestedPort = port
+        self.socket = QUdpSocket(self)
+        self.socket.readyRead.connect(self.readPending)
+
+    def start(self):
+        if not self.socket.bind(QHostAddress(self.host), self.requestedPort):
+            logging.error("Failed to listen for pushed points on %s:%s: %s",
+                          self.host, self.requestedPort, self.socket.errorString())
+            return False
+        logging.info("Listening for pushed points on %s:%d", self.host, self.port())
+        return True
+
+    def port(self):
+        return self.socket.localPort()
+
+    def close(self):
+        self.socket.close()
+
+    def readPending(self):
+        while self.socket.hasPendingDatagrams():
+            datagram = self.socket.receiveDatagram()
+            payload = bytes(datagram.data()).decode('utf-8', errors='replace')
+            for line in payload.splitlines():
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                try:
+                    point = parseLineProtocol(line)
+                except ValueError as e:
+                    logging.warning("Ignoring pushed point: %s", e)
+                    continue
+                self.pointReceived.emit(point)
+
+
 class Color(QFrame):
     def __init__(self, color):
         super(Color, self).__init__()
@@ -73,7 +2166,72 @@ class Color(QFrame):
         palette.setColor(QPalette.ColorRole.Window, QColor(color))
         self.setPalette(palette)
 
+class TitleLabel(QWidget):
+    """Centered one-line title painted from a cached QStaticText.
+
+    Titles never change, so the text is laid out once instead of on every
+    paint as QLabel does.
+    """
+
+    def __init__(self, text, font):
+        super(TitleLabel, self).__init__()
+        self.setFont(font)
+        self.staticText = QStaticText(text)
+        self.staticText.setTextFormat(Qt.TextFormat.PlainText)
+        self.staticText.prepare(font=font)
+        metrics = QFontMetrics(font)
+        self.hint = QSize(metrics.horizontalAdvance(text), metrics.height())
+
+    def text(self):
+        return self.staticText.text()
+
+    def sizeHint(self):
+        return self.hint
+
+    def minimumSizeHint(self):
+        return self.hint
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.setFont(self.font())
+        painter.setPen(self.palette().color(QPalette.ColorRole.WindowText))
+        size = self.staticText.size()
+        painter.drawStaticText(QPointF((self.width() - size.width()) / 2, (self.height() - size.height()) / 2),
+                               self.staticText)
+
+
+def fixTextSize(label, template):
+    """Give label a fixed size that fits template with any digits in place of its 0s.
+
+    A label with a fixed size does not invalidate its layout on setText, so
+    value updates repaint just the label instead of re-laying out the tile.
+    """
+    metrics = label.fontMetrics()
+    widest = max('0123456789', key=metrics.horizontalAdvance)
+    margins = label.contentsMargins()
+    label.setFixedSize(
+        metrics.horizontalAdvance(template.replace('0', widest)) + margins.left() + margins.right(),
+        metrics.height() + margins.top() + margins.bottom(),
+    )
+
+
+def makeTextPalette(color):
+    # Only WindowText is set, every other role keeps following the theme
+    palette = QPalette()
+    palette.setColor(QPalette.ColorRole.WindowText, QColor(color))
+    return palette
+
+
+# Widest texts the value and timestamp labels are sized for ("-10.5" fits in "100.0")
+VALUE_TEMPLATE = "100.0"
+TIMESTAMP_TEMPLATE = "Last updated: 00:00:00 00/00/0000"
+STATS_TEMPLATE = "{window} min -00.0 max -00.0 · off-band 100%"
+
+
 class DashboardWidget(QFrame):
+    # Humidity outside this range is shown in red and counted as off-band time
+    HUMIDITY_BAND = (40, 60)
+
     def __init__(self, widgetTitle):
         super(DashboardWidget, self).__init__()
         labelFont = QFont("Arial", 60)
@@ -88,11 +2246,9 @@ class DashboardWidget(QFrame):
 
         titleLayout = QVBoxLayout()
 
-        titleLabel = QLabel(widgetTitle)
-        titleLabel.setAlignment(Qt.AlignmentFlag.AlignCenter)
         titleFont = QFont("Arial", 40)
         titleFont.setBold(True)
-        titleLabel.setFont(titleFont)
+        titleLabel = TitleLabel(widgetTitle, titleFont)
 
         titleLayout.addWidget(titleLabel)
 
@@ -104,28 +2260,26 @@ class DashboardWidget(QFrame):
         self.labelTemperature = QLabel("36")
         self.labelTemperature.setAlignment(Qt.AlignmentFlag.AlignCenter)
         self.labelTemperature.setFont(labelFont)
+        fixTextSize(self.labelTemperature, VALUE_TEMPLATE)
 
         self.labelHumidity = QLabel("45")
         self.labelHumidity.setAlignment(Qt.AlignmentFlag.AlignCenter)
         self.labelHumidity.setFont(labelFont)
+        fixTextSize(self.labelHumidity, VALUE_TEMPLATE)
 
-        self.colorEffect = QGraphicsColorizeEffect()
-        self.colorEffect.setColor(QColor("red"))
-        self.labelHumidity.setGraphicsEffect(self.colorEffect)
-
-        # Preload light and dark pixmaps
-        self.temperaturePixmap_light = QPixmap('images/temperature.png')
-        self.temperaturePixmap_dark = QPixmap('images/temperature_dark.png')
-        self.humidityPixmap_light = QPixmap('images/humidity.png')
-        self.humidityPixmap_dark = QPixmap('images/humidity_dark.png')
+        # The out-of-range state is a palette swap; 'black' follows the theme's text color
+        self.humidityPalettes = {'red': makeTextPalette('red'), 'black': QPalette()}
+        self.labelHumidity.setPalette(self.humidityPalettes['red'])
+        self.currentHumidityColor = 'red'
+        self.currentTimestamp = None
 
         self.temperatureIcon = QLabel()
         self.temperatureIcon.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        self.temperatureIcon.setPixmap(self.temperaturePixmap_light)
 
         self.humidityIcon = QLabel()
         self.humidityIcon.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        self.humidityIcon.setPixmap(self.humidityPixmap_light)
+
+        self.setIcons(dark=False)
 
         bodyLayout.addWidget(self.temperatureIcon, 0, 0)
         bodyLayout.addWidget(self.humidityIcon, 1, 0)
@@ -139,37 +2293,62 @@ class DashboardWidget(QFrame):
         self.timestampLabel.setAlignment(Qt.AlignmentFlag.AlignCenter)
         timestampFont = QFont("Arial", 10)
         self.timestampLabel.setFont(timestampFont)
+        fixTextSize(self.timestampLabel, TIMESTAMP_TEMPLATE)
+
+        # Rolling statistics section
+        self.statsLabel = QLabel()
+        self.statsLabel.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.statsLabel.setFont(timestampFont)
+        self.statsWindow = formatDuration(CONFIG['STATS_WINDOW_S'])
+        fixTextSize(self.statsLabel, STATS_TEMPLATE.format(window=self.statsWindow))
+        self.updateStats(None, None, None)
 
         layout.addWidget(title)
         layout.addWidget(body)
-        layout.addWidget(self.timestampLabel)
+        layout.addWidget(self.statsLabel, alignment=Qt.AlignmentFlag.AlignHCenter)
+        layout.addWidget(self.timestampLabel, alignment=Qt.AlignmentFlag.AlignHCenter)
 
         self.setLayout(layout)
 
-    def updateValues(self, temperature, humidity, timestamp_iso):
-        self.labelTemperature.setText(f"{temperature:.1f}")
-        self.labelHumidity.setText(f"{humidity:.1f}")
-
-        self.colorEffect = QGraphicsColorizeEffect()
-        self.colorEffect.setColor(QColor(self.humidityColor(humidity)))
-        self.labelHumidity.setGraphicsEffect(self.colorEffect)
-
-        formatted = format_timestamp(timestamp_iso)
-        self.timestampLabel.setText(f"Last updated: {formatted}")
+    def updateStats(self, low, high, offBand):
+        """Show the rolling temperature range and the share of time humidity was off-band."""
+        low = '--' if low is None else f"{low:.1f}"
+        high = '--' if high is None else f"{high:.1f}"
+        offBand = '--' if offBand is None else f"{offBand:.0%}"
+        text = f"{self.statsWindow} min {low} max {high} · off-band {offBand}"
+        if text != self.statsLabel.text():
+            self.statsLabel.setText(text)
+
+    def updateValues(self, temperature, humidity, timestamp):
+        self.labelTemperature.setText('--' if temperature is None else f"{temperature:.1f}")
+        self.labelHumidity.setText('--' if humidity is None else f"{humidity:.1f}")
+
+        color = self.humidityColor(humidity)
+        if color != self.currentHumidityColor:
+            self.labelHumidity.setPalette(self.humidityPalettes[color])
+            self.currentHumidityColor = color
+
+        if timestamp != self.currentTimestamp:
+            formatted = TIMESTAMPS.format(timestamp)
+            self.timestampLabel.setText(f"Last updated: {formatted}")
+            self.currentTimestamp = timestamp
 
     def humidityColor(self, humidity):
-        if humidity < 40 or humidity > 60:
+        low, high = self.HUMIDITY_BAND
+        if humidity is not None and (humidity < low or humidity > high):
             return 'red'
         else:
             return 'black'
 
+    def setIcons(self, dark):
+        self.temperatureIcon.setPixmap(ASSETS.themed('temperature', dark, CONFIG['ICON_SIZE']))
+        self.humidityIcon.setPixmap(ASSETS.themed('humidity', dark, CONFIG['ICON_SIZE']))
+
     def setDarkTheme(self):
-        self.temperatureIcon.setPixmap(self.temperaturePixmap_dark)
-        self.humidityIcon.setPixmap(self.humidityPixmap_dark)
+        self.setIcons(dark=True)
 
     def setLightTheme(self):
-        self.temperatureIcon.setPixmap(self.temperaturePixmap_light)
-        self.humidityIcon.setPixmap(self.humidityPixmap_light)
+        self.setIcons(dark=False)
 
 class DashboardLevelWidget(QFrame):
     currentLevel = 0
@@ -189,11 +2368,9 @@ class DashboardLevelWidget(QFrame):
 
         titleLayout = QVBoxLayout()
 
-        titleLabel = QLabel(widgetTitle)
-        titleLabel.setAlignment(Qt.AlignmentFlag.AlignCenter)
         titleFont = QFont("Arial", 40)
         titleFont.setBold(True)
-        titleLabel.setFont(titleFont)
+        titleLabel = TitleLabel(widgetTitle, titleFont)
 
         titleLayout.addWidget(titleLabel)
 
@@ -202,31 +2379,17 @@ class DashboardLevelWidget(QFrame):
         body = QWidget()
         bodyLayout = QHBoxLayout()
 
-        iconPixmap = QPixmap(icon)
         iconLabel = QLabel()
         iconLabel.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        iconLabel.setPixmap(iconPixmap)
-
-        self.levelIcons_light = []
-        self.levelIcons_light.append(QPixmap('images/level1.png'))
-        self.levelIcons_light.append(QPixmap('images/level2.png'))
-        self.levelIcons_light.append(QPixmap('images/level3.png'))
-        self.levelIcons_light.append(QPixmap('images/level4.png'))
-        self.levelIcons_light.append(QPixmap('images/level5.png'))
-
-        self.levelIcons_dark = []
-        self.levelIcons_dark.append(QPixmap('images/level1_dark.png'))
-        self.levelIcons_dark.append(QPixmap('images/level2_dark.png'))
-        self.levelIcons_dark.append(QPixmap('images/level3_dark.png'))
-        self.levelIcons_dark.append(QPixmap('images/level4_dark.png'))
-        self.levelIcons_dark.append(QPixmap('images/level5_dark.png'))
+        iconLabel.setPixmap(ASSETS.pixmap(icon, CONFIG['ICON_SIZE']))
 
-        self.levelIcons = self.levelIcons_light
+        self.levelIcons = ASSETS.levelIcons(dark=False, size=CONFIG['ICON_SIZE'])
 
         levelPixmap = self.levelIcons[0]
         self.iconLevel = QLabel()
         self.iconLevel.setAlignment(Qt.AlignmentFlag.AlignCenter)
         self.iconLevel.setPixmap(levelPixmap)
+        self.currentIcon = levelPixmap
 
         bodyLayout.addWidget(iconLabel)
         bodyLayout.addWidget(self.iconLevel)
@@ -238,21 +2401,27 @@ class DashboardLevelWidget(QFrame):
         self.timestampLabel.setAlignment(Qt.AlignmentFlag.AlignCenter)
         timestampFont = QFont("Arial", 10)
         self.timestampLabel.setFont(timestampFont)
+        fixTextSize(self.timestampLabel, TIMESTAMP_TEMPLATE)
 
         layout.addWidget(title)
         layout.addWidget(body)
-        layout.addWidget(self.timestampLabel)
+        layout.addWidget(self.timestampLabel, alignment=Qt.AlignmentFlag.AlignHCenter)
 
         self.setLayout(layout)
 
-    def updateValues(self, value, timestamp_iso):
-        self.iconLevel.setPixmap(self.getLevelIcon(value))
+    def updateValues(self, value, timestamp):
+        # Without a reading keep the last level rather than showing a dry plant
+        if value is not None:
+            self.currentLevel = value
+        icon = self.getLevelIcon(self.currentLevel)
+        if icon is not self.currentIcon:
+            self.iconLevel.setPixmap(icon)
+            self.currentIcon = icon
 
-        self.currentLevel = value
-        self.currentTimestamp = timestamp_iso
-
-        formatted = format_timestamp(timestamp_iso)
-        self.timestampLabel.setText(f"Last updated: {formatted}")
+        if timestamp != self.currentTimestamp:
+            formatted = TIMESTAMPS.format(timestamp)
+            self.timestampLabel.setText(f"Last updated: {formatted}")
+            self.currentTimestamp = timestamp
 
     def getLevelIcon(self, level):
         if level < 3:
@@ -267,11 +2436,11 @@ class DashboardLevelWidget(QFrame):
             return self.levelIcons[4]
 
     def setDarkTheme(self):
-        self.levelIcons = self.levelIcons_dark
+        self.levelIcons = ASSETS.levelIcons(dark=True, size=CONFIG['ICON_SIZE'])
         self.updateValues(self.currentLevel, self.currentTimestamp)
 
     def setLightTheme(self):
-        self.levelIcons = self.levelIcons_light
+        self.levelIcons = ASSETS.levelIcons(dark=False, size=CONFIG['ICON_SIZE'])
         self.updateValues(self.currentLevel, self.currentTimestamp)
 
 WMO_DESCRIPTIONS = {
@@ -301,11 +2470,9 @@ class DashboardWeatherWidget(QFrame):
         title = QWidget()
         title.setFixedHeight(80)
         titleLayout = QVBoxLayout()
-        titleLabel = QLabel("ПРОГНОЗ")
-        titleLabel.setAlignment(Qt.AlignmentFlag.AlignCenter)
         titleFont = QFont("Arial", 40)
         titleFont.setBold(True)
-        titleLabel.setFont(titleFont)
+        titleLabel = TitleLabel("ПРОГНОЗ", titleFont)
         titleLayout.addWidget(titleLabel)
         title.setLayout(titleLayout)
 
@@ -348,10 +2515,11 @@ class DashboardWeatherWidget(QFrame):
         self.timestampLabel.setAlignment(Qt.AlignmentFlag.AlignCenter)
         timestampFont = QFont("Arial", 10)
         self.timestampLabel.setFont(timestampFont)
+        fixTextSize(self.timestampLabel, TIMESTAMP_TEMPLATE)
 
         layout.addWidget(title)
         layout.addWidget(body)
-        layout.addWidget(self.timestampLabel)
+        layout.addWidget(self.timestampLabel, alignment=Qt.AlignmentFlag.AlignHCenter)
 
         self.setLayout(layout)
 
@@ -373,196 +2541,746 @@ class DashboardWeatherWidget(QFrame):
         pass
 
 
+class DashboardViewModel:
+    """Last rendered state per widget key, so unchanged values never reach Qt.
+
+    Values are the Measure, Moisture or DayForecast list for a widget. A value
+    equal to the one already on screen is skipped, and the widgets in turn
+    only touch the labels whose text, color or timestamp actually changed.
+    """
+
+    def __init__(self, widgets):
+        self.widgets = widgets
+        self.rendered = {}
+        self.stale = set()
+        self.updated = 0
+        self.skipped = 0
+
+    def beginCycle(self):
+        self.updated = 0
+        self.skipped = 0
+
+    def render(self, key, value, stale=False):
+        """Show value on the widget for key. Returns True if anything was pushed.
+
+        Stale values (e.g. restored from a snapshot) are shown greyed out until
+        fresh data for the same key arrives.
+        """
+        if value is None:
+            return False
+        widget = self.widgets[key]
+        if stale:
+            self.stale.add(key)
+            widget.setEnabled(False)
+        elif key in self.stale:
+            self.stale.discard(key)
+            widget.setEnabled(True)
+
+        if self.rendered.get(key) == value:
+            self.skipped += 1
+            return False
+
+        if isinstance(value, Measure):
+            widget.updateValues(value.temperature, value.humidity, value.timestamp)
+        elif isinstance(value, Moisture):
+            widget.updateValues(value.value, value.timestamp)
+        else:
+            widget.updateValues(value)
+
+        self.rendered[key] = value
+        self.updated += 1
+        return True
+
+
+def makePalette(window, windowText):
+    palette = QPalette()
+    palette.setColor(QPalette.Window, window)
+    palette.setColor(QPalette.WindowText, windowText)
+    return palette
+
+
+class ThemeController:
+    """Decide when to switch between the light and dark theme.
+
+    The dark theme starts below ``threshold`` lux, but light only returns at
+    ``threshold + hysteresis``, and a theme is kept for at least ``minDwell``
+    seconds after a switch. Around dusk the sensor hovers near the threshold;
+    without this the whole window would repaint back and forth every minute.
+    """
+
+    LIGHT = 'light'
+    DARK = 'dark'
+
+    def __init__(self, threshold, hysteresis=0, minDwell=0, clock=time.monotonic):
+        self.threshold = threshold
+        self.hysteresis = hysteresis
+        self.minDwell = minDwell
+        self.clock = clock
+        self.theme = None
+        self.switchedAt = None
+        self.palettes = {
+            self.LIGHT: makePalette(QColor(255, 255, 255), QColor(0, 0, 0)),
+            self.DARK: makePalette(QColor(45, 45, 45), QColor(255, 255, 255)),
+        }
+
+    def decide(self, illumination):
+        """Return the theme to switch to, or None if the current one should stay."""
+        if self.theme == self.DARK:
+            target = self.LIGHT if illumination >= self.threshold + self.hysteresis else self.DARK
+        else:
+            target = self.DARK if illumination < self.threshold else self.LIGHT
+
+        if target == self.theme:
+            return None
+        # The very first decision is applied immediately, later ones respect the dwell time
+        if self.switchedAt is not None and self.clock() - self.switchedAt < self.minDwell:
+            logging.debug("Theme switch to %s deferred by dwell time", target)
+            return None
+
+        if self.theme is not None:
+            self.switchedAt = self.clock()
+        self.theme = target
+        return target
+
+    def palette(self, theme):
+        return self.palettes[theme]
+
+
+def encodePng(image):
+    buffer = QBuffer()
+    buffer.open(QIODevice.OpenModeFlag.WriteOnly)
+    image.save(buffer, 'PNG')
+    return bytes(buffer.data())
+
+
+class PngDirectorySink:
+    """Write each damaged region as a PNG file, plus one manifest line per frame.
+
+    Files are named <frame>-<key>.png; frames.jsonl lists the position and
+    size of every file, so a display driver can do a partial refresh.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def write(self, frame, regions):
+        entries = []
+        for key, rect, image in regions:
+            name = f'{frame:06d}-{key}.png'
+            image.save(os.path.join(self.directory, name), 'PNG')
+            entries.append({'key': key, 'file': name, 'x': rect.x(), 'y': rect.y(),
+                            'width': rect.width(), 'height': rect.height()})
+        with open(os.path.join(self.directory, 'frames.jsonl'), 'a', encoding='utf-8') as f:
+            f.write(json.dumps({'frame': frame, 'regions': entries}) + '\n')
+
+
+class PngStreamSink:
+    """Write damaged regions to a binary stream (e.g. stdout) for a remote display.
+
+    Every region is a JSON header line with its position, size and byte
+    length, followed by that many bytes of PNG.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, frame, regions):
+        for key, rect, image in regions:
+            data = encodePng(image)
+            header = {'frame': frame, 'key': key, 'x': rect.x(), 'y': rect.y(),
+                      'width': rect.width(), 'height': rect.height(), 'length': len(data)}
+            self.stream.write(json.dumps(header).encode('utf-8') + b'\n')
+            self.stream.write(data)
+        self.stream.flush()
+
+
+class FrameRenderer(QObject):
+    """Render a window to images and emit only the tiles that changed.
+
+    Tile repaints schedule a frame (debounced, so one refresh cycle yields one
+    frame). Each frame is grabbed in full and compared with the previous one
+    tile by tile; unchanged tiles are dropped. The first frame, a resize or
+    any change outside the tiles (e.g. a theme switch) emits the whole frame
+    as a single region keyed 'frame'.
+    """
+
+    def __init__(self, window, tiles, sink, debounceMs=0):
+        super().__init__(window)
+        self.window = window
+        self.tiles = tiles
+        self.sink = sink
+        self.previous = None
+        self.frame = 0
+        self.capturing = False
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(debounceMs)
+        self.timer.timeout.connect(self.renderFrame)
+
+    def scheduleFrame(self):
+        if not self.capturing and not self.timer.isActive():
+            self.timer.start()
+
+    def tileRects(self):
+        return {key: QRect(tile.mapTo(self.window, QPoint(0, 0)), tile.size()) for key, tile in self.tiles.items()}
+
+    def renderFrame(self):
+        """Grab the window, emit the damaged regions and return them as (key, QRect) pairs."""
+        self.capturing = True
+        try:
+            image = self.window.grab().toImage()
+        finally:
+            self.capturing = False
+        rects = self.tileRects()
+
+        if self.previous is None or self.previous.size() != image.size() or self.outsideTilesChanged(image, rects):
+            damage = [('frame', image.rect())]
+        else:
+            damage = [(key, rect) for key, rect in rects.items() if image.copy(rect) != self.previous.copy(rect)]
+
+        self.previous = image
+        if not damage:
+            return []
+        self.frame += 1
+        self.sink.write(self.frame, [(key, rect, image.copy(rect)) for key, rect in damage])
+        METRICS.increment('dashboard_render_frames_total')
+        METRICS.increment('dashboard_render_regions_total', len(damage))
+        return damage
+
+    def outsideTilesChanged(self, image, rects):
+        def masked(source):
+            copy = source.copy()
+            painter = QPainter(copy)
+            for rect in rects.values():
+                painter.fillRect(rect, Qt.GlobalColor.black)
+            painter.end()
+            return copy
+        return masked(image) != masked(self.previous)
+
+
 class MainWindow(QMainWindow):
+    # QThreadPool priority of the startup history and stats queries, below the refreshes
+    WARMUP_PRIORITY = -1
+
     def __init__(self):
         super().__init__()
 
         self.setWindowTitle("Dashboard")
         self.widgets = {}
         self.client = None
+        self.connections = ConnectionManager()
+        self.forecastCache = ForecastCache(
+            self.connections,
+            path=CONFIG['FORECAST_CACHE_PATH'],
+            ttl=CONFIG['FORECAST_TTL_S'],
+        )
+
+        self.threadPool = QThreadPool(self)
+        self.threadPool.setMaxThreadCount(CONFIG['FETCH_WORKERS'])
+        self.ioExecutor = ThreadPoolExecutor(max_workers=CONFIG['FETCH_CONCURRENCY'])
+        self.fetchInFlight = False
+        self.scheduler = PollScheduler.fromConfig(CONFIG['POLL_SOURCES'], CONFIG['POLL_BACKOFF_MAX_S'])
+
+        if CONFIG['TILES_PATH']:
+            self.tiles = TileRegistry(loadTiles(CONFIG['TILES_PATH']))
+        else:
+            self.tiles = TileRegistry(parseTiles(CONFIG['TILES']))
 
         layout = QGridLayout()
-
-        self.widgets['workRoom'] = DashboardWidget('КАБИНЕТ')
-        self.widgets['bedRoom'] = DashboardWidget('СПАЛЬНЯ')
-        self.widgets['livRoom'] = DashboardWidget('ЗАЛ')
-        self.widgets['SashaRoom'] = DashboardWidget('ПЕЩЕРА')
-
-        self.widgets['outdoor'] = DashboardWidget('БАЛКОН')
-
-        layout.addWidget(self.widgets['workRoom'], 0, 0)
-        layout.addWidget(self.widgets['bedRoom'], 0, 1)
-        layout.addWidget(self.widgets['livRoom'], 0, 2)
-        layout.addWidget(self.widgets['SashaRoom'], 0, 3)
-
-        self.widgets['flowerOleandrSensor'] = DashboardLevelWidget('ОЛЕАНДР', 'images/oleandr.png')
-        self.widgets['flowerOlivaSensor'] = DashboardLevelWidget('ОЛИВА', 'images/olive.png')
-
-        self.widgets['weather'] = DashboardWeatherWidget()
-
-        layout.addWidget(self.widgets['outdoor'], 1, 0)
-        layout.addWidget(self.widgets['flowerOleandrSensor'], 1, 1)
-        layout.addWidget(self.widgets['flowerOlivaSensor'], 1, 2)
-        layout.addWidget(self.widgets['weather'], 1, 3)
+        for tile in self.tiles.tiles:
+            self.widgets[tile.key] = self.createTile(tile)
+            layout.addWidget(self.widgets[tile.key], tile.row, tile.column)
 
         widget = QWidget()
         widget.setLayout(layout)
         self.setCentralWidget(widget)
 
+        # Count repaints and relayouts per tile; eventFilter tells tiles apart by
+        # object name, and the containers whose layouts they own by a property
+        for key, tile in self.widgets.items():
+            tile.setObjectName(key)
+            for container in [tile] + tile.findChildren(QWidget):
+                if container.layout() is not None:
+                    container.setProperty('tile', key)
+                    container.installEventFilter(self)
+        PROFILER.mark('build widgets')
+
+        self.viewModel = DashboardViewModel(self.widgets)
+        self.history = HistoryStore(CONFIG['HISTORY_RETENTION_S'] // CONFIG['HISTORY_BUCKET_S'], CONFIG['HISTORY_BUCKET_S'])
+        self.stats = RoomStatsStore(CONFIG['STATS_WINDOW_S'], DashboardWidget.HUMIDITY_BAND)
+        self.planner = QueryPlanner(CONFIG['INFLUXDB_DATABASE'])
+        self.snapshot = SnapshotStore(CONFIG['SNAPSHOT_PATH'])
+        self.restoreSnapshot()
+        PROFILER.mark('restore snapshot')
+        self.themeController = ThemeController(
+            CONFIG['ILLUMINATION_THRESHOLD'],
+            hysteresis=CONFIG['ILLUMINATION_HYSTERESIS'],
+            minDwell=CONFIG['THEME_MIN_DWELL_S'],
+        )
+
         logging.basicConfig(level=logging.DEBUG)
 
+        # Connects lazily on the first query and reconnects after failures
+        self.client = ResilientInfluxClient(
+            self.connectInflux,
+            failureThreshold=CONFIG['INFLUXDB_FAILURE_THRESHOLD'],
+            resetTimeout=CONFIG['INFLUXDB_RESET_TIMEOUT_S'],
+        )
+
+        # One single-shot timer, re-armed for whichever source is due next.
+        # Polling starts after the first paint, so the window (showing the
+        # snapshot) is up before any network work begins.
+        self.pollTimer = QTimer(self)
+        self.pollTimer.setSingleShot(True)
+        self.pollTimer.timeout.connect(self.pollDue)
+        self.pollingStarted = False
+        self.firstDataApplied = False
+        self.renderer = None
+        widget.installEventFilter(self)
+
+        # Optional push mode; polling above stays active as the fallback
+        self.listener = None
+        if CONFIG['PUSH_LISTEN_PORT'] is not None:
+            self.startListener(CONFIG['PUSH_LISTEN_HOST'], CONFIG['PUSH_LISTEN_PORT'])
+
+        # Optional aggregator roles: publish this instance's data, or follow another one's
+        self.hub = None
+        self.snapshotServer = None
+        if CONFIG['AGGREGATOR_LISTEN_PORT'] is not None:
+            self.startAggregator(CONFIG['AGGREGATOR_LISTEN_HOST'], CONFIG['AGGREGATOR_LISTEN_PORT'])
+        self.subscriber = None
+        if CONFIG['AGGREGATOR_URL']:
+            self.subscriber = SnapshotSubscriber(
+                CONFIG['AGGREGATOR_URL'], self.connections.get, CONFIG['AGGREGATOR_LONG_POLL_S'], self)
+            self.subscriber.received.connect(self.applyData, Qt.ConnectionType.QueuedConnection)
+
+        self.metricsServer = None
+        if CONFIG['METRICS_LISTEN_PORT'] is not None:
+            self.startMetricsServer(CONFIG['METRICS_LISTEN_HOST'], CONFIG['METRICS_LISTEN_PORT'])
+        self.metricsLogTimer = QTimer(self)
+        self.metricsLogTimer.timeout.connect(self.logMetrics)
+        if CONFIG['METRICS_LOG_INTERVAL_S']:
+            self.metricsLogTimer.start(int(CONFIG['METRICS_LOG_INTERVAL_S'] * 1000))
+
+    def eventFilter(self, watched, event):
+        if event.type() == QEvent.Type.Paint:
+            key = watched.objectName()
+            if key in self.widgets:
+                if self.renderer is None:
+                    METRICS.increment('dashboard_widget_paints_total', widget=key)
+                elif not self.renderer.capturing:
+                    METRICS.increment('dashboard_widget_paints_total', widget=key)
+                    self.renderer.scheduleFrame()
+            elif watched is self.centralWidget() and not self.pollingStarted:
+                self.pollingStarted = True
+                watched.removeEventFilter(self)
+                PROFILER.mark('first paint')
+                # Let the paint complete before starting
+                QTimer.singleShot(0, self.startPolling)
+        elif event.type() == QEvent.Type.LayoutRequest:
+            key = watched.property('tile')
+            if key is not None:
+                METRICS.increment('dashboard_widget_relayouts_total', widget=key)
+        return super().eventFilter(watched, event)
+
+    def startPolling(self):
+        """Start the history and stats warm-up and the first refresh of every source.
+
+        A subscriber reads nothing itself and starts following its aggregator instead.
+        """
+        self.pollingStarted = True
+        if self.subscriber is not None:
+            self.subscriber.start()
+            return
+        # The first refresh goes ahead of the warm-up queries, and their lower
+        # priority keeps later polls from queueing behind them as well
+        self.pollDue()
+        self.startTask(self.getHistory, self.onHistoryLoaded, self.WARMUP_PRIORITY)
+        self.startTask(self.getStatsSeed, self.onStatsLoaded, self.WARMUP_PRIORITY)
+
+    def createTile(self, tile):
+        if tile.type == 'DashboardWidget':
+            return DashboardWidget(tile.title)
+        if tile.type == 'DashboardLevelWidget':
+            return DashboardLevelWidget(tile.title, ASSETS.path(tile.icon))
+        return DashboardWeatherWidget()
+
+    def restoreSnapshot(self):
+        """Show the values persisted by the previous run until fresh data arrives."""
+        for key, value in self.snapshot.load().items():
+            if key in self.widgets:
+                self.viewModel.render(key, value, stale=True)
+
+    def connectInflux(self):
         logging.info("Connecting to the database")
-        try:
-            self.client = InfluxDBClient(
-                host=CONFIG['INFLUXDB_HOST'],
-                port=CONFIG['INFLUXDB_PORT'],
+        client = self.connections.influxClient(
+            host=CONFIG['INFLUXDB_HOST'],
+            port=CONFIG['INFLUXDB_PORT'],
+        )
+        client.switch_database(CONFIG['INFLUXDB_DATABASE'])
+        return client
+
+    def startListener(self, host, port):
+        self.listener = LineProtocolListener(host, port, self)
+        self.listener.pointReceived.connect(self.applyPoint)
+        return self.listener.start()
+
+    def startRenderer(self, sink):
+        """Emit changed tiles to sink instead of relying on a physical screen."""
+        self.renderer = FrameRenderer(self, self.widgets, sink, CONFIG['RENDER_DEBOUNCE_MS'])
+        self.renderer.scheduleFrame()
+        return self.renderer
+
+    def startAggregator(self, host, port):
+        """Publish every applied cycle (and pushed point) to subscribers at /snapshot."""
+        self.hub = SnapshotHub(CONFIG['AGGREGATOR_DELTAS'])
+        self.snapshotServer = SnapshotServer(self.hub, host, port, CONFIG['AGGREGATOR_LONG_POLL_S'])
+        return self.snapshotServer.start()
+
+    def publish(self, data):
+        if self.hub is not None:
+            METRICS.setGauge('dashboard_aggregator_version', self.hub.publish(data))
+
+    def startMetricsServer(self, host, port):
+        self.metricsServer = MetricsServer(METRICS, host, port)
+        return self.metricsServer.start()
+
+    def logMetrics(self):
+        summary = METRICS.summary()
+        if summary:
+            logging.info("Metrics: %s", summary)
+
+    @pyqtSlot(object)
+    def applyPoint(self, point):
+        """Route a pushed point to the widget configured for its alias."""
+        alias = point.tags.get('alias')
+        if point.timestamp is not None:
+            timestamp = point.timestamp // 10**9
+        else:
+            timestamp = int(time.time())
+
+        if point.measurement == 'illuminationSensor':
+            if 'value' in point.fields:
+                self.applyIllumination(point.fields['value'])
+                self.publish({'illumination': point.fields['value']})
+            return
+
+        tile = self.tiles.sensor(point.measurement, alias)
+        if tile is None:
+            return
+        if tile.type == 'DashboardWidget':
+            if 'Temperature' not in point.fields and 'Humidity' not in point.fields:
+                return
+            # A point may carry only one of the fields; keep the last known other
+            # one, or leave it unknown (not 0) if this room has shown nothing yet
+            previous = self.viewModel.rendered.get(tile.key) or Measure(temperature=None, humidity=None)
+            measure = Measure(
+                temperature=finiteOrNone(point.fields.get('Temperature', previous.temperature)),
+                humidity=finiteOrNone(point.fields.get('Humidity', previous.humidity)),
+                timestamp=timestamp,
             )
-            self.client.switch_database(CONFIG['INFLUXDB_DATABASE'])
-        except Exception as e:
-            logging.error("Failed to connect to InfluxDB: %s", e)
-
-        self.fetchData()
-
-        # Start a timer to fetch data every 5 minutes
-        self.timer = QTimer(self)
-        self.timer.timeout.connect(self.fetchData)
-        self.timer.start(CONFIG['DATA_REFRESH_INTERVAL_MS'])
+            self.viewModel.render(tile.key, measure)
+            self.recordStats(tile, measure)
+            self.publish({'latest': {alias: measure}})
+        elif tile.type == 'DashboardLevelWidget' and 'Moisture' in point.fields:
+            moisture = Moisture(value=finiteOrNone(point.fields['Moisture']), timestamp=timestamp)
+            self.viewModel.render(tile.key, moisture)
+            self.publish({'latest': {alias: moisture}})
+
+    def startTask(self, fn, slot, priority=0):
+        task = Task(fn)
+        task.signals.finished.connect(slot, Qt.ConnectionType.QueuedConnection)
+        self.threadPool.start(task, priority)
+
+    def armPollTimer(self):
+        delay = self.scheduler.nextDelay()
+        if delay is not None:
+            self.pollTimer.start(int(delay * 1000))
+
+    def pollDue(self):
+        """Start a background refresh of every source whose schedule is due."""
+        if self.fetchInFlight:
+            # Sources that came due meanwhile are still due when the running
+            # refresh finishes; onDataCollected re-arms the timer then
+            return
+        sources = self.scheduler.due()
+        if sources:
+            self.requestFetch(sources)
+        self.armPollTimer()
+
+    def requestFetch(self, sources=None):
+        """Collect data on the thread pool and apply it once it arrives."""
+        if self.fetchInFlight:
+            logging.debug("Previous refresh still running, skipping")
+            return
+        sources = list(sources or CONFIG['POLL_SOURCES'])
+        self.fetchInFlight = True
+        self.scheduler.begin(sources)
+        self.pollingSources = sources
+        self.startTask(lambda: self.collectData(sources), self.onDataCollected)
+
+    @pyqtSlot(object)
+    def onDataCollected(self, data):
+        self.fetchInFlight = False
+        if data is not None:
+            self.applyData(data)
+        else:
+            for source in self.pollingSources:
+                self.scheduler.recordFailure(source)
+        self.armPollTimer()
 
-        # Set up theme change timer
-        self.theme_timer = QTimer(self)
-        self.theme_timer.timeout.connect(self.applyTheme)
-        self.theme_timer.start(CONFIG['THEME_CHECK_INTERVAL_MS'])
-        self.applyTheme()
+        if not self.firstDataApplied:
+            self.firstDataApplied = True
+            PROFILER.mark('first data')
+            PROFILER.report()
 
     def applyTheme(self):
-        illumination = self.getIllumination()
-        if illumination < CONFIG['ILLUMINATION_THRESHOLD']:
+        self.applyIllumination(self.getIllumination())
+
+    def applyIllumination(self, illumination):
+        # Without a reading the current theme stays
+        if illumination is None:
+            return
+        theme = self.themeController.decide(illumination)
+        if theme == ThemeController.DARK:
             self.setDarkTheme()
-        else:
+        elif theme == ThemeController.LIGHT:
             self.setLightTheme()
 
     def setDarkTheme(self):
-        palette = QPalette()
-        palette.setColor(QPalette.Window, QColor(45, 45, 45))
-        palette.setColor(QPalette.WindowText, QColor(255, 255, 255))
-        QApplication.instance().setPalette(palette)
-
-        for key in self.widgets:
-            self.widgets[key].setDarkTheme()
+        self.switchTheme(ThemeController.DARK)
 
     def setLightTheme(self):
-        palette = QPalette()
-        palette.setColor(QPalette.Window, QColor(255, 255, 255))
-        palette.setColor(QPalette.WindowText, QColor(0, 0, 0))
-        QApplication.instance().setPalette(palette)
+        self.switchTheme(ThemeController.LIGHT)
 
-        for key in self.widgets:
-            self.widgets[key].setLightTheme()
+    def switchTheme(self, theme):
+        # Suspend painting so the palette and all icon swaps land in one repaint
+        self.setUpdatesEnabled(False)
+        try:
+            QApplication.instance().setPalette(self.themeController.palette(theme))
+            for key in self.widgets:
+                if theme == ThemeController.DARK:
+                    self.widgets[key].setDarkTheme()
+                else:
+                    self.widgets[key].setLightTheme()
+        finally:
+            self.setUpdatesEnabled(True)
 
     def getIllumination(self):
+        """Return the newest lux reading, or None if it could not be read.
+
+        A failed read must not pass for a bright room: None leaves the theme
+        as it is and is recorded as a failed poll.
+        """
         try:
-            results = self.client.query('SELECT value FROM illuminationSensor ORDER BY time DESC LIMIT 1')
-            return results.raw['series'][0]['values'][0][1]
+            with METRICS.timer('dashboard_influxdb_query_seconds', query='illumination'):
+                results = self.client.query('SELECT value FROM illuminationSensor ORDER BY time DESC LIMIT 1', epoch='s')
+            return finiteOrNone(decodeResults(results)[0]['value'][0])
         except Exception as e:
             logging.error("Failed to read illumination: %s", e)
-            return 100  # Default to light theme
+            METRICS.increment('dashboard_errors_total', source='illumination')
+            return None
 
     def getWeather(self):
         try:
-            response = requests.get(
-                CONFIG['OPEN_METEO_URL'],
-                params=CONFIG['OPEN_METEO_PARAMS'],
-                timeout=10,
-            )
-            response.raise_for_status()
-            data = response.json()
-            daily = data['daily']
-            forecasts = []
-            for i in range(len(daily['time'])):
-                forecasts.append(DayForecast(
-                    date=daily['time'][i],
-                    temp_max=daily['temperature_2m_max'][i],
-                    temp_min=daily['temperature_2m_min'][i],
-                    weathercode=daily['weathercode'][i],
-                ))
-            return forecasts
+            return self.forecastCache.get()
         except Exception as e:
             logging.error("Failed to fetch weather: %s", e)
+            METRICS.increment('dashboard_errors_total', source='weather')
             return None
 
     def getMoisture(self, alias):
         try:
-            results = self.client.query('SELECT time, Moisture FROM Flowers WHERE alias = \'' + alias + '\'  ORDER BY time desc LIMIT 1')
-            moisture = Moisture()
-            moisture.value = results.raw['series'][0]['values'][0][1]
-            moisture.timestamp = results.raw['series'][0]['values'][0][0]
-            return moisture
+            with METRICS.timer('dashboard_influxdb_query_seconds', query='moisture', alias=alias):
+                results = self.client.query('SELECT time, Moisture FROM Flowers WHERE alias = ' + quoteLiteral(alias) + '  ORDER BY time desc LIMIT 1', epoch='s')
+            return tileValue('DashboardLevelWidget', decodeResults(results)[0])
         except Exception as e:
             logging.error("Failed to read moisture for %s: %s", alias, e)
+            METRICS.increment('dashboard_errors_total', source='moisture', alias=alias)
             return None
 
     def getMeasure(self, alias):
         try:
-            results = self.client.query('SELECT time, Humidity, Temperature FROM Telemetry WHERE alias = \'' + alias + '\'  ORDER BY time desc LIMIT 1')
-            measure = Measure()
-            measure.temperature = results.raw['series'][0]['values'][0][2]
-            measure.humidity = results.raw['series'][0]['values'][0][1]
-            measure.timestamp = results.raw['series'][0]['values'][0][0]
-            return measure
+            with METRICS.timer('dashboard_influxdb_query_seconds', query='measure', alias=alias):
+                results = self.client.query('SELECT time, Humidity, Temperature FROM Telemetry WHERE alias = ' + quoteLiteral(alias) + '  ORDER BY time desc LIMIT 1', epoch='s')
+            return tileValue('DashboardWidget', decodeResults(results)[0])
         except Exception as e:
             logging.error("Failed to read measure for %s: %s", alias, e)
+            METRICS.increment('dashboard_errors_total', source='measure', alias=alias)
+            return None
+
+    def getHistory(self):
+        """Read downsampled history for all sensors as {(alias, field): (times, values)}.
+
+        Returns None if the query failed.
+        """
+        history = {}
+        try:
+            with METRICS.timer('dashboard_influxdb_query_seconds', query='history'):
+                if not self.planner.discovered:
+                    self.discoverRollups()
+                results = self.client.query(self.planner.query(
+                    self.tiles.queryGroups(),
+                    CONFIG['HISTORY_RETENTION_S'],
+                    CONFIG['HISTORY_RETENTION_S'] // CONFIG['HISTORY_BUCKET_S'],
+                ), epoch='s')
+            for frame in decodeResults(results):
+                alias = frame.tags.get('alias')
+                for fieldName, values in frame.columns.items():
+                    history[(alias, fieldName)] = (frame.times, values)
+        except Exception as e:
+            logging.error("Failed to read history: %s", e)
+            METRICS.increment('dashboard_errors_total', source='history')
+            return None
+        return history
+
+    def discoverRollups(self):
+        """Let the planner look for rollups; without them it reads the raw measurements."""
+        try:
+            self.planner.discover(self.client)
+        except CircuitOpenError:
+            raise
+        except Exception as e:
+            logging.warning("Could not discover retention policies and rollups: %s", e)
+
+    @pyqtSlot(object)
+    def onHistoryLoaded(self, history):
+        if not history:
+            return
+        for (alias, fieldName), (times, values) in history.items():
+            self.history.load(alias, fieldName, times, values)
+        logging.info("Loaded history for %d series (%d bytes)", len(history), self.history.nbytes())
+
+    def getStatsSeed(self):
+        """Read the aggregates seeding the room statistics as SeriesFrames, or None on failure."""
+        groups = self.tiles.queryGroups(['telemetry'])
+        if not groups:
+            return []
+        try:
+            with METRICS.timer('dashboard_influxdb_query_seconds', query='stats'):
+                results = self.client.query(buildStatsQuery(
+                    groups, CONFIG['STATS_WINDOW_S'], CONFIG['STATS_BUCKET_S'],
+                ), epoch='s')
+            return decodeResults(results)
+        except Exception as e:
+            logging.error("Failed to read stats seed: %s", e)
+            METRICS.increment('dashboard_errors_total', source='stats')
+            return None
+
+    @pyqtSlot(object)
+    def onStatsLoaded(self, frames):
+        if not frames:
+            return
+        self.stats.seed(frames)
+        for tile in self.tiles.ofSource('telemetry'):
+            self.widgets[tile.key].updateStats(*self.stats.summary(tile.alias))
+
+    def recordStats(self, tile, reading):
+        """Feed a room reading into its rolling stats and refresh the tile's summary."""
+        if self.stats.record(tile.alias, reading):
+            self.widgets[tile.key].updateStats(*self.stats.summary(tile.alias))
+
+    def getLatest(self, sources=None, cadences=None):
+        """Read the newest row of every sensor tile refreshed by the given sources.
+
+        Sources are polling source names ('telemetry', 'flowers'); None means
+        all sensor tiles. Returns a dict keyed by alias holding a Measure or
+        Moisture, or None if the query failed. Aliases without data are simply
+        missing. If a cadences dict is passed, it receives the seconds between
+        the two newest readings of every alias that has two.
+        """
+        latest = {}
+        groups = self.tiles.queryGroups(sources)
+        if not groups:
+            return latest
+        measurement = ','.join(sorted({group[0] for group in groups}))
+        try:
+            with METRICS.timer('dashboard_influxdb_query_seconds', query='latest', measurement=measurement):
+                results = self.client.query(buildLatestQuery(groups), epoch='s')
+            for frame in decodeResults(results):
+                alias = frame.tags.get('alias')
+                tile = self.tiles.sensor(frame.name, alias)
+                if tile is not None and len(frame):
+                    latest[alias] = tileValue(tile.type, frame)
+                    if cadences is not None and len(frame) > 1:
+                        cadences[alias] = frame.times[0] - frame.times[1]
+        except Exception as e:
+            logging.error("Failed to read latest values: %s", e)
+            METRICS.increment('dashboard_errors_total', source='latest')
             return None
+        return latest
+
+    def collectData(self, sources=None):
+        """Run the network reads for the given sources concurrently.
+
+        Sources are the keys of CONFIG['POLL_SOURCES']; None means all of them.
+        All due sensor tiles share one query. Touches no widgets, so it is safe
+        to call from a worker thread.
+        """
+        sources = list(sources or CONFIG['POLL_SOURCES'])
+        logging.info("Reading %s", ", ".join(sources))
+
+        # While the breaker is open, skip every database read of the cycle at once;
+        # the missing results are recorded as failed polls and back off
+        databaseUp = not self.client.isOpen()
+        if not databaseUp:
+            logging.info("InfluxDB circuit breaker open, skipping database reads")
+
+        reads = {}
+        cadences = {}
+        if databaseUp and self.tiles.queryGroups(sources):
+            reads['latest'] = lambda: self.getLatest(sources, cadences)
+        if 'weather' in sources:
+            reads['forecasts'] = self.getWeather
+        if databaseUp and 'illumination' in sources:
+            reads['illumination'] = self.getIllumination
+
+        with METRICS.timer('dashboard_refresh_seconds', phase='collect'):
+            data = collectSources(reads, self.ioExecutor)
+        data['sources'] = sources
+        data['cadences'] = cadences
+        return data
 
     def fetchData(self):
+        """Refresh all widgets synchronously."""
+        try:
+            self.applyData(self.collectData())
+        except Exception as e:
+            logging.error(f"Exception occurred: {e}")
+
+    def applyData(self, data):
+        """Push collected data into the widgets and update the schedule. GUI thread only."""
+        start = time.perf_counter()
         try:
-            logging.info("Reading measures")
-            workRoom = self.getMeasure('workRoomTempSensor')
-            livRoom = self.getMeasure('livRoomTempSensor')
-            SashaRoom = self.getMeasure('SashaRoomTempSensor')
-            bedRoom = self.getMeasure('bedRoomTempSensor')
-            outdoor = self.getMeasure('outdoorTemperatureSensor')
-
-            if workRoom:
-                self.widgets['workRoom'].updateValues(workRoom.temperature, workRoom.humidity, workRoom.timestamp)
-            if livRoom:
-                self.widgets['livRoom'].updateValues(livRoom.temperature, livRoom.humidity, livRoom.timestamp)
-            if SashaRoom:
-                self.widgets['SashaRoom'].updateValues(SashaRoom.temperature, SashaRoom.humidity, SashaRoom.timestamp)
-            if bedRoom:
-                self.widgets['bedRoom'].updateValues(bedRoom.temperature, bedRoom.humidity, bedRoom.timestamp)
-            if outdoor:
-                self.widgets['outdoor'].updateValues(outdoor.temperature, outdoor.humidity, outdoor.timestamp)
-
-            oleandrMoisture = self.getMoisture('flowerOleandrSensor')
-            olivaMoisture = self.getMoisture('flowerOlivaSensor')
-
-            if oleandrMoisture:
-                self.widgets['flowerOleandrSensor'].updateValues(oleandrMoisture.value, oleandrMoisture.timestamp)
-            if olivaMoisture:
-                self.widgets['flowerOlivaSensor'].updateValues(olivaMoisture.value, olivaMoisture.timestamp)
-
-            forecasts = self.getWeather()
-            if forecasts:
-                self.widgets['weather'].updateValues(forecasts)
-
-            temperature = [
-                workRoom.temperature if workRoom else None,
-                bedRoom.temperature if bedRoom else None,
-                livRoom.temperature if livRoom else None,
-                SashaRoom.temperature if SashaRoom else None,
-                outdoor.temperature if outdoor else None,
-            ]
-            humidity = [
-                workRoom.humidity if workRoom else None,
-                bedRoom.humidity if bedRoom else None,
-                livRoom.humidity if livRoom else None,
-                SashaRoom.humidity if SashaRoom else None,
-                outdoor.humidity if outdoor else None,
-            ]
-            flowers = [
-                oleandrMoisture.value if oleandrMoisture else None,
-                olivaMoisture.value if olivaMoisture else None,
-            ]
+            latest = data.get('latest') or {}
+
+            self.history.record(latest)
+
+            self.viewModel.beginCycle()
+            for tile in self.tiles.sensors.values():
+                self.viewModel.render(tile.key, latest.get(tile.alias))
+            for tile in self.tiles.ofSource('telemetry'):
+                self.recordStats(tile, latest.get(tile.alias))
+            for tile in self.tiles.ofSource('weather'):
+                self.viewModel.render(tile.key, data.get('forecasts') or None)
+            logging.debug("Widget updates: %d applied, %d skipped",
+                          self.viewModel.updated, self.viewModel.skipped)
+            METRICS.increment('dashboard_widget_updates_total', self.viewModel.updated, result='applied')
+            METRICS.increment('dashboard_widget_updates_total', self.viewModel.skipped, result='skipped')
+            if self.viewModel.updated:
+                self.snapshot.save(self.viewModel.rendered)
+
+            if data.get('illumination') is not None:
+                self.applyIllumination(data['illumination'])
+
+            self.publish(data)
+
+            measures = [latest.get(tile.alias) for tile in self.tiles.ofSource('telemetry')]
+            moistures = [latest.get(tile.alias) for tile in self.tiles.ofSource('flowers')]
+            temperature = [m.temperature if m else None for m in measures]
+            humidity = [m.humidity if m else None for m in measures]
+            flowers = [m.value if m else None for m in moistures]
 
             logging.info("Temperature")
             logging.info(temperature)
@@ -572,21 +3290,112 @@ class MainWindow(QMainWindow):
 
             logging.info("Flowers")
             logging.info(flowers)
+
+            logging.debug("HTTP connections: %s", self.connections.stats())
+            logging.debug("InfluxDB circuit breaker: %s", self.client.stats())
         except Exception as e:
             logging.error(f"Exception occurred: {e}")
+            METRICS.increment('dashboard_errors_total', source='apply')
+
+        self.recordPoll(data)
+        METRICS.observe('dashboard_refresh_seconds', time.perf_counter() - start, phase='apply')
+
+    def recordPoll(self, data):
+        """Feed the outcome of a cycle back into the per-source schedule."""
+        latest = data.get('latest')
+        for source in data.get('sources', []):
+            if source in ('telemetry', 'flowers'):
+                aliases = [tile.alias for tile in self.tiles.ofSource(source)]
+                if aliases and latest is None:
+                    self.scheduler.recordFailure(source)
+                    continue
+                timestamps = {}
+                for alias in aliases:
+                    if alias in latest:
+                        try:
+                            timestamps[alias] = timestampToEpoch(latest[alias].timestamp)
+                        except (ValueError, TypeError, AttributeError):
+                            pass
+                self.scheduler.recordSuccess(source, timestamps, data.get('cadences'))
+            elif source == 'weather' and data.get('forecasts') is None:
+                self.scheduler.recordFailure(source)
+            elif source == 'illumination' and data.get('illumination') is None:
+                self.scheduler.recordFailure(source)
+            else:
+                self.scheduler.recordSuccess(source)
+
+    def closeEvent(self, event):
+        self.snapshot.save(self.viewModel.rendered)
+        self.ioExecutor.shutdown(wait=False)
+        if self.listener is not None:
+            self.listener.close()
+        if self.metricsServer is not None:
+            self.metricsServer.close()
+        if self.snapshotServer is not None:
+            self.snapshotServer.close()
+        if self.subscriber is not None:
+            self.subscriber.close()
+        self.connections.close()
+        super().closeEvent(event)
 
     def keyPressEvent(self, event):
         if event.key() == Qt.Key_Escape:
             self.close()
 
-if __name__ == "__main__":
-    app = QApplication(sys.argv)
+def parseArgs(argv):
+    parser = argparse.ArgumentParser(description="Home automation dashboard")
+    parser.add_argument('--startup-profile', action='store_true',
+                        help="print a phase-by-phase startup timing breakdown to stderr")
+    parser.add_argument('--tiles', metavar='PATH',
+                        help="JSON file with the tile layout, replacing CONFIG['TILES']")
+    parser.add_argument('--render', metavar='TARGET',
+                        help="run headless and write changed regions as PNGs to this directory, or to stdout for '-'")
+    parser.add_argument('--serve', metavar='[HOST:]PORT',
+                        help="run headless as an aggregator, publishing each refresh at http://HOST:PORT/snapshot")
+    parser.add_argument('--subscribe', metavar='URL',
+                        help="follow an aggregator's /snapshot endpoint instead of querying InfluxDB and Open-Meteo")
+    # Anything else (e.g. -platform offscreen) is left for Qt
+    return parser.parse_known_args(argv[1:])
+
+
+def main(argv):
+    args, qtArgs = parseArgs(argv)
+    PROFILER.enabled = args.startup_profile
+    if args.tiles:
+        CONFIG['TILES_PATH'] = args.tiles
+    if args.serve:
+        host, _, port = args.serve.rpartition(':')
+        CONFIG['AGGREGATOR_LISTEN_HOST'] = host or CONFIG['AGGREGATOR_LISTEN_HOST']
+        CONFIG['AGGREGATOR_LISTEN_PORT'] = int(port)
+    if args.subscribe:
+        CONFIG['AGGREGATOR_URL'] = args.subscribe
+    if args.render or args.serve:
+        os.environ['QT_QPA_PLATFORM'] = 'offscreen'
+    PROFILER.mark('imports')
+
+    app = QApplication(argv[:1] + qtArgs)
+    PROFILER.mark('QApplication')
 
     window = MainWindow()
-    window.show()
-    window.showFullScreen()
+    PROFILER.mark('MainWindow')
+
+    if args.serve and not args.render:
+        # Nothing is painted, so start polling without waiting for a first paint
+        window.startPolling()
+    elif args.render:
+        if CONFIG['RENDER_SIZE']:
+            window.resize(*CONFIG['RENDER_SIZE'])
+        window.show()
+        window.startRenderer(PngStreamSink(sys.stdout.buffer) if args.render == '-' else PngDirectorySink(args.render))
+    else:
+        window.showFullScreen()
 
-    # Hide mouse cursor
-    window.setCursor(QCursor(Qt.BlankCursor))
+        # Hide mouse cursor
+        window.setCursor(QCursor(Qt.BlankCursor))
+    PROFILER.mark('show')
 
-    app.exec()
+    return app.exec()
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,299 @@
+"""Benchmark the dashboard's refresh, widget-update and theme-switch paths.
+
+Runs on the Qt offscreen platform against canned InfluxDB and Open-Meteo
+responses, so neither a display nor the network is needed. Results are
+printed as a table and can be written as JSON; pass a previous result file
+as --baseline to fail on regressions.
+
+Examples:
+    python bench_app.py --output bench-baseline.json
+    python bench_app.py --baseline bench-baseline.json --threshold 0.25
+"""
+import os
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+import argparse
+import json
+import logging
+import platform
+import re
+import statistics
+import sys
+import tempfile
+import time
+
+from PyQt5.QtCore import PYQT_VERSION_STR, QT_VERSION_STR
+from PyQt5.QtWidgets import QApplication
+from influxdb.resultset import ResultSet
+
+from app import (
+    CONFIG,
+    DashboardLevelWidget,
+    DashboardWidget,
+    MainWindow,
+    ResilientInfluxClient,
+    RoomStats,
+    TimestampFormatter,
+    ZURICH_TZ,
+    decodeResults,
+    format_timestamp,
+)
+
+# Canned reading per field, and how far it moves on odd cycles
+FIELD_VALUES = {
+    'Humidity': (45, 20),  # odd cycles leave the comfort band
+    'Temperature': (21.5, 0.3),
+    'Moisture': (2, 8),
+}
+STATEMENT = re.compile(r"SELECT time, (?P<fields>.+?) FROM (?P<measurement>\w+) WHERE")
+
+TIMESTAMPS = [
+    "2024-01-15T12:30:00Z",
+    "2024-07-15T12:00:00.123456789Z",
+    "2024-12-01T08:00:00+00:00",
+]
+EPOCHS = [1705321800, 1721044800, 1733040000]
+# A week of history at the default 5-minute spacing
+SERIES = range(1705321800 - 7 * 86400, 1705321800, 300)
+
+
+def cannedSeries(name, alias, columns, row):
+    return {'name': name, 'tags': {'alias': alias}, 'columns': columns, 'values': [row]}
+
+
+class CannedInfluxClient:
+    """Answers the dashboard's queries with fixed rows.
+
+    Every latest-values query advances the cycle: timestamps move forward by
+    step seconds and the readings alternate, so the widgets actually change on
+    each refresh.
+    """
+
+    def __init__(self, step=1):
+        self.cycle = 0
+        self.step = step
+
+    def switch_database(self, database):
+        pass
+
+    def query(self, query, epoch=None):
+        if query.startswith('SELECT value FROM illuminationSensor'):
+            return ResultSet({'statement_id': 0, 'series': [
+                {'name': 'illuminationSensor', 'columns': ['time', 'value'], 'values': [[1705321800, 100]]},
+            ]})
+
+        self.cycle += 1
+        timestamp = 1705321800 + self.cycle * self.step
+        if epoch is None:
+            timestamp = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(timestamp))
+        odd = self.cycle % 2
+        results = []
+        for statementId, statement in enumerate(query.split('; ')):
+            match = STATEMENT.match(statement)
+            fields = match['fields'].split(', ')
+            series = []
+            for i, alias in enumerate(re.findall(r"alias = '([^']*)'", statement)):
+                row = [timestamp] + [FIELD_VALUES[name][0] + i + FIELD_VALUES[name][1] * odd for name in fields]
+                series.append(cannedSeries(match['measurement'], alias, ['time'] + fields, row))
+            results.append(ResultSet({'statement_id': statementId, 'series': series}))
+        return results if len(results) > 1 else results[0]
+
+
+class CannedResponse:
+    status_code = 200
+    headers = {}
+
+    def __init__(self, data):
+        self.data = data
+
+    def json(self):
+        return self.data
+
+    def raise_for_status(self):
+        pass
+
+
+def cannedForecast(url, **kwargs):
+    days = CONFIG['OPEN_METEO_PARAMS']['forecast_days']
+    return CannedResponse({'daily': {
+        'time': [f'2024-01-{15 + i}' for i in range(days)],
+        'temperature_2m_max': [5.0 + i for i in range(days)],
+        'temperature_2m_min': [-2.0 + i for i in range(days)],
+        'weathercode': [[0, 3, 61, 71, 95][i % 5] for i in range(days)],
+    }})
+
+
+def cannedHistory(aliases, points):
+    """A warm-up style response: `points` 5-minute means per alias, with a gap now and then."""
+    series = []
+    for i, alias in enumerate(aliases):
+        values = [[1705321800 + 300 * n, 20.0 + (n + i) % 7, None if n % 97 == 0 else 40.0 + n % 11]
+                  for n in range(points)]
+        series.append({'name': 'Telemetry', 'tags': {'alias': alias},
+                       'columns': ['time', 'Temperature', 'Humidity'], 'values': values})
+    return ResultSet({'statement_id': 0, 'series': series})
+
+
+def measure(fn, rounds, number=1, setup=None):
+    """Time fn over several rounds and summarise the per-call cost in microseconds."""
+    fn()  # warm up caches and lazy initialisation
+    samples = []
+    for _ in range(rounds):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - start) / number * 1e6)
+    return {
+        'rounds': rounds,
+        'number': number,
+        'min_us': min(samples),
+        'median_us': statistics.median(samples),
+        'mean_us': statistics.fmean(samples),
+        'stdev_us': statistics.stdev(samples) if len(samples) > 1 else 0.0,
+    }
+
+
+def benchWindow(app, client=CannedInfluxClient):
+    """A shown MainWindow wired to the canned backends, with polling disabled."""
+    window = MainWindow()
+    window.client = ResilientInfluxClient(client)
+    window.connections.get = cannedForecast
+    # Benchmarks drive refreshes themselves; don't let the first paint start polling
+    window.pollingStarted = True
+    window.show()
+    app.processEvents()
+    return window
+
+
+def runBenchmarks(app, rounds):
+    window = benchWindow(app)
+
+    def clearForecast():
+        window.forecastCache.forecasts = None
+
+    def switchTo(theme):
+        def run():
+            theme()
+            app.processEvents()
+        return run
+
+    roomWidget = DashboardWidget('BENCH')
+    roomInputs = [(21.5, 45, EPOCHS[0]), (22.0, 65, EPOCHS[1])]
+    paintedWidget = DashboardWidget('BENCH')
+    paintedWidget.updateValues(22.0, 65, EPOCHS[0])
+    paintedWidget.show()
+    app.processEvents()
+    levelWidget = DashboardLevelWidget('BENCH', CONFIG['IMAGES_DIR'] + '/oleandr.png')
+    levelInputs = [(level, EPOCHS[level % 2]) for level in (0, 4, 8, 12, 15)]
+    counter = iter(range(sys.maxsize))
+    formatter = TimestampFormatter(ZURICH_TZ)
+    # One reading a minute; the 24h window fills up during the warm-up call's rounds
+    roomStats = RoomStats(CONFIG['STATS_WINDOW_S'], DashboardWidget.HUMIDITY_BAND)
+    statsClock = iter(range(1705321800, sys.maxsize, 60))
+    history = cannedHistory([f'room{i}Sensor' for i in range(6)], 2016)  # a week per sensor, 12k rows
+    seriesIso = [time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(epoch)) for epoch in SERIES]
+
+    benchmarks = {
+        'fetchData': (window.fetchData, 1, None),
+        'fetchData.coldForecast': (window.fetchData, 1, clearForecast),
+        'DashboardWidget.updateValues': (
+            lambda: roomWidget.updateValues(*roomInputs[next(counter) % len(roomInputs)]), 100, None),
+        'DashboardWidget.repaint': (paintedWidget.repaint, 20, None),
+        'DashboardLevelWidget.updateValues': (
+            lambda: levelWidget.updateValues(*levelInputs[next(counter) % len(levelInputs)]), 100, None),
+        'MainWindow.setDarkTheme': (switchTo(window.setDarkTheme), 1, switchTo(window.setLightTheme)),
+        'MainWindow.setLightTheme': (switchTo(window.setLightTheme), 1, switchTo(window.setDarkTheme)),
+        'format_timestamp': (
+            lambda: format_timestamp(TIMESTAMPS[next(counter) % len(TIMESTAMPS)]), 1000, None),
+        'TimestampFormatter.format': (
+            lambda: formatter.format(EPOCHS[next(counter) % len(EPOCHS)]), 1000, None),
+        'format_timestamp.series': (lambda: [format_timestamp(iso) for iso in seriesIso], 1, None),
+        'TimestampFormatter.formatSeries': (lambda: formatter.formatSeries(SERIES), 1, None),
+        'decodeResults.history': (lambda: decodeResults(history), 1, None),
+        'RoomStats.add': (
+            lambda: roomStats.add(next(statsClock), 20 + next(counter) % 50 / 10, 30 + next(counter) % 40), 1000, None),
+    }
+
+    results = {}
+    try:
+        for name, (fn, number, setup) in benchmarks.items():
+            results[name] = measure(fn, rounds, number, setup)
+    finally:
+        paintedWidget.close()
+        window.close()
+    return results
+
+
+def compare(benchmarks, baseline, threshold):
+    """Return {name: ratio} for every benchmark whose median grew by more than threshold."""
+    regressions = {}
+    for name, result in benchmarks.items():
+        base = baseline.get(name)
+        if not base or not base['median_us']:
+            continue
+        ratio = result['median_us'] / base['median_us']
+        if ratio > 1 + threshold:
+            regressions[name] = ratio
+    return regressions
+
+
+def printTable(benchmarks, baseline=None):
+    print(f"{'benchmark':<36} {'median':>12} {'min':>12} {'vs baseline':>12}")
+    for name, result in benchmarks.items():
+        change = ''
+        base = (baseline or {}).get(name)
+        if base and base['median_us']:
+            change = f"{(result['median_us'] / base['median_us'] - 1) * 100:+.1f}%"
+        print(f"{name:<36} {result['median_us']:>10.1f}us {result['min_us']:>10.1f}us {change:>12}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rounds', type=int, default=30, help='timed rounds per benchmark')
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    parser.add_argument('--baseline', help='JSON results of an earlier run to compare against')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='allowed median slowdown relative to the baseline (0.25 = 25%%)')
+    args = parser.parse_args(argv)
+
+    # Keep the app's per-cycle logging out of the measurements
+    logging.basicConfig(level=logging.WARNING)
+
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    with tempfile.TemporaryDirectory() as tmp:
+        CONFIG['FORECAST_CACHE_PATH'] = os.path.join(tmp, 'forecast.json')
+        CONFIG['SNAPSHOT_PATH'] = os.path.join(tmp, 'snapshot.json')
+        benchmarks = runBenchmarks(app, args.rounds)
+
+    results = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'python': platform.python_version(),
+        'qt': QT_VERSION_STR,
+        'pyqt': PYQT_VERSION_STR,
+        'platform': os.environ['QT_QPA_PLATFORM'],
+        'benchmarks': benchmarks,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)['benchmarks']
+    printTable(benchmarks, baseline)
+
+    if baseline is not None:
+        regressions = compare(benchmarks, baseline, args.threshold)
+        for name, ratio in regressions.items():
+            print(f"REGRESSION {name}: {ratio:.2f}x the baseline median", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
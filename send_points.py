@@ -0,0 +1,55 @@
+"""Send line-protocol points to a dashboard running in push mode.
+
+Examples:
+    python send_points.py 'Telemetry,alias=workRoomTempSensor Temperature=22.5,Humidity=48'
+    python send_points.py --demo
+"""
+import argparse
+import random
+import socket
+import time
+
+DEMO_POINTS = [
+    'Telemetry,alias=workRoomTempSensor Temperature={temperature:.1f},Humidity={humidity:.1f}',
+    'Telemetry,alias=bedRoomTempSensor Temperature={temperature:.1f},Humidity={humidity:.1f}',
+    'Flowers,alias=flowerOleandrSensor Moisture={moisture:.1f}',
+    'illuminationSensor value={illumination:.1f}',
+]
+
+
+def demoLines():
+    values = {
+        'temperature': random.uniform(18, 26),
+        'humidity': random.uniform(30, 70),
+        'moisture': random.uniform(0, 15),
+        'illumination': random.uniform(0, 200),
+    }
+    timestamp = time.time_ns()
+    return [template.format(**values) + f' {timestamp}' for template in DEMO_POINTS]
+
+
+def send(lines, host, port):
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.sendto('\n'.join(lines).encode('utf-8'), (host, port))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('lines', nargs='*', help='line-protocol points to send')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--demo', action='store_true', help='send random readings for a few sensors')
+    args = parser.parse_args()
+
+    lines = args.lines or []
+    if args.demo:
+        lines += demoLines()
+    if not lines:
+        parser.error('nothing to send')
+
+    send(lines, args.host, args.port)
+    print(f'Sent {len(lines)} point(s) to {args.host}:{args.port}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,212 @@
+"""Soak-test the dashboard for memory and Qt object growth.
+
+Drives fetchData, applyTheme and theme switches thousands of times per minute
+on the Qt offscreen platform against the canned backends of bench_app.py,
+with the sensor clock advancing a minute per refresh so a day of readings
+passes in 1440 cycles. After a warm-up (which fills the timestamp memo and
+the rolling-stats window) it samples RSS, tracemalloc's traced memory and
+live QObject counts, prints the allocation sites that grew most, and exits 1
+if any growth exceeds its limit.
+
+Examples:
+    python soak_app.py                       # 20000 cycles after the minimum warm-up
+    python soak_app.py --minutes 10 --max-rss-growth-mb 4
+"""
+import os
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+import argparse
+import gc
+import logging
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from PyQt5.QtCore import QObject
+from PyQt5.QtWidgets import QApplication
+
+from app import CONFIG, TIMESTAMPS, ThemeController
+from bench_app import CannedInfluxClient, benchWindow
+
+# Simulated seconds between refreshes: the shortest telemetry poll interval
+CLOCK_STEP_S = 60
+
+
+def minimumWarmup():
+    """Cycles until the bounded state a refresh feeds has filled up.
+
+    Each cycle brings one new sensor timestamp, so the timestamp memo fills
+    after memoSize cycles and the rolling-stats window after one window of
+    simulated time. Measured before that, their filling up looks like growth.
+    """
+    return max(TIMESTAMPS.memoSize, CONFIG['STATS_WINDOW_S'] // CLOCK_STEP_S)
+
+
+def residentBytes():
+    """Current RSS; where /proc is missing, the peak RSS instead."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def countQObjects(window):
+    """Return (QObjects parented under window, QObjects wrapped by Python anywhere)."""
+    gc.collect()
+    return len(window.findChildren(QObject)), sum(1 for obj in gc.get_objects() if isinstance(obj, QObject))
+
+
+def sample(cycle, start, window):
+    children, wrapped = countQObjects(window)
+    return {
+        'cycle': cycle,
+        'elapsed_s': time.perf_counter() - start,
+        'rss_bytes': residentBytes(),
+        'traced_bytes': tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0,
+        'qobjects': children,
+        'wrapped_qobjects': wrapped,
+    }
+
+
+def soakWindow(app):
+    return benchWindow(app, client=lambda: CannedInfluxClient(step=CLOCK_STEP_S))
+
+
+def runSoak(app, window, cycles, warmup, sampleEvery, themeEvery=10, forecastEvery=10, minutes=None, trace=True):
+    """Drive refreshes and theme switches; return (samples, tracemalloc snapshots or None).
+
+    The first sample is taken right after the warm-up and is the baseline the
+    others are compared to.
+    """
+    themes = [ThemeController.DARK, ThemeController.LIGHT]
+
+    def cycle(n):
+        if n % forecastEvery == 0:
+            # Parse a fresh forecast instead of serving the cached one
+            window.forecastCache.forecasts = None
+        window.fetchData()
+        window.applyTheme()
+        if n % themeEvery == 0:
+            window.switchTheme(themes[n // themeEvery % 2])
+        app.processEvents()
+
+    # Trace the warm-up too: memory allocated before tracing starts and freed
+    # later would make steady-state churn look like growth
+    if trace:
+        tracemalloc.start(10)
+    for n in range(warmup):
+        cycle(n)
+
+    start = time.perf_counter()
+    deadline = start + minutes * 60 if minutes else None
+    # The first QObject scan allocates about 2 MB once; do it before the
+    # baseline. The snapshot stays alive until the end, so take it before the
+    # first sample too, or its own memory counts as RSS growth
+    countQObjects(window)
+    baseline = tracemalloc.take_snapshot() if trace else None
+    samples = [sample(0, start, window)]
+    n = 0
+    while n < cycles and (deadline is None or time.perf_counter() < deadline):
+        n += 1
+        cycle(warmup + n)
+        if n % sampleEvery == 0:
+            samples.append(sample(n, start, window))
+    if samples[-1]['cycle'] != n:
+        samples.append(sample(n, start, window))
+    snapshots = (baseline, tracemalloc.take_snapshot()) if trace else None
+    if trace:
+        tracemalloc.stop()
+    return samples, snapshots
+
+
+def growth(samples):
+    """Change of every measured quantity from the baseline to the last sample."""
+    first, last = samples[0], samples[-1]
+    return {key: last[key] - first[key] for key in ('rss_bytes', 'traced_bytes', 'qobjects', 'wrapped_qobjects')}
+
+
+def checkGrowth(samples, limits):
+    """Return {quantity: (growth, limit)} for every quantity that grew beyond its limit."""
+    return {key: (change, limits[key]) for key, change in growth(samples).items()
+            if key in limits and change > limits[key]}
+
+
+def topAllocators(snapshots, limit=10):
+    """The allocation sites whose traced memory grew most between the two snapshots."""
+    ignore = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, '<frozen importlib._bootstrap*>')]
+    baseline, final = (snapshot.filter_traces(ignore) for snapshot in snapshots)
+    return [stat for stat in final.compare_to(baseline, 'lineno') if stat.size_diff > 0][:limit]
+
+
+def printSamples(samples):
+    print(f"{'cycle':>8} {'elapsed':>9} {'rss':>10} {'traced':>10} {'qobjects':>9} {'wrapped':>8}")
+    for s in samples:
+        print(f"{s['cycle']:>8} {s['elapsed_s']:>8.1f}s {s['rss_bytes'] / 2**20:>8.1f}MB "
+              f"{s['traced_bytes'] / 2**10:>8.0f}KB {s['qobjects']:>9} {s['wrapped_qobjects']:>8}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cycles', type=int, default=20000, help='measured refresh cycles')
+    parser.add_argument('--minutes', type=float, help='stop after this long even if cycles remain')
+    parser.add_argument('--warmup', type=int, default=minimumWarmup(),
+                        help='cycles run before the baseline sample (default and minimum: %(default)s)')
+    parser.add_argument('--sample-every', type=int, default=1000, help='cycles between samples')
+    parser.add_argument('--theme-every', type=int, default=10, help='cycles between forced theme switches')
+    parser.add_argument('--forecast-every', type=int, default=10, help='cycles between uncached forecast fetches')
+    parser.add_argument('--no-tracemalloc', action='store_true', help='skip allocation tracing (runs faster)')
+    parser.add_argument('--max-rss-growth-mb', type=float, default=8.0)
+    parser.add_argument('--max-traced-growth-kb', type=float, default=512.0)
+    parser.add_argument('--max-qobject-growth', type=int, default=0)
+    parser.add_argument('--log-level', default='DEBUG',
+                        help='level of the app logging, written to os.devnull as on a kiosk with no reader')
+    args = parser.parse_args(argv)
+    if args.warmup < minimumWarmup():
+        parser.error(f'--warmup must be at least {minimumWarmup()} cycles to fill the timestamp memo '
+                     f'and the statistics window')
+
+    # Keep the logging cost of the real app (DEBUG by default) without the output
+    devnull = open(os.devnull, 'w')
+    logging.basicConfig(level=args.log_level, stream=devnull)
+
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    with tempfile.TemporaryDirectory() as tmp:
+        CONFIG['FORECAST_CACHE_PATH'] = os.path.join(tmp, 'forecast.json')
+        CONFIG['SNAPSHOT_PATH'] = os.path.join(tmp, 'snapshot.json')
+        window = soakWindow(app)
+        try:
+            samples, snapshots = runSoak(app, window, args.cycles, args.warmup, args.sample_every,
+                                         args.theme_every, args.forecast_every, args.minutes,
+                                         trace=not args.no_tracemalloc)
+        finally:
+            window.close()
+
+    printSamples(samples)
+    elapsed = samples[-1]['elapsed_s']
+    print(f"{samples[-1]['cycle']} cycles in {elapsed:.1f}s ({samples[-1]['cycle'] / elapsed * 60:.0f}/min)")
+    if snapshots is not None:
+        print("Top allocation growth:")
+        for stat in topAllocators(snapshots):
+            print(f"  {stat}")
+
+    limits = {
+        'rss_bytes': args.max_rss_growth_mb * 2**20,
+        'traced_bytes': args.max_traced_growth_kb * 2**10,
+        'qobjects': args.max_qobject_growth,
+        'wrapped_qobjects': args.max_qobject_growth,
+    }
+    if args.no_tracemalloc:
+        del limits['traced_bytes']
+    failures = checkGrowth(samples, limits)
+    for key, (change, limit) in failures.items():
+        print(f"GROWTH {key}: +{change:.0f} exceeds the limit of {limit:.0f}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
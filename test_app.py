@@ -1,7 +1,23 @@
 import sys
+import json
+import math
+import os
+from array import array
+import socket
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 import pytest
 from unittest.mock import MagicMock, patch, PropertyMock
-from PyQt5.QtWidgets import QApplication
+from PyQt5.QtCore import QPoint, QRect
+from PyQt5.QtGui import QColor, QFont, QFontMetrics, QImage, QPalette
+from PyQt5.QtWidgets import QApplication, QLabel
+from PyQt5 import sip
+from influxdb.exceptions import InfluxDBClientError
 
 # Ensure a QApplication exists before importing widgets
 app = QApplication.instance() or QApplication(sys.argv)
@@ -15,7 +31,59 @@ from app import (
     DashboardLevelWidget,
     DashboardWeatherWidget,
     MainWindow,
+    Task,
     CONFIG,
+    buildLatestQuery,
+    collectSources,
+    ConnectionManager,
+    ForecastCache,
+    writeFileAtomic,
+    DashboardViewModel,
+    AssetRegistry,
+    ASSETS,
+    ThemeController,
+    Point,
+    parseLineProtocol,
+    PollScheduler,
+    SourceSchedule,
+    ResilientInfluxClient,
+    CircuitOpenError,
+    RingBuffer,
+    HistoryStore,
+    QueryPlanner,
+    parseContinuousQuery,
+    parseDuration,
+    formatDuration,
+    SnapshotStore,
+    StartupProfiler,
+    parseArgs,
+    Histogram,
+    Metrics,
+    METRICS,
+    MetricsServer,
+    parseTiles,
+    loadTiles,
+    TileRegistry,
+    FrameRenderer,
+    PngDirectorySink,
+    PngStreamSink,
+    TitleLabel,
+    fixTextSize,
+    TimestampFormatter,
+    TIMESTAMPS,
+    SeriesFrame,
+    decodeResults,
+    decodeSeries,
+    tileValue,
+    RollingExtremes,
+    RollingBandTime,
+    RoomStats,
+    buildStatsQuery,
+    SnapshotHub,
+    SnapshotServer,
+    SnapshotSubscriber,
+    dataEntries,
+    entriesData,
 )
 
 
@@ -175,31 +243,61 @@ class TestDashboardWidgetUpdateValues:
 # ---------------------------------------------------------------------------
 
 @pytest.fixture
-def main_window():
+def main_window(tmp_path):
     """Create a MainWindow with a mocked InfluxDB client (skip real connection)."""
-    with patch("app.InfluxDBClient") as MockClient:
+    with patch.dict(CONFIG, {
+            "FORECAST_CACHE_PATH": str(tmp_path / "forecast.json"),
+            "SNAPSHOT_PATH": str(tmp_path / "snapshot.json"),
+         }), \
+         patch("app.InfluxDBClient") as MockClient, \
+         patch("requests.Session.get", side_effect=ConnectionError("offline")):
         mock_client = MagicMock()
         MockClient.return_value = mock_client
         # Default query returns empty result so __init__'s fetchData/applyTheme don't crash
         mock_client.query.return_value = MagicMock(
-            raw={"series": [{"values": [["2024-01-01T00:00:00Z", 100]]}]}
+            raw={"series": [{"columns": ["time", "value"], "values": [[1704067200, 100]]}]}
         )
         window = MainWindow()
+        # Let startup background tasks finish before tests reconfigure the mock
+        window.threadPool.waitForDone()
         yield window, mock_client
+        # Don't let a poll armed by the test fire during a later test, outside the patches
+        window.pollTimer.stop()
+        window.close()
+        # Destroy the window now: left to the garbage collector, it may go while
+        # Qt walks all widgets (e.g. in a later test's setPalette) and crash
+        sip.delete(window)
 
 
 class TestGetIllumination:
     def test_returns_value(self, main_window):
         window, mock_client = main_window
         mock_client.query.return_value = MagicMock(
-            raw={"series": [{"values": [[None, 42]]}]}
+            raw={"series": [{"columns": ["time", "value"], "values": [[1704067200, 42]]}]}
         )
         assert window.getIllumination() == 42
 
-    def test_exception_returns_100(self, main_window):
+    def test_exception_returns_none(self, main_window):
         window, mock_client = main_window
         mock_client.query.side_effect = Exception("connection error")
-        assert window.getIllumination() == 100
+        assert window.getIllumination() is None
+
+    def test_failed_read_keeps_theme_and_backs_off(self, main_window):
+        window, mock_client = main_window
+        mock_client.query.side_effect = None
+        mock_client.query.return_value = MagicMock(
+            raw={"series": [{"columns": ["time", "value"], "values": [[1704067200, 5]]}]}
+        )
+        window.applyData(window.collectData(["illumination"]))
+        assert window.themeController.theme == ThemeController.DARK
+
+        mock_client.query.side_effect = ConnectionError("down")
+        window.themeController.switchedAt = -math.inf  # no dwell time in the way
+        with patch.object(window, "setLightTheme") as mock_light, \
+             patch.object(window.scheduler, "recordFailure") as mock_failure:
+            window.applyData(window.collectData(["illumination"]))
+        mock_light.assert_not_called()
+        mock_failure.assert_called_once_with("illumination")
 
 
 class TestGetMeasure:
@@ -208,7 +306,8 @@ class TestGetMeasure:
         mock_client.query.return_value = MagicMock(
             raw={
                 "series": [
-                    {"values": [["2024-01-15T12:00:00Z", 55.0, 22.5]]}
+                    {"columns": ["time", "Humidity", "Temperature"],
+                     "values": [[1705320000, 55.0, 22.5]]}
                 ]
             }
         )
@@ -216,7 +315,7 @@ class TestGetMeasure:
         assert isinstance(m, Measure)
         assert m.temperature == 22.5
         assert m.humidity == 55.0
-        assert m.timestamp == "2024-01-15T12:00:00Z"
+        assert m.timestamp == 1705320000
 
     def test_exception_returns_none(self, main_window):
         window, mock_client = main_window
@@ -228,12 +327,12 @@ class TestGetMoisture:
     def test_returns_moisture(self, main_window):
         window, mock_client = main_window
         mock_client.query.return_value = MagicMock(
-            raw={"series": [{"values": [["2024-06-01T10:00:00Z", 7.5]]}]}
+            raw={"series": [{"columns": ["time", "Moisture"], "values": [[1717236000, 7.5]]}]}
         )
         m = window.getMoisture("flowerOleandrSensor")
         assert isinstance(m, Moisture)
         assert m.value == 7.5
-        assert m.timestamp == "2024-06-01T10:00:00Z"
+        assert m.timestamp == 1717236000
 
     def test_exception_returns_none(self, main_window):
         window, mock_client = main_window
@@ -241,15 +340,98 @@ class TestGetMoisture:
         assert window.getMoisture("flowerOleandrSensor") is None
 
 
+class TestBuildLatestQuery:
+    def test_one_statement_per_measurement(self):
+        query = buildLatestQuery([
+            ("Telemetry", ("Humidity", "Temperature"), ["a", "b", "c"]),
+            ("Flowers", ("Moisture",), ["f"]),
+        ])
+        statements = query.split("; ")
+        assert len(statements) == 2
+        assert statements[0] == (
+            "SELECT time, Humidity, Temperature FROM Telemetry "
+            "WHERE alias = 'a' OR alias = 'b' OR alias = 'c' "
+            "GROUP BY alias ORDER BY time DESC LIMIT 2"
+        )
+        assert statements[1] == (
+            "SELECT time, Moisture FROM Flowers WHERE alias = 'f' "
+            "GROUP BY alias ORDER BY time DESC LIMIT 2"
+        )
+
+    def test_empty_measurement_omitted(self):
+        query = buildLatestQuery([("Telemetry", ("Humidity", "Temperature"), ["a"]), ("Flowers", ("Moisture",), [])])
+        assert "Flowers" not in query
+
+    def test_alias_quotes_are_escaped(self):
+        query = buildLatestQuery([("Telemetry", ("Temperature",), ["x' OR alias =~ /.*/ OR alias = 'y", "back\\slash"])])
+        assert "WHERE alias = 'x\\' OR alias =~ /.*/ OR alias = \\'y' OR alias = 'back\\\\slash' GROUP BY" in query
+
+
+class TestGetLatest:
+    def test_returns_dict_keyed_by_alias(self, main_window):
+        window, mock_client = main_window
+        mock_client.query.reset_mock()
+        mock_client.query.return_value = [
+            MagicMock(raw={"series": [
+                {"name": "Telemetry", "tags": {"alias": "workRoomTempSensor"},
+                 "columns": ["time", "Humidity", "Temperature"],
+                 "values": [[1705320000, 55.0, 22.5]]},
+                {"name": "Telemetry", "tags": {"alias": "bedRoomTempSensor"},
+                 "columns": ["time", "Humidity", "Temperature"],
+                 "values": [[1705320060, 45.0, 19.0]]},
+            ]}),
+            MagicMock(raw={"series": [
+                {"name": "Flowers", "tags": {"alias": "flowerOlivaSensor"},
+                 "columns": ["time", "Moisture"],
+                 "values": [[1705316400, 7.5]]},
+            ]}),
+        ]
+
+        latest = window.getLatest()
+
+        assert mock_client.query.call_count == 1
+        assert latest["workRoomTempSensor"] == Measure(22.5, 55.0, 1705320000)
+        assert latest["bedRoomTempSensor"] == Measure(19.0, 45.0, 1705320060)
+        assert latest["flowerOlivaSensor"] == Moisture(7.5, 1705316400)
+        assert "livRoomTempSensor" not in latest
+
+    def test_exception_returns_none(self, main_window):
+        window, mock_client = main_window
+        mock_client.query.side_effect = Exception("query failed")
+        assert window.getLatest() is None
+
+    def test_cadence_from_two_newest_rows(self, main_window):
+        window, mock_client = main_window
+        mock_client.query.return_value = MagicMock(raw={"series": [
+            {"name": "Flowers", "tags": {"alias": "flowerOlivaSensor"}, "columns": ["time", "Moisture"],
+             "values": [[1705320000, 7.5], [1705318200, 7.0]]},
+            {"name": "Flowers", "tags": {"alias": "flowerOleandrSensor"}, "columns": ["time", "Moisture"],
+             "values": [[1705320000, 3.0]]},
+        ]})
+        cadences = {}
+        latest = window.getLatest(["flowers"], cadences)
+        assert latest["flowerOlivaSensor"] == Moisture(7.5, 1705320000)
+        assert cadences == {"flowerOlivaSensor": 1800}
+
+    def test_only_requested_measurements_queried(self, main_window):
+        window, mock_client = main_window
+        mock_client.query.reset_mock()
+        window.getLatest(["flowers"])
+        query = mock_client.query.call_args.args[0]
+        assert "Flowers" in query
+        assert "Telemetry" not in query
+
+
 class TestFetchData:
     def test_widgets_updated_on_success(self, main_window):
         window, mock_client = main_window
 
         measure = Measure(temperature=21.0, humidity=50.0, timestamp="2024-01-15T12:00:00Z")
         moisture = Moisture(value=8.0, timestamp="2024-01-15T12:00:00Z")
+        latest = {tile.alias: measure for tile in window.tiles.ofSource("telemetry")}
+        latest.update({tile.alias: moisture for tile in window.tiles.ofSource("flowers")})
 
-        with patch.object(window, "getMeasure", return_value=measure), \
-             patch.object(window, "getMoisture", return_value=moisture), \
+        with patch.object(window, "getLatest", return_value=latest), \
              patch.object(window, "getWeather", return_value=None):
             window.fetchData()
 
@@ -265,14 +447,127 @@ class TestFetchData:
         # Store original text
         orig_temp = window.widgets["workRoom"].labelTemperature.text()
 
-        with patch.object(window, "getMeasure", return_value=None), \
-             patch.object(window, "getMoisture", return_value=None):
+        with patch.object(window, "getLatest", return_value={}):
             window.fetchData()
 
         # Labels should remain unchanged
         assert window.widgets["workRoom"].labelTemperature.text() == orig_temp
 
 
+class TestCollectSources:
+    def test_sources_run_concurrently(self):
+        # Each read only returns once all three are in flight at the same time;
+        # run one after another, the first would time out and yield None
+        barrier = threading.Barrier(3)
+
+        def meeting(value):
+            def read():
+                barrier.wait(5)
+                return value
+            return read
+
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            result = collectSources({"a": meeting(1), "b": meeting(2), "c": meeting(3)}, executor)
+
+        assert result == {"a": 1, "b": 2, "c": 3}
+
+    def test_failing_source_yields_none(self):
+        def broken():
+            raise RuntimeError("down")
+
+        result = collectSources({"ok": lambda: 42, "broken": broken})
+        assert result == {"ok": 42, "broken": None}
+
+
+class TestFetchDataSources:
+    def test_cycle_reads_all_sources_and_applies_theme(self, main_window):
+        window, _ = main_window
+        with patch.object(window, "getLatest", return_value={}) as mock_latest, \
+             patch.object(window, "getWeather", return_value=None) as mock_weather, \
+             patch.object(window, "getIllumination", return_value=5) as mock_illumination, \
+             patch.object(window, "setDarkTheme") as mock_dark:
+            window.fetchData()
+        mock_latest.assert_called_once()
+        mock_weather.assert_called_once()
+        mock_illumination.assert_called_once()
+        mock_dark.assert_called_once()
+
+
+class TestRequestFetch:
+    def test_collects_in_background_and_applies_on_gui_thread(self, main_window):
+        window, _ = main_window
+        release = threading.Event()
+        measure = Measure(temperature=24.0, humidity=48.0, timestamp="2024-01-15T12:00:00Z")
+
+        def slow_latest(*args, **kwargs):
+            release.wait(5)
+            return {"workRoomTempSensor": measure}
+
+        with patch.object(window, "getLatest", side_effect=slow_latest), \
+             patch.object(window, "getWeather", return_value=None):
+            window.requestFetch()
+            # The call returns while the worker is still blocked
+            assert window.fetchInFlight
+            assert window.widgets["workRoom"].labelTemperature.text() != "24.0"
+
+            release.set()
+            window.threadPool.waitForDone()
+            QApplication.processEvents()
+
+        assert not window.fetchInFlight
+        assert window.widgets["workRoom"].labelTemperature.text() == "24.0"
+
+    def test_skips_while_in_flight(self, main_window):
+        window, _ = main_window
+        window.fetchInFlight = True
+        with patch.object(window, "collectData") as mock_collect:
+            window.requestFetch()
+            window.threadPool.waitForDone()
+        mock_collect.assert_not_called()
+
+    def test_illumination_source_applies_theme(self, main_window):
+        window, _ = main_window
+        with patch.object(window, "getIllumination", return_value=5), \
+             patch.object(window, "getLatest") as mock_latest, \
+             patch.object(window, "setDarkTheme") as mock_dark:
+            window.requestFetch(["illumination"])
+            window.threadPool.waitForDone()
+            QApplication.processEvents()
+        mock_dark.assert_called_once()
+        mock_latest.assert_not_called()
+        assert not window.fetchInFlight
+
+    def test_poll_due_fetches_only_due_sources(self, main_window):
+        window, _ = main_window
+        for name, schedule in window.scheduler.schedules.items():
+            schedule.nextDue = 0 if name == "flowers" else math.inf
+        with patch.object(window, "requestFetch") as mock_fetch:
+            window.pollDue()
+        mock_fetch.assert_called_once_with(["flowers"])
+
+    def test_poll_due_does_not_rearm_while_in_flight(self, main_window):
+        window, _ = main_window
+        for schedule in window.scheduler.schedules.values():
+            schedule.nextDue = math.inf
+        release = threading.Event()
+        with patch.object(window, "collectData", side_effect=lambda sources: release.wait(5) and None):
+            window.requestFetch(["telemetry"])
+            window.scheduler.schedules["flowers"].nextDue = 0
+            window.pollTimer.stop()
+            with patch.object(window.pollTimer, "start") as mock_start:
+                window.pollDue()
+            # Re-arming at 0 ms here would spin the GUI thread until the worker finishes
+            mock_start.assert_not_called()
+            assert window.fetchInFlight
+
+            release.set()
+            window.threadPool.waitForDone()
+            with patch.object(window.pollTimer, "start") as mock_start:
+                QApplication.processEvents()
+            mock_start.assert_called_once_with(0)
+        assert window.scheduler.due() == ["flowers"]
+
+
 class TestApplyTheme:
     def test_dark_theme_below_threshold(self, main_window):
         window, mock_client = main_window
@@ -284,18 +579,33 @@ class TestApplyTheme:
             mock_dark.assert_called_once()
             mock_light.assert_not_called()
 
-    def test_light_theme_at_threshold(self, main_window):
+    def test_unchanged_theme_is_noop(self, main_window):
         window, mock_client = main_window
+        window.applyIllumination(100)
 
         with patch.object(window, "getIllumination", return_value=CONFIG["ILLUMINATION_THRESHOLD"]), \
              patch.object(window, "setDarkTheme") as mock_dark, \
              patch.object(window, "setLightTheme") as mock_light:
             window.applyTheme()
-            mock_light.assert_called_once()
+            mock_light.assert_not_called()
+            mock_dark.assert_not_called()
+
+    def test_dark_theme_kept_inside_hysteresis_band(self, main_window):
+        window, mock_client = main_window
+        window.themeController.minDwell = 0
+        window.applyIllumination(10)
+
+        with patch.object(window, "getIllumination", return_value=CONFIG["ILLUMINATION_THRESHOLD"]), \
+             patch.object(window, "setDarkTheme") as mock_dark, \
+             patch.object(window, "setLightTheme") as mock_light:
+            window.applyTheme()
+            mock_light.assert_not_called()
             mock_dark.assert_not_called()
 
     def test_light_theme_above_threshold(self, main_window):
         window, mock_client = main_window
+        window.themeController.minDwell = 0
+        window.applyIllumination(10)
 
         with patch.object(window, "getIllumination", return_value=50), \
              patch.object(window, "setDarkTheme") as mock_dark, \
@@ -304,6 +614,44 @@ class TestApplyTheme:
             mock_light.assert_called_once()
             mock_dark.assert_not_called()
 
+    def test_switch_is_a_single_repaint(self, main_window):
+        window, mock_client = main_window
+
+        with patch.object(window, "setUpdatesEnabled", wraps=window.setUpdatesEnabled) as mock_updates:
+            window.applyIllumination(10)
+        assert [c.args for c in mock_updates.call_args_list] == [(False,), (True,)]
+        assert window.updatesEnabled()
+        assert QApplication.instance().palette().color(QPalette.Window) == QColor(45, 45, 45)
+
+
+class TestThemeController:
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        self.now = 0.0
+        self.controller = ThemeController(20, hysteresis=5, minDwell=300, clock=lambda: self.now)
+
+    def test_first_decision_applied(self):
+        assert self.controller.decide(10) == ThemeController.DARK
+
+    def test_hysteresis(self):
+        self.controller.decide(10)
+        self.now += 1000
+        assert self.controller.decide(20) is None
+        assert self.controller.decide(24) is None
+        assert self.controller.decide(25) == ThemeController.LIGHT
+
+    def test_dwell_time_defers_switch(self):
+        self.controller.decide(50)
+        self.now += 10
+        assert self.controller.decide(10) == ThemeController.DARK
+        self.now += 10
+        assert self.controller.decide(100) is None
+        self.now += 300
+        assert self.controller.decide(100) == ThemeController.LIGHT
+
+    def test_palettes_are_precomputed(self):
+        assert self.controller.palette(ThemeController.DARK) is self.controller.palette(ThemeController.DARK)
+
 
 # ---------------------------------------------------------------------------
 # DayForecast dataclass
@@ -380,8 +728,10 @@ class TestGetWeather:
             }
         }
         mock_response.raise_for_status = MagicMock()
+        mock_response.status_code = 200
+        mock_response.headers = {}
 
-        with patch("app.requests.get", return_value=mock_response):
+        with patch.object(window.connections.session, "get", return_value=mock_response):
             result = window.getWeather()
 
         assert len(result) == 2
@@ -394,7 +744,1740 @@ class TestGetWeather:
     def test_failure_returns_none(self, main_window):
         window, _ = main_window
 
-        with patch("app.requests.get", side_effect=Exception("network error")):
+        with patch.object(window.connections.session, "get", side_effect=Exception("network error")):
             result = window.getWeather()
 
         assert result is None
+
+
+# ---------------------------------------------------------------------------
+# ForecastCache
+# ---------------------------------------------------------------------------
+
+FORECAST_JSON = {
+    "daily": {
+        "time": ["2024-03-04"],
+        "temperature_2m_max": [12.0],
+        "temperature_2m_min": [3.0],
+        "weathercode": [0],
+    }
+}
+
+
+def forecast_response(status_code=200, headers=None):
+    response = MagicMock()
+    response.status_code = status_code
+    response.headers = headers or {}
+    response.json.return_value = FORECAST_JSON
+    return response
+
+
+class TestForecastCache:
+    @pytest.fixture(autouse=True)
+    def setup(self, tmp_path):
+        self.now = 1000.0
+        self.path = str(tmp_path / "forecast.json")
+        self.connections = MagicMock()
+        self.connections.get.return_value = forecast_response(headers={"ETag": '"v1"'})
+
+    def make_cache(self):
+        return ForecastCache(self.connections, path=self.path, ttl=3600, clock=lambda: self.now)
+
+    def test_fresh_entry_served_from_memory(self):
+        cache = self.make_cache()
+        first = cache.get()
+        self.now += 60
+        second = cache.get()
+        assert first == second == [DayForecast("2024-03-04", 12.0, 3.0, 0)]
+        assert self.connections.get.call_count == 1
+
+    def test_stale_entry_served_while_revalidating(self):
+        cache = self.make_cache()
+        cache.get()
+        self.now += 3601
+        self.connections.get.return_value = forecast_response(status_code=304)
+
+        assert cache.get() == [DayForecast("2024-03-04", 12.0, 3.0, 0)]
+        cache.refreshThread.join(5)
+
+        assert self.connections.get.call_count == 2
+        headers = self.connections.get.call_args.kwargs["headers"]
+        assert headers["If-None-Match"] == '"v1"'
+        assert cache.fetchedAt == self.now
+
+    def test_disk_copy_survives_restart(self):
+        self.make_cache().get()
+        restarted = self.make_cache()
+        assert restarted.get() == [DayForecast("2024-03-04", 12.0, 3.0, 0)]
+        assert restarted.etag == '"v1"'
+        assert self.connections.get.call_count == 1
+
+    def test_weather_poll_is_shorter_than_ttl(self):
+        assert CONFIG["POLL_SOURCES"]["weather"]["max"] < CONFIG["FORECAST_TTL_S"]
+
+    def test_cold_cache_failure_raises(self):
+        self.connections.get.side_effect = Exception("offline")
+        with pytest.raises(Exception):
+            self.make_cache().get()
+
+    def test_not_modified_without_cached_body_refetches_unconditionally(self):
+        cache = self.make_cache()
+        cache.etag, cache.lastModified = '"stale"', "Mon, 04 Mar 2024 00:00:00 GMT"
+        self.connections.get.side_effect = [forecast_response(status_code=304),
+                                            forecast_response(headers={"ETag": '"v2"'})]
+        assert cache.get() == [DayForecast("2024-03-04", 12.0, 3.0, 0)]
+        first, second = self.connections.get.call_args_list
+        assert first.kwargs["headers"]["If-None-Match"] == '"stale"'
+        assert second.kwargs["headers"] == {}
+        assert cache.etag == '"v2"'
+
+    def test_concurrent_saves_use_separate_temporary_files(self, tmp_path):
+        barrier = threading.Barrier(4)
+
+        def write(n):
+            barrier.wait(5)
+            for i in range(50):
+                writeFileAtomic(self.path, json.dumps({"writer": n, "i": i}))
+
+        with ThreadPoolExecutor(4) as pool:
+            list(pool.map(write, range(4)))
+        with open(self.path, encoding="utf-8") as f:
+            assert json.load(f)["i"] == 49
+        assert os.listdir(tmp_path) == ["forecast.json"]
+
+
+class TestWeatherWidgetChangeDetection:
+    def test_unchanged_forecast_not_rerendered(self, main_window):
+        window, _ = main_window
+        forecasts = [DayForecast("2024-03-04", 12.0, 3.0, 0)]
+        data = {"latest": {}, "forecasts": forecasts, "illumination": None}
+        with patch.object(window.widgets["weather"], "updateValues") as mock_update:
+            window.applyData(data)
+            window.applyData({**data, "forecasts": list(forecasts)})
+            window.applyData({**data, "forecasts": [DayForecast("2024-03-04", 13.0, 3.0, 0)]})
+        assert mock_update.call_count == 2
+
+
+# ---------------------------------------------------------------------------
+# DashboardViewModel
+# ---------------------------------------------------------------------------
+
+class TestDashboardViewModel:
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        self.widgets = {"room": DashboardWidget("TEST"), "plant": DashboardLevelWidget("TEST", "images/olive.png")}
+        self.vm = DashboardViewModel(self.widgets)
+
+    def test_identical_values_skipped(self):
+        measure = Measure(21.0, 50.0, "2024-01-15T12:00:00Z")
+        self.vm.beginCycle()
+        assert self.vm.render("room", measure)
+        self.vm.beginCycle()
+        with patch.object(self.widgets["room"], "updateValues") as mock_update:
+            assert not self.vm.render("room", Measure(21.0, 50.0, "2024-01-15T12:00:00Z"))
+        mock_update.assert_not_called()
+        assert (self.vm.updated, self.vm.skipped) == (0, 1)
+
+    def test_changed_values_rendered(self):
+        self.vm.render("plant", Moisture(2.0, "2024-01-15T12:00:00Z"))
+        self.vm.render("plant", Moisture(13.0, "2024-01-15T12:05:00Z"))
+        plant = self.widgets["plant"]
+        assert plant.currentLevel == 13.0
+        assert plant.currentIcon is plant.levelIcons[4]
+        assert "13:05:00" in plant.timestampLabel.text()
+
+    def test_none_ignored(self):
+        assert not self.vm.render("room", None)
+        assert (self.vm.updated, self.vm.skipped) == (0, 0)
+
+    def test_humidity_color_is_a_palette_swap(self):
+        widget = self.widgets["room"]
+        widget.updateValues(20.0, 50.0, "2024-01-15T12:00:00Z")
+        normal = widget.labelHumidity.palette()
+        widget.updateValues(20.0, 70.0, "2024-01-15T12:05:00Z")
+        assert widget.labelHumidity.graphicsEffect() is None
+        assert widget.labelHumidity.palette() is not normal
+        assert widget.labelHumidity.palette().color(QPalette.ColorRole.WindowText) == QColor("red")
+
+
+# ---------------------------------------------------------------------------
+# AssetRegistry
+# ---------------------------------------------------------------------------
+
+class TestAssetRegistry:
+    def test_widgets_share_decoded_pixmaps(self):
+        first = DashboardLevelWidget("A", "images/olive.png")
+        decoded = len(ASSETS.pixmaps)
+        second = DashboardLevelWidget("B", "images/olive.png")
+        DashboardWidget("C")
+        DashboardWidget("D")
+
+        assert len(ASSETS.pixmaps) == decoded
+        assert first.levelIcons is second.levelIcons
+        assert first.levelIcons[0] is ASSETS.themed("level1")
+
+    def test_dark_theme_uses_shared_dark_set(self):
+        widget = DashboardLevelWidget("A", "images/olive.png")
+        widget.setDarkTheme()
+        assert widget.levelIcons is ASSETS.levelIcons(dark=True)
+        assert widget.iconLevel.pixmap().cacheKey() == ASSETS.themed("level1", dark=True).cacheKey()
+
+    def test_scaled_variant_matches_device_pixel_ratio(self):
+        registry = AssetRegistry("images")
+        with patch.object(registry, "devicePixelRatio", return_value=2.0):
+            scaled = registry.themed("humidity", size=32)
+            again = registry.themed("humidity", size=32)
+        assert scaled is again
+        assert scaled.devicePixelRatio() == 2.0
+        assert max(scaled.width(), scaled.height()) == 64
+
+
+# ---------------------------------------------------------------------------
+# PollScheduler
+# ---------------------------------------------------------------------------
+
+class TestPollScheduler:
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        self.now = 0.0
+        self.scheduler = PollScheduler(
+            {
+                "telemetry": SourceSchedule(300, 60, 900),
+                "weather": SourceSchedule(3600, 900, 3600),
+            },
+            backoffMax=1800,
+            clock=lambda: self.now,
+            jitter=lambda: 1.0,
+            wallClock=lambda: self.wall,
+        )
+        self.wall = 1705320000.0
+
+    def test_all_sources_due_at_start(self):
+        assert sorted(self.scheduler.due()) == ["telemetry", "weather"]
+
+    def test_in_flight_sources_not_due(self):
+        self.scheduler.begin(["telemetry"])
+        assert self.scheduler.due() == ["weather"]
+
+    def test_next_poll_when_earliest_sensor_expects_a_reading(self):
+        # a wrote 40 s ago every 120 s, b 10 s ago every 300 s: a is next, in 80 s + settle time
+        self.scheduler.recordSuccess("telemetry", {"a": self.wall - 40, "b": self.wall - 10}, {"a": 120, "b": 300})
+        schedule = self.scheduler.schedules["telemetry"]
+        assert schedule.current == 80 + PollScheduler.SETTLE_S
+        assert schedule.nextDue == 85
+
+    def test_interval_shrinks_back_with_fresh_data(self):
+        self.scheduler.recordSuccess("telemetry", {"a": self.wall - 1000}, {"a": 300})
+        self.scheduler.recordSuccess("telemetry", {"a": self.wall - 1}, {"a": 300})
+        assert self.scheduler.schedules["telemetry"].current == 304
+
+    def test_cadence_clamped_to_range(self):
+        self.scheduler.recordSuccess("telemetry", {"a": self.wall}, {"a": 10})
+        assert self.scheduler.schedules["telemetry"].current == 60
+        self.scheduler.recordSuccess("telemetry", {"a": self.wall}, {"a": 3600})
+        assert self.scheduler.schedules["telemetry"].current == 900
+
+    def test_overdue_sensor_checked_one_cadence_later(self):
+        self.scheduler.recordSuccess("telemetry", {"a": self.wall - 1000}, {"a": 300})
+        assert self.scheduler.schedules["telemetry"].current == 300
+
+    def test_base_interval_without_cadence(self):
+        self.scheduler.recordSuccess("telemetry", {"a": self.wall - 1000}, {"a": 60})
+        self.scheduler.recordSuccess("telemetry", {"a": self.wall}, {})
+        assert self.scheduler.schedules["telemetry"].current == 300
+
+    def test_steady_sensor_polled_at_its_cadence_despite_latency(self):
+        # A 300 s sensor with 3 s of poll latency: each poll sees the new reading
+        schedule = self.scheduler.schedules["telemetry"]
+        polls = []
+        for _ in range(20):
+            self.now += 3
+            self.wall += 3
+            newest = self.wall - (self.wall - 1705320000) % 300
+            self.scheduler.recordSuccess("telemetry", {"a": newest}, {"a": 300})
+            polls.append(newest)
+            self.wall += schedule.nextDue - self.now
+            self.now = schedule.nextDue
+        assert all(b - a == 300 for a, b in zip(polls[1:], polls[2:]))
+
+    def test_failures_back_off_exponentially_from_min_interval(self):
+        delays = []
+        for _ in range(7):
+            self.scheduler.recordFailure("telemetry")
+            delays.append(self.scheduler.schedules["telemetry"].nextDue)
+        assert delays == [60, 120, 240, 480, 960, 1800, 1800]
+
+    def test_first_retry_sooner_than_a_regular_poll(self):
+        self.scheduler.recordFailure("weather")
+        assert self.scheduler.schedules["weather"].nextDue == 900
+
+    def test_jitter_spreads_retries(self):
+        self.scheduler.jitter = lambda: 0.0
+        self.scheduler.recordFailure("telemetry")
+        assert self.scheduler.schedules["telemetry"].nextDue == 30
+
+    def test_success_resets_failures(self):
+        self.scheduler.recordFailure("weather")
+        self.scheduler.recordSuccess("weather")
+        schedule = self.scheduler.schedules["weather"]
+        assert schedule.failures == 0
+        assert schedule.nextDue == 3600
+
+    def test_next_delay(self):
+        self.scheduler.recordSuccess("telemetry")
+        self.scheduler.recordSuccess("weather")
+        self.now = 100
+        assert self.scheduler.nextDelay() == 200
+
+
+class TestRecordPoll:
+    def test_failed_query_backs_off_influx_sources(self, main_window):
+        window, _ = main_window
+        with patch.object(window.scheduler, "recordFailure") as mock_failure:
+            window.applyData({"latest": None, "sources": ["telemetry", "flowers"]})
+        assert [c.args[0] for c in mock_failure.call_args_list] == ["telemetry", "flowers"]
+
+    def test_sensor_timestamps_recorded(self, main_window):
+        window, _ = main_window
+        latest = {"workRoomTempSensor": Measure(20.0, 50.0, "2024-01-15T12:00:00Z")}
+        with patch.object(window.scheduler, "recordSuccess") as mock_success:
+            window.applyData({"latest": latest, "sources": ["telemetry"]})
+        mock_success.assert_called_once_with("telemetry", {"workRoomTempSensor": 1705320000.0}, None)
+
+    def test_cadences_passed_to_scheduler(self, main_window):
+        window, _ = main_window
+        latest = {"workRoomTempSensor": Measure(20.0, 50.0, 1705320000)}
+        with patch.object(window.scheduler, "recordSuccess") as mock_success:
+            window.applyData({"latest": latest, "sources": ["telemetry"], "cadences": {"workRoomTempSensor": 60}})
+        mock_success.assert_called_once_with("telemetry", {"workRoomTempSensor": 1705320000.0},
+                                             {"workRoomTempSensor": 60})
+
+
+# ---------------------------------------------------------------------------
+# ResilientInfluxClient
+# ---------------------------------------------------------------------------
+
+class TestResilientInfluxClient:
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        self.now = 0.0
+        self.inner = MagicMock()
+        self.factory = MagicMock(return_value=self.inner)
+        self.client = ResilientInfluxClient(
+            self.factory, failureThreshold=3, resetTimeout=60, clock=lambda: self.now
+        )
+
+    def fail(self, times):
+        self.inner.query.side_effect = ConnectionError("down")
+        for _ in range(times):
+            with pytest.raises(ConnectionError):
+                self.client.query("SELECT 1")
+
+    def test_connects_lazily(self):
+        self.factory.assert_not_called()
+        self.client.query("SELECT 1")
+        self.client.query("SELECT 2")
+        self.factory.assert_called_once()
+
+    def test_reconnects_after_failure(self):
+        self.fail(1)
+        self.inner.query.side_effect = None
+        self.client.query("SELECT 1")
+        assert self.factory.call_count == 2
+
+    def test_opens_after_threshold_and_short_circuits(self):
+        self.fail(3)
+        assert self.client.state == ResilientInfluxClient.OPEN
+        assert self.client.isOpen()
+        self.inner.query.reset_mock()
+        with pytest.raises(CircuitOpenError):
+            self.client.query("SELECT 1")
+        self.inner.query.assert_not_called()
+
+    def test_half_open_probe_closes_on_success(self):
+        self.fail(3)
+        self.now += 61
+        assert not self.client.isOpen()
+        self.inner.query.side_effect = None
+        self.client.query("SELECT 1")
+        assert self.client.stats() == {"state": "closed", "failures": 0}
+
+    def test_half_open_probe_reopens_on_failure(self):
+        self.fail(3)
+        self.now += 61
+        self.fail(1)
+        assert self.client.state == ResilientInfluxClient.OPEN
+        assert self.client.isOpen()
+
+    def test_only_one_probe_at_a_time(self):
+        self.fail(3)
+        self.now += 61
+        assert self.client.allowRequest()
+        assert not self.client.allowRequest()
+
+    def test_rejected_query_does_not_count(self):
+        self.inner.query.side_effect = InfluxDBClientError("bad query")
+        for _ in range(5):
+            with pytest.raises(InfluxDBClientError):
+                self.client.query("SELEKT")
+        assert self.client.state == ResilientInfluxClient.CLOSED
+
+    def test_every_failed_request_counts_toward_the_breaker(self):
+        import requests
+        manager = ConnectionManager()
+        client = ResilientInfluxClient(lambda: manager.influxClient("localhost", 8086),
+                                       failureThreshold=3, resetTimeout=60, clock=lambda: self.now)
+        with patch.object(manager.session, "request",
+                          side_effect=requests.exceptions.ConnectionError("down")) as mock_request:
+            for _ in range(3):
+                with pytest.raises(requests.exceptions.ConnectionError):
+                    client.query("SELECT 1")
+            with pytest.raises(CircuitOpenError):
+                client.query("SELECT 1")
+        # No retries hidden inside InfluxDBClient: one request per counted failure
+        assert mock_request.call_count == 3
+        assert client.state == ResilientInfluxClient.OPEN
+
+    def test_window_builds_single_attempt_client(self, main_window):
+        window, _ = main_window
+        with patch("app.InfluxDBClient") as MockClient:
+            window.connectInflux()
+        assert MockClient.call_args.kwargs["retries"] == 1
+
+
+class TestCircuitBreakerCycle:
+    def test_open_breaker_skips_database_reads(self, main_window):
+        window, mock_client = main_window
+        window.client.state = ResilientInfluxClient.OPEN
+        window.client.openedAt = time.monotonic()
+        mock_client.query.reset_mock()
+
+        with patch.object(window, "getWeather", return_value=None), \
+             patch.object(window.scheduler, "recordFailure") as mock_failure:
+            window.fetchData()
+
+        mock_client.query.assert_not_called()
+        assert sorted(c.args[0] for c in mock_failure.call_args_list) == \
+            ["flowers", "illumination", "telemetry", "weather"]
+
+
+# ---------------------------------------------------------------------------
+# History
+# ---------------------------------------------------------------------------
+
+class TestRingBuffer:
+    def test_wraps_and_keeps_order(self):
+        buffer = RingBuffer(3)
+        for t in range(1, 6):
+            assert buffer.append(float(t), t * 10.0)
+        times, values = buffer.series()
+        assert list(times) == [3.0, 4.0, 5.0]
+        assert list(values) == [30.0, 40.0, 50.0]
+        assert len(buffer) == 3
+
+    def test_rejects_out_of_order_samples(self):
+        buffer = RingBuffer(3)
+        buffer.append(10.0, 1.0)
+        assert not buffer.append(10.0, 2.0)
+        assert not buffer.append(5.0, 2.0)
+        assert list(buffer.series()[1]) == [1.0]
+
+    def test_same_bucket_replaces_last_sample(self):
+        buffer = RingBuffer(3, bucket=300)
+        buffer.append(600.0, 1.0)
+        assert buffer.append(660.0, 2.0)
+        assert buffer.append(899.0, 3.0)
+        assert buffer.append(900.0, 4.0)
+        times, values = buffer.series()
+        assert list(times) == [899.0, 900.0]
+        assert list(values) == [3.0, 4.0]
+
+    def test_fixed_memory(self):
+        buffer = RingBuffer(2016)
+        before = buffer.nbytes()
+        for t in range(5000):
+            buffer.append(float(t), 1.0)
+        assert buffer.nbytes() == before == 2016 * 16
+
+
+class TestHistoryStore:
+    def test_record_appends_each_field(self):
+        store = HistoryStore(10)
+        store.record({
+            "room": Measure(21.0, 50.0, "2024-01-15T12:00:00Z"),
+            "plant": Moisture(7.0, "2024-01-15T12:00:00Z"),
+        })
+        assert list(store.series("room", "Temperature")[1]) == [21.0]
+        assert list(store.series("room", "Humidity")[1]) == [50.0]
+        assert list(store.series("plant", "Moisture")) == [array("d", [1705320000.0]), array("d", [7.0])]
+
+    def test_load_keeps_newer_samples(self):
+        store = HistoryStore(10)
+        store.append("room", "Temperature", 300.0, 25.0)
+        store.load("room", "Temperature", [100, 200, 300], [20.0, None, 22.0])
+        times, values = store.series("room", "Temperature")
+        assert list(times) == [100.0, 300.0]
+        assert list(values) == [20.0, 25.0]
+
+    def test_fast_polls_still_span_retention(self):
+        store = HistoryStore(7 * 24 * 12, 300)
+        for t in range(0, 7 * 24 * 3600, 60):
+            store.append("room", "Temperature", float(t), 20.0)
+        times, values = store.series("room", "Temperature")
+        assert times[-1] - times[0] >= 7 * 24 * 3600 - 600
+
+    def test_dozens_of_sensors_stay_small(self):
+        store = HistoryStore(7 * 24 * 12)
+        for i in range(40):
+            for field in ("Temperature", "Humidity"):
+                store.append(f"sensor{i}", field, 1.0, 1.0)
+        assert store.nbytes() < 3 * 1024 * 1024
+
+
+class TestHistoryWarmUp:
+    def test_query_is_downsampled_per_measurement(self):
+        query = QueryPlanner("garden").query([
+            ("Telemetry", ("Humidity", "Temperature"), ["a"]),
+            ("Flowers", ("Moisture",), ["f"]),
+        ], 86400, 288)
+        statements = query.split("; ")
+        assert len(statements) == 2
+        assert statements[0].startswith("SELECT mean(Humidity) AS Humidity, mean(Temperature) AS Temperature FROM Telemetry")
+        assert statements[0].endswith("AND time > now() - 86400s GROUP BY time(300s), alias fill(none)")
+
+    def test_history_loaded_and_extended(self, main_window):
+        window, mock_client = main_window
+        mock_client.query.return_value = [MagicMock(raw={"series": [{
+            "name": "Telemetry",
+            "tags": {"alias": "workRoomTempSensor"},
+            "columns": ["time", "Temperature", "Humidity"],
+            "values": [[1705319400, 20.5, 45.0], [1705319700, 21.0, 46.0]],
+        }]})]
+
+        window.onHistoryLoaded(window.getHistory())
+        assert mock_client.query.call_args.kwargs["epoch"] == "s"
+
+        window.applyData({"latest": {"workRoomTempSensor": Measure(21.5, 47.0, "2024-01-15T12:00:00Z")}})
+        times, values = window.history.series("workRoomTempSensor", "Temperature")
+        assert list(times) == [1705319400.0, 1705319700.0, 1705320000.0]
+        assert list(values) == [20.5, 21.0, 21.5]
+
+
+# ---------------------------------------------------------------------------
+# SnapshotStore
+# ---------------------------------------------------------------------------
+
+class TestSnapshotStore:
+    def test_round_trip(self, tmp_path):
+        store = SnapshotStore(str(tmp_path / "snapshot.json"))
+        rendered = {
+            "workRoom": Measure(21.0, 50.0, "2024-01-15T12:00:00Z"),
+            "flowerOlivaSensor": Moisture(7.0, "2024-01-15T12:00:00Z"),
+            "weather": [DayForecast("2024-03-04", 12.0, 3.0, 0)],
+        }
+        store.save(rendered)
+        assert store.load() == rendered
+        assert not (tmp_path / "snapshot.json.tmp").exists()
+
+    def test_missing_or_corrupt_file(self, tmp_path):
+        path = tmp_path / "snapshot.json"
+        assert SnapshotStore(str(path)).load() == {}
+        path.write_text("{not json")
+        assert SnapshotStore(str(path)).load() == {}
+
+
+class TestSnapshotRestore:
+    def test_restored_values_shown_stale_until_fresh_data(self, tmp_path):
+        SnapshotStore(str(tmp_path / "snapshot.json")).save({
+            "workRoom": Measure(19.5, 41.0, "2024-01-15T12:00:00Z"),
+        })
+        with patch.dict(CONFIG, {
+                "FORECAST_CACHE_PATH": str(tmp_path / "forecast.json"),
+                "SNAPSHOT_PATH": str(tmp_path / "snapshot.json"),
+             }), \
+             patch("app.InfluxDBClient") as MockClient, \
+             patch("requests.Session.get", side_effect=ConnectionError("offline")):
+            MockClient.return_value.query.side_effect = ConnectionError("InfluxDB down")
+            window = MainWindow()
+            window.threadPool.waitForDone()
+
+            workRoom = window.widgets["workRoom"]
+            assert workRoom.labelTemperature.text() == "19.5"
+            assert not workRoom.isEnabled()
+
+            window.applyData({"latest": {"workRoomTempSensor": Measure(19.5, 41.0, "2024-01-15T12:00:00Z")}})
+            assert workRoom.isEnabled()
+
+    def test_snapshot_written_after_changes(self, main_window):
+        window, _ = main_window
+        window.applyData({"latest": {"workRoomTempSensor": Measure(22.0, 44.0, "2024-01-15T12:00:00Z")}})
+        saved = window.snapshot.load()
+        assert saved["workRoom"] == Measure(22.0, 44.0, "2024-01-15T12:00:00Z")
+
+
+# ---------------------------------------------------------------------------
+# Startup
+# ---------------------------------------------------------------------------
+
+class TestStartup:
+    def test_no_network_work_before_first_paint(self, main_window):
+        window, mock_client = main_window
+        mock_client.query.assert_not_called()
+        assert not window.pollingStarted
+        assert not window.pollTimer.isActive()
+
+    def test_polling_starts_after_first_paint(self, main_window):
+        window, _ = main_window
+        with patch.object(window, "startPolling") as mock_start:
+            window.show()
+            deadline = time.monotonic() + 5
+            while not mock_start.called and time.monotonic() < deadline:
+                QApplication.processEvents()
+            window.hide()
+        mock_start.assert_called_once()
+
+    def test_start_polling_fetches_everything_in_background(self, main_window):
+        window, _ = main_window
+        with patch.object(window, "requestFetch") as mock_fetch, \
+             patch.object(window, "startTask") as mock_task:
+            window.startPolling()
+        assert sorted(mock_fetch.call_args.args[0]) == sorted(CONFIG["POLL_SOURCES"])
+        assert [call.args[0] for call in mock_task.call_args_list] == [window.getHistory, window.getStatsSeed]
+        assert {call.args[2] for call in mock_task.call_args_list} == {MainWindow.WARMUP_PRIORITY}
+
+    def test_first_refresh_runs_before_warmup_queries(self, main_window):
+        window, _ = main_window
+        window.threadPool.setMaxThreadCount(1)
+        release = threading.Event()
+        order = []
+        # Occupy the only thread so everything startPolling submits has to queue
+        window.threadPool.start(Task(lambda: release.wait(5)))
+        with patch.object(window, "collectData", side_effect=lambda sources: order.append("refresh")), \
+             patch.object(window, "getHistory", side_effect=lambda: order.append("history")), \
+             patch.object(window, "getStatsSeed", side_effect=lambda: order.append("stats")):
+            window.startPolling()
+            release.set()
+            window.threadPool.waitForDone()
+            QApplication.processEvents()
+        window.threadPool.setMaxThreadCount(CONFIG["FETCH_WORKERS"])
+        assert order[0] == "refresh"
+        assert sorted(order[1:]) == ["history", "stats"]
+
+
+class TestStartupProfiler:
+    def test_report_lists_phases(self, capsys):
+        now = [10.0]
+        profiler = StartupProfiler(10.0, clock=lambda: now[0])
+        profiler.enabled = True
+        now[0] = 10.25
+        profiler.mark("imports")
+        now[0] = 10.5
+        profiler.mark("show")
+        profiler.report()
+        profiler.report()
+
+        err = capsys.readouterr().err
+        assert err.count("Startup profile:") == 1
+        assert "imports" in err and "250.0 ms" in err
+        assert "total" in err and "500.0 ms" in err
+
+    def test_disabled_by_default(self, capsys):
+        profiler = StartupProfiler(0.0)
+        profiler.mark("imports")
+        profiler.report()
+        assert capsys.readouterr().err == ""
+
+    def test_qt_arguments_passed_through(self):
+        args, qtArgs = parseArgs(["app.py", "--startup-profile", "-platform", "offscreen"])
+        assert args.startup_profile
+        assert qtArgs == ["-platform", "offscreen"]
+
+
+# ---------------------------------------------------------------------------
+# Push mode
+# ---------------------------------------------------------------------------
+
+class TestParseLineProtocol:
+    def test_tags_fields_and_timestamp(self):
+        point = parseLineProtocol(
+            "Telemetry,alias=workRoomTempSensor Temperature=22.5,Humidity=48i 1705320000000000000"
+        )
+        assert point == Point(
+            measurement="Telemetry",
+            tags={"alias": "workRoomTempSensor"},
+            fields={"Temperature": 22.5, "Humidity": 48},
+            timestamp=1705320000000000000,
+        )
+
+    def test_escapes_and_strings(self):
+        point = parseLineProtocol('Flowers,alias=big\\ pot,room=a\\,b note="x, y",ok=t')
+        assert point.tags == {"alias": "big pot", "room": "a,b"}
+        assert point.fields == {"note": "x, y", "ok": True}
+        assert point.timestamp is None
+
+    def test_malformed_line(self):
+        with pytest.raises(ValueError):
+            parseLineProtocol("Telemetry")
+        with pytest.raises(ValueError):
+            parseLineProtocol("Telemetry Temperature")
+
+
+class TestPushMode:
+    def send(self, port, *lines):
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            sock.sendto("\n".join(lines).encode(), ("127.0.0.1", port))
+
+    def wait_for(self, condition):
+        deadline = time.monotonic() + 5
+        while not condition() and time.monotonic() < deadline:
+            QApplication.processEvents()
+            time.sleep(0.01)
+        return condition()
+
+    def test_points_routed_to_widgets(self, main_window):
+        window, _ = main_window
+        assert window.startListener("127.0.0.1", 0)
+        port = window.listener.port()
+
+        self.send(
+            port,
+            "Telemetry,alias=workRoomTempSensor Temperature=22.5,Humidity=48 1705320000000000000",
+            "Flowers,alias=flowerOlivaSensor Moisture=13 1705320000000000000",
+            "garbage",
+        )
+
+        workRoom = window.widgets["workRoom"]
+        olive = window.widgets["flowerOlivaSensor"]
+        assert self.wait_for(lambda: olive.currentLevel == 13)
+        assert workRoom.labelTemperature.text() == "22.5"
+        assert workRoom.labelHumidity.text() == "48.0"
+        assert "13:00:00 15/01/2024" in workRoom.timestampLabel.text()
+        window.listener.close()
+
+    def test_partial_telemetry_keeps_other_field(self, main_window):
+        window, _ = main_window
+        window.viewModel.render("bedRoom", Measure(20.0, 55.0, "2024-01-15T12:00:00Z"))
+        window.applyPoint(parseLineProtocol("Telemetry,alias=bedRoomTempSensor Temperature=21 1705320600000000000"))
+        assert window.viewModel.rendered["bedRoom"] == Measure(21.0, 55.0, 1705320600)
+
+    def test_first_partial_point_leaves_other_field_unknown(self, main_window):
+        window, _ = main_window
+        window.viewModel.rendered.pop("bedRoom", None)
+        window.applyPoint(parseLineProtocol("Telemetry,alias=bedRoomTempSensor Humidity=48 1705320600000000000"))
+        assert window.viewModel.rendered["bedRoom"] == Measure(None, 48.0, 1705320600)
+        assert window.widgets["bedRoom"].labelTemperature.text() == "--"
+        window.applyPoint(parseLineProtocol("Telemetry,alias=bedRoomTempSensor Temperature=21 1705320900000000000"))
+        assert window.viewModel.rendered["bedRoom"] == Measure(21.0, 48.0, 1705320900)
+
+    def test_point_without_room_fields_ignored(self, main_window):
+        window, _ = main_window
+        with patch.object(window.viewModel, "render") as mock_render:
+            window.applyPoint(parseLineProtocol("Telemetry,alias=bedRoomTempSensor Battery=3.1"))
+        mock_render.assert_not_called()
+
+    def test_illumination_point_switches_theme(self, main_window):
+        window, _ = main_window
+        with patch.object(window, "setDarkTheme") as mock_dark:
+            window.applyPoint(parseLineProtocol("illuminationSensor value=3"))
+        mock_dark.assert_called_once()
+
+    def test_unknown_alias_ignored(self, main_window):
+        window, _ = main_window
+        with patch.object(window.viewModel, "render") as mock_render:
+            window.applyPoint(parseLineProtocol("Telemetry,alias=attic Temperature=30"))
+        mock_render.assert_not_called()
+
+
+# ---------------------------------------------------------------------------
+# ConnectionManager
+# ---------------------------------------------------------------------------
+
+class _KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = b"{}"
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestConnectionManager:
+    @pytest.fixture
+    def server(self):
+        httpd = ThreadingHTTPServer(("127.0.0.1", 0), _KeepAliveHandler)
+        thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+        thread.start()
+        yield "http://127.0.0.1:%d/" % httpd.server_address[1]
+        httpd.shutdown()
+        httpd.server_close()
+
+    def test_connections_are_reused(self, server):
+        manager = ConnectionManager()
+        for _ in range(3):
+            manager.get(server).raise_for_status()
+        assert manager.stats() == {"requests": 3, "new": 1, "reused": 2}
+        manager.close()
+
+    def test_requests_gzip_and_default_timeout(self):
+        manager = ConnectionManager(connectTimeout=1, readTimeout=2)
+        assert manager.session.headers["Accept-Encoding"] == "gzip"
+        with patch.object(manager.session, "get") as mock_get:
+            manager.get("http://example.invalid/")
+        assert mock_get.call_args.kwargs["timeout"] == (1, 2)
+
+    def test_influx_client_shares_session(self):
+        manager = ConnectionManager()
+        with patch("app.InfluxDBClient") as MockClient:
+            manager.influxClient("localhost", 8086)
+        assert MockClient.call_args.kwargs["session"] is manager.session
+
+    def test_influx_client_makes_single_attempts(self):
+        manager = ConnectionManager(retries=2)
+        client = manager.influxClient("localhost", 8086)
+        assert client._retries == 1
+        adapter = manager.session.get_adapter("http://localhost:8086/query")
+        assert adapter is manager.influxAdapter
+        assert adapter.max_retries.total == 0
+        # Other hosts, e.g. Open-Meteo, keep the configured retries
+        weather = manager.session.get_adapter("https://api.open-meteo.com/v1/forecast")
+        assert weather is manager.adapter
+        assert weather.max_retries.total == 2
+
+    def test_influx_connect_failure_is_one_attempt(self):
+        import requests
+        from urllib3.connectionpool import HTTPConnectionPool
+        manager = ConnectionManager(retries=2, connectTimeout=0.5)
+        client = manager.influxClient("127.0.0.1", 9)
+        with patch.object(HTTPConnectionPool, "_make_request",
+                          side_effect=ConnectionRefusedError("refused")) as mock_request:
+            with pytest.raises(requests.exceptions.ConnectionError):
+                client.query("SELECT 1")
+        assert mock_request.call_count == 1
+
+
+# ---------------------------------------------------------------------------
+# Metrics
+# ---------------------------------------------------------------------------
+
+def _counter(name, **labels):
+    return METRICS.counters.get(Metrics.key(name, labels), 0)
+
+
+def _histogramCount(name, **labels):
+    histogram = METRICS.histograms.get(Metrics.key(name, labels))
+    return histogram.count if histogram else 0
+
+
+class TestHistogram:
+    def test_buckets_are_cumulative_and_inclusive(self):
+        histogram = Histogram(bounds=(0.1, 1))
+        for value in (0.05, 0.1, 0.5, 3):
+            histogram.observe(value)
+        assert list(histogram.cumulative()) == [(0.1, 2), (1, 3), (math.inf, 4)]
+        assert histogram.count == 4
+        assert histogram.sum == pytest.approx(3.65)
+        assert histogram.max == 3
+
+
+class TestMetrics:
+    def test_render_prometheus_text(self):
+        metrics = Metrics()
+        metrics.increment("errors_total", source="weather")
+        metrics.increment("errors_total", source="weather")
+        metrics.setGauge("breaker_state", 1, state="open")
+        metrics.observe("query_seconds", 0.02, query="latest")
+        text = metrics.render()
+        assert "# TYPE errors_total counter\nerrors_total{source=\"weather\"} 2\n" in text
+        assert 'breaker_state{state="open"} 1' in text
+        assert "# TYPE query_seconds histogram" in text
+        assert 'query_seconds_bucket{query="latest",le="0.01"} 0' in text
+        assert 'query_seconds_bucket{query="latest",le="0.025"} 1' in text
+        assert 'query_seconds_bucket{query="latest",le="+Inf"} 1' in text
+        assert 'query_seconds_count{query="latest"} 1' in text
+
+    def test_label_values_are_escaped(self):
+        metrics = Metrics()
+        metrics.increment("errors_total", source='a"b\\c')
+        assert 'errors_total{source="a\\"b\\\\c"} 1' in metrics.render()
+
+    def test_timer_observes_even_when_block_raises(self):
+        ticks = iter([10.0, 10.25])
+        metrics = Metrics(clock=lambda: next(ticks))
+        with pytest.raises(RuntimeError):
+            with metrics.timer("query_seconds", query="latest"):
+                raise RuntimeError("boom")
+        histogram = metrics.histograms[Metrics.key("query_seconds", {"query": "latest"})]
+        assert histogram.count == 1
+        assert histogram.sum == pytest.approx(0.25)
+
+    def test_summary(self):
+        metrics = Metrics()
+        metrics.observe("query_seconds", 0.02, query="latest")
+        metrics.observe("query_seconds", 0.04, query="latest")
+        metrics.increment("errors_total", source="weather")
+        assert metrics.summary() == (
+            'query_seconds{query="latest"} n=2 mean=30ms max=40ms, errors_total{source="weather"}=1'
+        )
+
+
+class TestMetricsServer:
+    def test_serves_metrics_and_404s_elsewhere(self):
+        import urllib.error
+        import urllib.request
+        metrics = Metrics()
+        metrics.increment("errors_total", source="weather")
+        server = MetricsServer(metrics, "127.0.0.1", 0)
+        port = server.start()
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics") as response:
+                assert response.headers["Content-Type"].startswith("text/plain")
+                assert 'errors_total{source="weather"} 1' in response.read().decode()
+            with pytest.raises(urllib.error.HTTPError) as excinfo:
+                urllib.request.urlopen(f"http://127.0.0.1:{port}/")
+            assert excinfo.value.code == 404
+        finally:
+            server.close()
+
+
+class TestInstrumentation:
+    def test_query_latency_and_errors_are_recorded(self, main_window):
+        window, mock_client = main_window
+        labels = {"query": "latest", "measurement": "Flowers,Telemetry"}
+        queries = _histogramCount("dashboard_influxdb_query_seconds", **labels)
+        errors = _counter("dashboard_errors_total", source="latest")
+        mock_client.query.side_effect = ConnectionError("down")
+        assert window.getLatest() is None
+        assert _histogramCount("dashboard_influxdb_query_seconds", **labels) == queries + 1
+        assert _counter("dashboard_errors_total", source="latest") == errors + 1
+
+    def test_breaker_state_gauge_follows_transitions(self):
+        client = ResilientInfluxClient(MagicMock(side_effect=ConnectionError("down")), failureThreshold=1)
+        assert METRICS.gauges[Metrics.key("dashboard_influxdb_breaker_state", {"state": "closed"})] == 1
+        trips = _counter("dashboard_influxdb_breaker_trips_total")
+        with pytest.raises(ConnectionError):
+            client.query("SELECT 1")
+        assert METRICS.gauges[Metrics.key("dashboard_influxdb_breaker_state", {"state": "open"})] == 1
+        assert METRICS.gauges[Metrics.key("dashboard_influxdb_breaker_state", {"state": "closed"})] == 0
+        assert _counter("dashboard_influxdb_breaker_trips_total") == trips + 1
+
+    def test_refresh_cycle_phases_are_timed(self, main_window):
+        window, _ = main_window
+        collected = _histogramCount("dashboard_refresh_seconds", phase="collect")
+        applied = _histogramCount("dashboard_refresh_seconds", phase="apply")
+        window.fetchData()
+        assert _histogramCount("dashboard_refresh_seconds", phase="collect") == collected + 1
+        assert _histogramCount("dashboard_refresh_seconds", phase="apply") == applied + 1
+
+    def test_tile_repaints_are_counted(self, main_window):
+        window, _ = main_window
+        paints = _counter("dashboard_widget_paints_total", widget="workRoom")
+        window.pollingStarted = True  # don't start background polling on show
+        window.show()
+        window.widgets["workRoom"].repaint()
+        QApplication.processEvents()
+        assert _counter("dashboard_widget_paints_total", widget="workRoom") > paints
+        window.hide()
+
+
+# ---------------------------------------------------------------------------
+# Benchmarks
+# ---------------------------------------------------------------------------
+
+class TestBenchmarkHelpers:
+    def test_canned_client_serves_every_configured_alias(self, main_window):
+        from bench_app import CannedInfluxClient
+        window, _ = main_window
+        window.client = ResilientInfluxClient(CannedInfluxClient)
+        latest = window.getLatest()
+        expected = {tile.alias for tile in window.tiles.tiles if tile.alias}
+        assert set(latest) == expected
+        assert window.getIllumination() == 100
+
+    def test_canned_client_changes_values_each_cycle(self, main_window):
+        from bench_app import CannedInfluxClient
+        window, _ = main_window
+        window.client = ResilientInfluxClient(CannedInfluxClient)
+        first, second = window.getLatest(), window.getLatest()
+        alias = window.tiles.tiles[0].alias
+        assert first[alias] != second[alias]
+        assert second[alias].timestamp > first[alias].timestamp
+
+    def test_measure_reports_per_call_microseconds(self):
+        from bench_app import measure
+        calls = []
+        result = measure(lambda: calls.append(1), rounds=3, number=10)
+        assert len(calls) == 31  # one warm-up call plus 3 rounds of 10
+        assert result["rounds"] == 3 and result["number"] == 10
+        assert 0 <= result["min_us"] <= result["median_us"]
+
+    def test_compare_flags_only_slowdowns_beyond_threshold(self):
+        from bench_app import compare
+        baseline = {"a": {"median_us": 100.0}, "b": {"median_us": 100.0}, "c": {"median_us": 100.0}}
+        results = {"a": {"median_us": 120.0}, "b": {"median_us": 130.0}, "c": {"median_us": 50.0},
+                   "new": {"median_us": 1.0}}
+        assert compare(results, baseline, threshold=0.25) == {"b": 1.3}
+
+
+# ---------------------------------------------------------------------------
+# Tile configuration
+# ---------------------------------------------------------------------------
+
+def _roomTiles(count, columns=5):
+    return [
+        {"key": f"room{i}", "type": "DashboardWidget", "title": f"ROOM {i}", "alias": f"room{i}Sensor",
+         "row": i // columns, "column": i % columns}
+        for i in range(count)
+    ]
+
+
+class TestParseTiles:
+    def test_default_layout_is_valid(self):
+        tiles = parseTiles(CONFIG["TILES"])
+        assert [tile.key for tile in tiles][:2] == ["workRoom", "bedRoom"]
+        assert tiles[0].measurement == "Telemetry"
+        assert tiles[5].measurement == "Flowers"
+        assert tiles[-1].alias is None
+
+    def test_measurement_can_be_overridden(self):
+        tile, = parseTiles([{"key": "k", "type": "DashboardWidget", "alias": "a", "measurement": "Outdoor",
+                             "row": 0, "column": 0}])
+        assert tile.measurement == "Outdoor"
+
+    @pytest.mark.parametrize("entries, message", [
+        ([{"key": "k", "type": "Gauge", "row": 0, "column": 0}], "unknown type"),
+        ([{"key": "k", "type": "DashboardWidget", "row": 0, "column": 0}], "needs an alias"),
+        ([{"key": "k", "type": "DashboardLevelWidget", "alias": "a", "row": 0, "column": 0}], "needs an icon"),
+        ([{"key": "k", "type": "DashboardWidget", "alias": "a", "row": 0, "column": 0, "colour": "red"}], "Invalid tile"),
+        (_roomTiles(1) + [{"key": "room0", "type": "DashboardWeatherWidget", "row": 9, "column": 9}], "more than once"),
+        (_roomTiles(1) + [{"key": "x", "type": "DashboardWidget", "alias": "room0Sensor", "row": 9, "column": 9}],
+         "more than one tile"),
+        (_roomTiles(1) + [{"key": "x", "type": "DashboardWeatherWidget", "row": 0, "column": 0}], "overlaps"),
+    ])
+    def test_invalid_entries_are_rejected(self, entries, message):
+        with pytest.raises(ValueError, match=message):
+            parseTiles(entries)
+
+    def test_load_from_json_file(self, tmp_path):
+        path = tmp_path / "tiles.json"
+        path.write_text(json.dumps({"tiles": _roomTiles(3)}))
+        assert [tile.alias for tile in loadTiles(str(path))] == ["room0Sensor", "room1Sensor", "room2Sensor"]
+
+
+class TestTileRegistry:
+    def test_query_groups_do_not_grow_with_tiles(self):
+        registry = TileRegistry(parseTiles(_roomTiles(24) + [
+            {"key": "plant", "type": "DashboardLevelWidget", "alias": "plantSensor", "icon": "olive", "row": 9, "column": 0},
+        ]))
+        groups = registry.queryGroups()
+        assert len(groups) == 2
+        assert len(groups[0][2]) == 24
+        assert len(buildLatestQuery(groups).split("; ")) == 2
+        assert registry.queryGroups(["flowers"]) == [("Flowers", ("Moisture",), ["plantSensor"])]
+
+    def test_sensor_lookup_by_measurement_and_alias(self):
+        registry = TileRegistry(parseTiles(_roomTiles(2)))
+        assert registry.sensor("Telemetry", "room1Sensor").key == "room1"
+        assert registry.sensor("Flowers", "room1Sensor") is None
+
+
+class TestConfiguredLayout:
+    @pytest.fixture
+    def tiled_window(self, request, monkeypatch, tmp_path):
+        path = tmp_path / "tiles.json"
+        path.write_text(json.dumps(_roomTiles(20) + [
+            {"key": "forecast", "type": "DashboardWeatherWidget", "row": 4, "column": 0},
+        ]))
+        # monkeypatch is torn down after main_window, so the path cannot leak
+        monkeypatch.setitem(CONFIG, "TILES_PATH", str(path))
+        return request.getfixturevalue("main_window")
+
+    def test_layout_built_from_file(self, tiled_window):
+        window, _ = tiled_window
+        assert len(window.widgets) == 21
+        layout = window.centralWidget().layout()
+        assert layout.itemAtPosition(3, 4).widget() is window.widgets["room19"]
+        assert isinstance(window.widgets["forecast"], DashboardWeatherWidget)
+
+    def test_twenty_rooms_cost_one_statement(self, tiled_window):
+        window, mock_client = tiled_window
+        mock_client.query.reset_mock()
+        mock_client.query.return_value = MagicMock(raw={"series": [
+            {"name": "Telemetry", "tags": {"alias": "room17Sensor"},
+             "columns": ["time", "Humidity", "Temperature"],
+             "values": [[1705320000, 48.0, 23.5]]},
+        ]})
+        with patch.object(window, "getWeather", return_value=None), \
+             patch.object(window, "getIllumination", return_value=None):
+            window.fetchData()
+        assert mock_client.query.call_count == 1
+        assert len(mock_client.query.call_args.args[0].split("; ")) == 1
+        assert window.widgets["room17"].labelTemperature.text() == "23.5"
+
+    def test_pushed_point_routed_to_configured_tile(self, tiled_window):
+        window, _ = tiled_window
+        window.applyPoint(Point("Telemetry", {"alias": "room3Sensor"}, {"Temperature": 19.5, "Humidity": 41.0}, None))
+        assert window.widgets["room3"].labelTemperature.text() == "19.5"
+
+
+# ---------------------------------------------------------------------------
+# Headless render mode
+# ---------------------------------------------------------------------------
+
+class _RecordingSink:
+    def __init__(self):
+        self.frames = []
+
+    def write(self, frame, regions):
+        self.frames.append((frame, [(key, rect, image) for key, rect, image in regions]))
+
+
+class TestFrameRenderer:
+    @pytest.fixture
+    def rendered(self, main_window):
+        window, _ = main_window
+        window.pollingStarted = True  # don't start background polling on show
+        window.show()
+        QApplication.processEvents()
+        sink = _RecordingSink()
+        renderer = FrameRenderer(window, window.widgets, sink)
+        yield window, renderer, sink
+        window.hide()
+
+    def test_first_frame_is_full(self, rendered):
+        window, renderer, sink = rendered
+        damage = renderer.renderFrame()
+        assert [key for key, _ in damage] == ["frame"]
+        frame, regions = sink.frames[0]
+        assert frame == 1
+        assert regions[0][2].size() == window.size()
+
+    def test_unchanged_window_emits_nothing(self, rendered):
+        window, renderer, sink = rendered
+        renderer.renderFrame()
+        assert renderer.renderFrame() == []
+        assert len(sink.frames) == 1
+
+    def test_only_changed_tile_is_emitted(self, rendered):
+        window, renderer, sink = rendered
+        renderer.renderFrame()
+        window.viewModel.render("bedRoom", Measure(24.5, 50.0, "2024-01-15T12:00:00Z"))
+        QApplication.processEvents()
+        damage = renderer.renderFrame()
+        assert [key for key, _ in damage] == ["bedRoom"]
+        key, rect, image = sink.frames[-1][1][0]
+        assert rect == QRect(window.widgets["bedRoom"].mapTo(window, QPoint(0, 0)), window.widgets["bedRoom"].size())
+        assert image.size() == rect.size()
+
+    def test_theme_switch_emits_full_frame(self, rendered):
+        window, renderer, sink = rendered
+        window.setLightTheme()
+        renderer.renderFrame()
+        window.setDarkTheme()
+        QApplication.processEvents()
+        assert [key for key, _ in renderer.renderFrame()] == ["frame"]
+        window.setLightTheme()
+
+    def test_tile_repaint_schedules_a_frame(self, rendered):
+        window, _, _ = rendered
+        sink = _RecordingSink()
+        window.startRenderer(sink)
+        window.renderer.timer.stop()
+        window.widgets["workRoom"].repaint()
+        assert window.renderer.timer.isActive()
+        window.renderer.timer.stop()
+        window.renderer.renderFrame()
+        # Grabbing the frame repaints every tile, which must not schedule another one
+        assert not window.renderer.timer.isActive()
+
+
+class TestRenderSinks:
+    def _region(self):
+        image = QImage(4, 3, QImage.Format.Format_RGB32)
+        image.fill(QColor("red"))
+        return "workRoom", QRect(10, 20, 4, 3), image
+
+    def test_directory_sink_writes_pngs_and_manifest(self, tmp_path):
+        sink = PngDirectorySink(str(tmp_path / "frames"))
+        sink.write(7, [self._region()])
+        assert QImage(str(tmp_path / "frames" / "000007-workRoom.png")).size().width() == 4
+        manifest = json.loads((tmp_path / "frames" / "frames.jsonl").read_text())
+        assert manifest == {"frame": 7, "regions": [
+            {"key": "workRoom", "file": "000007-workRoom.png", "x": 10, "y": 20, "width": 4, "height": 3},
+        ]}
+
+    def test_stream_sink_writes_header_and_png(self):
+        import io
+        stream = io.BytesIO()
+        PngStreamSink(stream).write(1, [self._region()])
+        headerLine, _, data = stream.getvalue().partition(b"\n")
+        header = json.loads(headerLine)
+        assert header["key"] == "workRoom" and (header["x"], header["y"]) == (10, 20)
+        assert header["length"] == len(data)
+        assert data.startswith(b"\x89PNG")
+
+
+# ---------------------------------------------------------------------------
+# Tile rendering cost
+# ---------------------------------------------------------------------------
+
+class TestTileRendering:
+    def test_title_label_caches_text(self):
+        font = QFont("Arial", 40)
+        title = TitleLabel("КАБИНЕТ", font)
+        assert title.text() == "КАБИНЕТ"
+        assert title.sizeHint().width() == QFontMetrics(font).horizontalAdvance("КАБИНЕТ")
+
+    def test_fixed_text_size_fits_any_digits(self):
+        label = QLabel()
+        label.setFont(QFont("Arial", 60))
+        fixTextSize(label, "100.0")
+        metrics = label.fontMetrics()
+        assert label.minimumSize() == label.maximumSize()
+        for text in ("-10.5", "99.9", "100.0", "18.8"):
+            assert metrics.horizontalAdvance(text) <= label.width()
+
+    def test_normal_humidity_follows_theme_text_color(self, main_window):
+        window, _ = main_window
+        widget = window.widgets["workRoom"]
+        widget.updateValues(20.0, 50.0, "2024-01-15T12:00:00Z")
+        window.switchTheme(ThemeController.DARK)
+        dark = window.themeController.palette(ThemeController.DARK).color(QPalette.ColorRole.WindowText)
+        assert widget.labelHumidity.palette().color(QPalette.ColorRole.WindowText) == dark
+        window.switchTheme(ThemeController.LIGHT)
+
+    def test_value_updates_do_not_relayout(self, main_window):
+        window, _ = main_window
+        window.pollingStarted = True  # don't start background polling on show
+        window.show()
+        QApplication.processEvents()
+        relayouts = _counter("dashboard_widget_relayouts_total", widget="workRoom")
+        paints = _counter("dashboard_widget_paints_total", widget="workRoom")
+        for i, (temperature, humidity) in enumerate([(9.5, 35.0), (24.5, 65.5), (-3.0, 100.0)]):
+            window.viewModel.render("workRoom", Measure(temperature, humidity, f"2024-01-15T12:0{i}:00Z"))
+            QApplication.processEvents()
+        assert _counter("dashboard_widget_relayouts_total", widget="workRoom") == relayouts
+        assert _counter("dashboard_widget_paints_total", widget="workRoom") > paints
+        window.hide()
+
+
+# ---------------------------------------------------------------------------
+# Epoch timestamps
+# ---------------------------------------------------------------------------
+
+def _iso(epoch):
+    return datetime.fromtimestamp(epoch, tz=timezone.utc).isoformat()
+
+
+class TestTimestampFormatter:
+    # Around the 2024 transitions: 31 March 01:00 UTC and 27 October 01:00 UTC
+    DST_EDGES = [1711846800, 1729990800]
+
+    def test_matches_format_timestamp(self):
+        formatter = TimestampFormatter(ZoneInfo("Europe/Zurich"))
+        for epoch in (1705321800, 1721044800, 1733040000, 0, 946684799, 4102444800):
+            assert formatter.format(epoch) == format_timestamp(_iso(epoch))
+
+    def test_matches_across_dst_transitions(self):
+        formatter = TimestampFormatter(ZoneInfo("Europe/Zurich"))
+        for edge in self.DST_EDGES:
+            for epoch in range(edge - 3605, edge + 3605, 61):
+                assert formatter.format(epoch) == format_timestamp(_iso(epoch))
+            assert formatter.format(edge - 1) == format_timestamp(_iso(edge - 1))
+            assert formatter.format(edge) == format_timestamp(_iso(edge))
+
+    def test_series_matches_and_caches_periods(self):
+        formatter = TimestampFormatter(ZoneInfo("Europe/Zurich"))
+        epochs = list(range(1704067200, 1735689600, 3 * 3600 + 17))  # all of 2024
+        assert formatter.formatSeries(epochs) == [format_timestamp(_iso(epoch)) for epoch in epochs]
+        # Winter, summer, winter
+        assert [offset for _, _, offset in formatter.periods] == [3600, 7200, 3600]
+        assert formatter.periods[1][:2] == tuple(self.DST_EDGES)
+
+    def test_fractional_and_string_timestamps(self):
+        formatter = TimestampFormatter(ZoneInfo("Europe/Zurich"))
+        assert formatter.format(1705321800.999) == "13:30:00 15/01/2024"
+        assert formatter.format("2024-07-15T12:00:00Z") == "14:00:00 15/07/2024"
+        assert formatter.format(None) == "Invalid timestamp"
+        assert formatter.format(float("nan")) == "Invalid timestamp"
+
+    def test_out_of_range_epochs_are_invalid(self):
+        formatter = TimestampFormatter(ZoneInfo("Europe/Zurich"))
+        for epoch in (float("inf"), float("-inf"), 10**20, -10**20, 1e300):
+            assert formatter.format(epoch) == "Invalid timestamp"
+            assert formatter.formatSeries([epoch]) == ["Invalid timestamp"]
+        # Outside the arithmetic range but valid for datetime
+        assert formatter.format(-86400) == "01:00:00 31/12/1969"
+
+    def test_memo_is_bounded(self):
+        formatter = TimestampFormatter(ZoneInfo("Europe/Zurich"), memoSize=3)
+        for epoch in range(1705321800, 1705321810):
+            formatter.format(epoch)
+        assert list(formatter.memo) == [1705321807, 1705321808, 1705321809]
+
+    def test_latest_query_requests_epoch_seconds(self, main_window):
+        window, mock_client = main_window
+        mock_client.query.return_value = [MagicMock(raw={"series": [{
+            "name": "Telemetry",
+            "tags": {"alias": "workRoomTempSensor"},
+            "columns": ["time", "Humidity", "Temperature"],
+            "values": [[1705321800, 45.0, 21.5]],
+        }]})]
+        latest = window.getLatest(["telemetry"])
+        assert mock_client.query.call_args.kwargs["epoch"] == "s"
+        assert latest["workRoomTempSensor"].timestamp == 1705321800
+
+        window.applyData({"latest": latest})
+        assert window.widgets["workRoom"].timestampLabel.text() == "Last updated: 13:30:00 15/01/2024"
+        assert TIMESTAMPS.format(1705321800) == "13:30:00 15/01/2024"
+
+
+# ---------------------------------------------------------------------------
+# Response decoding
+# ---------------------------------------------------------------------------
+
+class TestResponseDecoding:
+    def test_columns_mapped_by_name(self):
+        frame = decodeSeries({"name": "Telemetry", "tags": {"alias": "a"},
+                              "columns": ["time", "Temperature", "Humidity"],
+                              "values": [[1705320000, 21.5, 45], [1705320300, 22.0, 46]]})
+        assert isinstance(frame, SeriesFrame)
+        assert len(frame) == 2
+        assert frame.times == array("q", [1705320000, 1705320300])
+        assert frame["Temperature"] == array("d", [21.5, 22.0])
+        assert frame["Humidity"] == array("d", [45.0, 46.0])
+
+    def test_nulls_become_nan(self):
+        frame = decodeSeries({"columns": ["time", "Moisture"], "values": [[1, None], [2, 7.5]]})
+        assert math.isnan(frame["Moisture"][0]) and frame["Moisture"][1] == 7.5
+
+    def test_rfc3339_times_and_string_fields(self):
+        frame = decodeSeries({"columns": ["time", "note"], "values": [["2024-01-15T12:00:00Z", "ok"]]})
+        assert frame.times == array("q", [1705320000])
+        assert frame["note"] == ["ok"]
+
+    def test_empty_series_keeps_columns(self):
+        frame = decodeSeries({"columns": ["time", "value"], "values": []})
+        assert len(frame) == 0 and frame["value"] == array("d")
+
+    def test_grouped_results_split_by_tag(self):
+        results = [
+            MagicMock(raw={"series": [
+                {"name": "Telemetry", "tags": {"alias": "a"}, "columns": ["time", "Humidity"], "values": [[1, 40]]},
+                {"name": "Telemetry", "tags": {"alias": "b"}, "columns": ["time", "Humidity"], "values": [[1, 50]]},
+            ]}),
+            MagicMock(raw={"statement_id": 1}),
+        ]
+        frames = decodeResults(results)
+        assert [(frame.name, frame.tags["alias"], frame["Humidity"][0]) for frame in frames] == [
+            ("Telemetry", "a", 40.0), ("Telemetry", "b", 50.0)]
+
+    def test_bulk_series_smaller_than_raw_rows(self):
+        values = [[1705320000 + 300 * i, 20.0 + i % 7, 40.0 + i % 11] for i in range(10000)]
+        rawBytes = sys.getsizeof(values) + sum(
+            sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row) for row in values)
+        frame = decodeSeries({"columns": ["time", "Temperature", "Humidity"], "values": values})
+        decodedBytes = sum(sys.getsizeof(column) for column in (frame.times, *frame.columns.values()))
+        assert decodedBytes * 4 < rawBytes
+        assert frame["Humidity"][-1] == values[-1][2]
+
+    def test_history_nulls_skipped(self, main_window):
+        window, mock_client = main_window
+        mock_client.query.return_value = MagicMock(raw={"series": [{
+            "name": "Flowers",
+            "tags": {"alias": "flowerOlivaSensor"},
+            "columns": ["time", "Moisture"],
+            "values": [[1705319400, 7.0], [1705319700, None], [1705320000, 6.5]],
+        }]})
+        window.onHistoryLoaded(window.getHistory())
+        times, values = window.history.series("flowerOlivaSensor", "Moisture")
+        assert list(times) == [1705319400.0, 1705320000.0]
+        assert list(values) == [7.0, 6.5]
+
+    def test_missing_readings_become_none_on_tiles(self):
+        frame = decodeSeries({"columns": ["time", "Temperature", "Humidity"],
+                              "values": [[1705320000, None, 45], [1705320300, float("inf"), None]]})
+        assert tileValue("DashboardWidget", frame) == Measure(None, 45.0, 1705320000)
+        assert tileValue("DashboardWidget", frame, 1) == Measure(None, None, 1705320300)
+        moisture = decodeSeries({"columns": ["time", "Moisture"], "values": [[1705320000, None]]})
+        assert tileValue("DashboardLevelWidget", moisture) == Moisture(None, 1705320000)
+
+    def test_missing_reading_shown_once_and_not_as_nan(self, main_window):
+        window, mock_client = main_window
+        mock_client.query.return_value = MagicMock(raw={"series": [{
+            "name": "Telemetry",
+            "tags": {"alias": "workRoomTempSensor"},
+            "columns": ["time", "Temperature", "Humidity"],
+            "values": [[1705320000, 22.5, None]],
+        }]})
+        widget = window.widgets["workRoom"]
+        with patch.object(widget, "updateValues", wraps=widget.updateValues) as mock_update:
+            for _ in range(2):
+                window.applyData({"latest": window.getLatest(["telemetry"]), "sources": ["telemetry"]})
+        mock_update.assert_called_once()
+        assert widget.labelTemperature.text() == "22.5"
+        assert widget.labelHumidity.text() == "--"
+
+
+# ---------------------------------------------------------------------------
+# Rolling room statistics
+# ---------------------------------------------------------------------------
+
+def _naive_extremes(samples, now, window):
+    inside = [value for timestamp, value in samples if timestamp > now - window]
+    return min(inside), max(inside)
+
+
+class TestRollingStats:
+    def test_extremes_match_rescan(self):
+        extremes = RollingExtremes(3600)
+        samples = []
+        for i in range(2000):
+            timestamp, value = 300 * i, 20 + 5 * math.sin(i / 7) + (i * 37 % 11) / 10
+            samples.append((timestamp, value))
+            extremes.add(timestamp, value)
+            assert (extremes.minimum(), extremes.maximum()) == _naive_extremes(samples, timestamp, 3600)
+        # Monotonic deques never hold more than the window's samples
+        assert len(extremes.lows) <= 12 and len(extremes.highs) <= 12
+
+    def test_band_time_weighted_by_interval(self):
+        band = RollingBandTime(3600, 40, 60)
+        band.add(0, 50)
+        band.add(600, 70)   # inside for 0..600
+        band.add(1800, 55)  # outside for 600..1800
+        band.add(2400, 30)  # inside for 1800..2400
+        assert band.share() == pytest.approx(1200 / 2400)
+        band.add(4200, 50)  # outside for 2400..4200; window now starts at 600
+        assert band.total == 3600
+        assert band.share() == pytest.approx((1200 + 1800) / 3600)
+
+    def test_seed_fills_in_before_live_readings(self):
+        stats = RoomStats(86400, (40, 60))
+        stats.add(10000, 21.0, 50.0)
+        stats.add(10300, 22.0, 65.0)
+        stats.seed(array("q", [9400, 9700, 10000]), array("d", [18.0, math.nan, 30.0]),
+                   array("d", [19.5, math.nan, 31.0]), array("d", [35.0, 45.0, 50.0]))
+        low, high, share = stats.summary()
+        # The bucket at 10000 overlaps the live reading and is ignored
+        assert (low, high) == (18.0, 22.0)
+        assert share == pytest.approx(300 / 900)
+        assert stats.add(10600, 23.0, 50.0)
+        assert not stats.add(10600, 99.0, 50.0)
+
+    def test_query_aggregates_per_bucket(self):
+        query = buildStatsQuery([("Telemetry", ("Humidity", "Temperature"), ["a"])], 86400, 300)
+        assert query == (
+            "SELECT min(Temperature) AS minTemperature, max(Temperature) AS maxTemperature, "
+            "mean(Humidity) AS Humidity FROM Telemetry WHERE (alias = 'a') "
+            "AND time > now() - 86400s GROUP BY time(300s), alias fill(none)"
+        )
+
+    def test_tile_shows_seeded_and_live_stats(self, main_window):
+        window, mock_client = main_window
+        widget = window.widgets["workRoom"]
+        assert widget.statsLabel.text() == "24h min -- max -- · off-band --"
+
+        mock_client.query.return_value = MagicMock(raw={"series": [{
+            "name": "Telemetry",
+            "tags": {"alias": "workRoomTempSensor"},
+            "columns": ["time", "minTemperature", "maxTemperature", "Humidity"],
+            "values": [[1705319400, 19.0, 20.0, 65.0], [1705319700, 20.0, 21.0, 50.0]],
+        }]})
+        window.onStatsLoaded(window.getStatsSeed())
+        assert "AS minTemperature" in mock_client.query.call_args.args[0]
+        assert widget.statsLabel.text() == "24h min 19.0 max 21.0 · off-band 100%"
+
+        window.applyData({"latest": {"workRoomTempSensor": Measure(23.5, 50.0, 1705320000)}})
+        assert widget.statsLabel.text() == "24h min 19.0 max 23.5 · off-band 50%"
+
+        window.applyPoint(parseLineProtocol("Telemetry,alias=workRoomTempSensor Temperature=17 1705320600000000000"))
+        assert widget.statsLabel.text() == "24h min 17.0 max 23.5 · off-band 25%"
+
+    def test_stats_label_follows_configured_window(self):
+        with patch.dict(CONFIG, {"STATS_WINDOW_S": 7 * 86400}):
+            widget = DashboardWidget("TEST")
+        widget.updateStats(None, None, None)
+        assert widget.statsLabel.text() == "7d min -- max -- · off-band --"
+        assert [formatDuration(s) for s in (86400, 3600, 5400, 45)] == ["24h", "60m", "90m", "45s"]
+
+    def test_stats_updates_do_not_relayout(self, main_window):
+        window, _ = main_window
+        window.pollingStarted = True
+        window.show()
+        QApplication.processEvents()
+        relayouts = _counter("dashboard_widget_relayouts_total", widget="workRoom")
+        for i in range(5):
+            window.applyData({"latest": {"workRoomTempSensor": Measure(20.0 + i * 3.3, 30.0 + i * 9, 1705320000 + i)}})
+            QApplication.processEvents()
+        assert _counter("dashboard_widget_relayouts_total", widget="workRoom") == relayouts
+        window.hide()
+
+
+# ---------------------------------------------------------------------------
+# Query planner
+# ---------------------------------------------------------------------------
+
+CQ_30M = ('CREATE CONTINUOUS QUERY cq_30m ON garden BEGIN SELECT mean(Temperature) AS Temperature, '
+          'mean(Humidity) AS Humidity, max(Temperature) AS maxTemperature INTO garden."one_year".Telemetry_30m '
+          'FROM garden.autogen.Telemetry GROUP BY time(30m), * END')
+CQ_1H = ('CREATE CONTINUOUS QUERY cq_1h ON garden BEGIN SELECT mean(*) INTO "forever"."Telemetry_1h" '
+         'FROM Telemetry GROUP BY time(1h), alias END')
+
+
+def _showResults(rows, columns, name=None):
+    return MagicMock(raw={"series": [{"name": name, "columns": columns, "values": rows}]})
+
+
+def _discoveredPlanner(retention=(("autogen", "168h0m0s"), ("one_year", "8760h0m0s"), ("forever", "0s"))):
+    client = MagicMock()
+    client.query.side_effect = lambda query, **kwargs: (
+        _showResults([[name, duration, "168h0m0s", 1, name == "autogen"] for name, duration in retention],
+                     ["name", "duration", "shardGroupDuration", "replicaN", "default"])
+        if query.startswith("SHOW RETENTION POLICIES")
+        else _showResults([["cq_30m", CQ_30M], ["cq_1h", CQ_1H]], ["name", "query"], name="garden"))
+    planner = QueryPlanner("garden")
+    planner.discover(client)
+    return planner
+
+
+class TestQueryPlanner:
+    def test_parse_duration(self):
+        assert parseDuration("30m") == 1800
+        assert parseDuration("168h0m0s") == 7 * 86400
+        assert parseDuration("0s") == 0
+        with pytest.raises(ValueError):
+            parseDuration("5 minutes")
+
+    def test_bucket_keeps_points_within_pixels(self):
+        planner = QueryPlanner("garden")
+        assert planner.bucketFor(7 * 86400, 400) == 1800
+        for window in (3600, 86400, 7 * 86400, 30 * 86400, 400 * 86400):
+            for pixels in (120, 400, 1920):
+                points = window / planner.bucketFor(window, pixels)
+                assert points <= pixels
+
+    def test_raw_measurement_without_rollups(self):
+        plan = QueryPlanner("garden").plan("Flowers", ("Moisture",), ["f"], 7 * 86400, 400, aggregate="last")
+        assert plan.rollup is None
+        assert plan.statement == ("SELECT last(Moisture) AS Moisture FROM Flowers WHERE (alias = 'f') "
+                                  "AND time > now() - 604800s GROUP BY time(1800s), alias fill(none)")
+
+    def test_unknown_aggregate_rejected(self):
+        with pytest.raises(ValueError):
+            QueryPlanner("garden").plan("Flowers", ("Moisture",), ["f"], 86400, 400, aggregate="median")
+
+    def test_continuous_queries_parsed(self):
+        rollup = parseContinuousQuery(CQ_30M)
+        assert (rollup.source, rollup.retentionPolicy, rollup.measurement, rollup.interval) == (
+            "Telemetry", "one_year", "Telemetry_30m", 1800)
+        assert rollup.column("max", "Temperature") == "maxTemperature"
+        assert rollup.column("max", "Humidity") is None
+        assert parseContinuousQuery(CQ_1H).column("mean", "Humidity") == "mean_Humidity"
+        # Without the alias tag the rollup can't serve per-sensor reads
+        assert parseContinuousQuery(CQ_30M.replace("time(30m), *", "time(30m)")) is None
+
+    def test_coarsest_matching_rollup_used(self):
+        planner = _discoveredPlanner()
+        plan = planner.plan("Telemetry", ("Humidity", "Temperature"), ["a"], 30 * 86400, 400)
+        assert plan.bucket == 7200 and plan.rollup.measurement == "Telemetry_1h"
+        assert plan.statement.startswith(
+            'SELECT mean("mean_Humidity") AS Humidity, mean("mean_Temperature") AS Temperature '
+            'FROM "forever"."Telemetry_1h" WHERE')
+
+    def test_rollup_needs_interval_aggregate_and_retention(self):
+        planner = _discoveredPlanner()
+        # 7 days at 400px: 30m buckets, too fine for the hourly rollup
+        assert planner.plan("Telemetry", ("Temperature",), ["a"], 7 * 86400, 400).rollup.measurement == "Telemetry_30m"
+        assert planner.plan("Telemetry", ("Temperature",), ["a"], 7 * 86400, 400, "max").rollup.measurement == "Telemetry_30m"
+        assert planner.plan("Telemetry", ("Humidity",), ["a"], 7 * 86400, 400, "max").rollup is None
+        assert planner.plan("Telemetry", ("Temperature",), ["a"], 3600, 400).rollup is None
+        shortLived = _discoveredPlanner(retention=(("autogen", "168h0m0s"), ("one_year", "24h0m0s")))
+        assert shortLived.plan("Telemetry", ("Temperature",), ["a"], 7 * 86400, 400).rollup is None
+
+    def test_history_warm_up_uses_planner(self, main_window):
+        window, mock_client = main_window
+        mock_client.query.reset_mock()
+        mock_client.query.return_value = MagicMock(raw={"series": []})
+        window.getHistory()
+        queries = [call.args[0] for call in mock_client.query.call_args_list]
+        assert queries[0] == 'SHOW RETENTION POLICIES ON "garden"'
+        assert queries[1] == "SHOW CONTINUOUS QUERIES"
+        assert "GROUP BY time(300s), alias fill(none)" in queries[2]
+        window.getHistory()
+        assert mock_client.query.call_count == 4  # discovery only runs once
+
+    def test_failed_discovery_falls_back_to_raw(self, main_window):
+        window, mock_client = main_window
+        mock_client.query.reset_mock()
+
+        def query(statement, **kwargs):
+            if statement.startswith("SHOW"):
+                raise InfluxDBClientError("not authorized")
+            return MagicMock(raw={"series": []})
+
+        mock_client.query.side_effect = query
+        assert window.getHistory() == {}
+        assert not window.planner.discovered
+        assert "FROM Telemetry WHERE" in mock_client.query.call_args.args[0]
+
+
+# ---------------------------------------------------------------------------
+# Aggregator mode
+# ---------------------------------------------------------------------------
+
+def _wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        QApplication.processEvents()
+        time.sleep(0.01)
+    return condition()
+
+
+class TestAggregator:
+    def test_hub_versions_and_deltas(self):
+        hub = SnapshotHub(keep=2)
+        assert hub.publish({"latest": {"a": Measure(20.0, 50.0, 1)}, "illumination": 80}) == 1
+        assert hub.publish({"latest": {"a": Measure(20.0, 50.0, 1)}}) == 1  # nothing changed
+        assert hub.publish({"latest": {"b": Moisture(5.0, 2)}}) == 2
+
+        update = hub.since(1, hub.id)
+        assert (update["version"], update["full"], list(update["changes"])) == (2, False, ["latest/b"])
+        full = hub.since(0, hub.id)
+        assert full["full"] and set(full["changes"]) == {"latest/a", "latest/b", "illumination"}
+
+        hub.publish({"illumination": 10})
+        hub.publish({"illumination": 20})
+        assert hub.since(2, hub.id)["changes"] == {"illumination": 20}
+        assert hub.since(1, hub.id)["full"]  # the delta to version 2 is no longer kept
+        assert hub.since(3, "restarted-hub")["full"]
+
+    def test_entries_round_trip_through_json(self):
+        data = {
+            "latest": {"a": Measure(20.5, 50.0, 1705320000), "f": Moisture(4.0, 1705320000)},
+            "forecasts": [DayForecast("2024-01-15", 5.0, -1.0, 3)],
+            "illumination": 42.0,
+        }
+        assert entriesData(json.loads(json.dumps(dataEntries(data)))) == data
+
+    def test_long_poll_waits_for_a_change(self):
+        hub = SnapshotHub(8)
+        timer = threading.Timer(0.1, lambda: hub.publish({"illumination": 5}))
+        timer.start()
+        start = time.monotonic()
+        assert hub.since(0, hub.id, timeout=5)["version"] == 1
+        assert time.monotonic() - start < 2
+        assert hub.since(1, hub.id, timeout=0.05)["changes"] == {}
+
+    def test_subscriber_follows_server(self):
+        import requests
+        import urllib.error
+        import urllib.request
+        hub = SnapshotHub(8)
+        server = SnapshotServer(hub, "127.0.0.1", 0, maxWait=1)
+        port = server.start()
+        received = []
+        subscriber = SnapshotSubscriber(f"http://127.0.0.1:{port}/snapshot", requests.get, wait=1)
+        subscriber.received.connect(received.append)
+        try:
+            hub.publish({"latest": {"a": Measure(20.0, 50.0, 1)}, "illumination": 30})
+            subscriber.start()
+            assert _wait_for(lambda: len(received) == 1)
+            assert received[0] == {"latest": {"a": Measure(20.0, 50.0, 1)}, "illumination": 30}
+
+            hub.publish({"latest": {"a": Measure(21.0, 50.0, 2)}, "illumination": 30})
+            assert _wait_for(lambda: len(received) == 2)
+            assert received[1] == {"latest": {"a": Measure(21.0, 50.0, 2)}}
+            assert subscriber.version == 2
+
+            with pytest.raises(urllib.error.HTTPError) as excinfo:
+                urllib.request.urlopen(f"http://127.0.0.1:{port}/snapshot?since=latest")
+            assert excinfo.value.code == 400
+        finally:
+            subscriber.close()
+            server.close()
+
+    def test_aggregator_publishes_cycles_and_pushed_points(self, main_window):
+        window, _ = main_window
+        window.startAggregator("127.0.0.1", 0)
+        try:
+            window.applyData({"latest": {"workRoomTempSensor": Measure(21.0, 50.0, 1705320000)}, "illumination": 90})
+            assert window.hub.version == 1
+            window.applyPoint(parseLineProtocol("Flowers,alias=flowerOlivaSensor Moisture=6 1705320600000000000"))
+            assert window.hub.since(1, window.hub.id)["changes"] == {
+                "latest/flowerOlivaSensor": {"type": "Moisture", "value": {"value": 6.0, "timestamp": 1705320600}},
+            }
+        finally:
+            window.snapshotServer.close()
+
+    def test_subscribed_window_reads_nothing_itself(self, request, monkeypatch):
+        import requests
+        hub = SnapshotHub(8)
+        server = SnapshotServer(hub, "127.0.0.1", 0, maxWait=1)
+        port = server.start()
+        monkeypatch.setitem(CONFIG, "AGGREGATOR_URL", f"http://127.0.0.1:{port}/snapshot")
+        monkeypatch.setitem(CONFIG, "AGGREGATOR_LONG_POLL_S", 1)
+        window, mock_client = request.getfixturevalue("main_window")
+        # main_window takes requests.Session.get offline
+        window.subscriber.get = requests.get
+        try:
+            mock_client.query.reset_mock()
+            with patch.object(window, "requestFetch") as mock_fetch:
+                window.startPolling()
+            hub.publish({"latest": {"bedRoomTempSensor": Measure(19.5, 44.0, 1705320000)}})
+            assert _wait_for(lambda: window.widgets["bedRoom"].labelTemperature.text() == "19.5")
+            mock_fetch.assert_not_called()
+            mock_client.query.assert_not_called()
+        finally:
+            window.subscriber.close()
+            server.close()
+
+
+# ---------------------------------------------------------------------------
+# Soak harness
+# ---------------------------------------------------------------------------
+
+def _soakSample(cycle, rss=0, traced=0, qobjects=100, wrapped=50):
+    return {"cycle": cycle, "elapsed_s": 0.0, "rss_bytes": rss, "traced_bytes": traced,
+            "qobjects": qobjects, "wrapped_qobjects": wrapped}
+
+
+class TestSoakHarness:
+    def test_check_growth_compares_last_sample_to_baseline(self):
+        from soak_app import checkGrowth
+        samples = [_soakSample(0, rss=1000, traced=500), _soakSample(10, rss=9000, traced=400),
+                   _soakSample(20, rss=1500, traced=700, qobjects=101)]
+        limits = {"rss_bytes": 1000, "traced_bytes": 100, "qobjects": 0, "wrapped_qobjects": 0}
+        assert checkGrowth(samples, limits) == {"traced_bytes": (200, 100), "qobjects": (1, 0)}
+
+    def test_check_growth_skips_quantities_without_limit(self):
+        from soak_app import checkGrowth
+        samples = [_soakSample(0), _soakSample(10, traced=10**6)]
+        assert checkGrowth(samples, {"rss_bytes": 0, "qobjects": 0}) == {}
+
+    def test_warmup_must_fill_memo_and_stats_window(self):
+        from soak_app import CLOCK_STEP_S, main, minimumWarmup
+        assert minimumWarmup() >= TIMESTAMPS.memoSize
+        assert minimumWarmup() >= CONFIG["STATS_WINDOW_S"] // CLOCK_STEP_S
+        with pytest.raises(SystemExit) as exc:
+            main(["--warmup", "500"])
+        assert exc.value.code == 2
+
+    def test_run_soak_keeps_qobject_count_stable(self, main_window):
+        from bench_app import CannedInfluxClient, cannedForecast
+        from soak_app import CLOCK_STEP_S, runSoak, topAllocators
+        window, _ = main_window
+        window.client = ResilientInfluxClient(lambda: CannedInfluxClient(step=CLOCK_STEP_S))
+        window.connections.get = cannedForecast
+        window.pollingStarted = True
+        samples, snapshots = runSoak(QApplication.instance(), window, cycles=25, warmup=10,
+                                     sampleEvery=10, themeEvery=3, forecastEvery=5)
+        assert [s["cycle"] for s in samples] == [0, 10, 20, 25]
+        assert samples[-1]["qobjects"] == samples[0]["qobjects"] > 0
+        assert all(s["traced_bytes"] > 0 for s in samples)
+        assert isinstance(topAllocators(snapshots), list)
+        assert not tracemalloc.is_tracing()